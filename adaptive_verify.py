@@ -0,0 +1,389 @@
+# adaptive_verify.py
+# Adaptive re-verification scheduling for File Integrity Checker
+# Verifies volatile and critical files often, static cold data rarely
+#
+# Every baseline entry carries a verification history: when it was last
+# verified, when it last changed, how many checks and changes were seen
+# and the stat it had when last checked. From this each entry gets an
+# estimated change rate and a re-verification interval:
+#
+#   rate      = (changes + 0.5) / (time tracked + PRIOR_SECONDS)
+#   interval  = TARGET_CHANGES / (rate * weight) * scale,
+#               clamped to [min_interval, max_interval]
+#
+# so files that keep changing (or match a critical pattern, which
+# multiplies their weight) come back soon, and files that never change
+# drift out to the maximum interval. "scale" stretches all intervals
+# when the steady-state load - the sum of size / interval over all
+# entries - would exceed the I/O budget of a window (e.g. a night).
+#
+# A pass verifies the due entries, most overdue first, until the window's
+# byte budget is spent; entries whose size or mtime moved since their
+# last check jump the queue (a stat is cheap, a read is not). Entries
+# that do not fit stay due and become more urgent. The schedule state
+# and the histories are stored in the baseline file itself.
+
+import fnmatch
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from baseline_store import (
+    BaselineWriter,
+    read_baseline_header,
+    iter_baseline_entries,
+    make_entry,
+    verify_entry,
+    STATUS_MODIFIED,
+    STATUS_MISSING,
+    STATUS_ERROR
+)
+
+
+DEFAULT_WINDOW = 24 * 3600              # Seconds per budget window
+DEFAULT_BUDGET = 100 * 1024 ** 3        # Bytes verified per window
+DEFAULT_MIN_INTERVAL = 3600
+DEFAULT_MAX_INTERVAL = 90 * 24 * 3600
+TARGET_CHANGES = 0.5                    # Expected changes between two checks
+PRIOR_SECONDS = 30 * 24 * 3600          # Weight of the "one change a month" prior
+CRITICAL_WEIGHT = 8                     # Critical paths are checked this much more often
+MIN_SLEEP = 60                          # Shortest pause of the service between passes
+
+# Why an entry was picked
+REASON_NEW = "new"
+REASON_DUE = "due"
+REASON_CHANGED = "changed"
+
+
+def change_rate(history, now):
+    """
+    Estimated changes per second of an entry.
+
+    Args:
+        history (dict): Verification history of the entry
+        now (float): Current time (seconds since the epoch)
+
+    Returns:
+        float: Change rate
+    """
+    tracked = max(0.0, now - history.get("since", now))
+    return (history.get("changes", 0) + 0.5) / (tracked + PRIOR_SECONDS)
+
+
+class AdaptiveScheduler:
+    """
+    Change-history driven verification of one baseline.
+
+    Args:
+        baseline_file (str): Baseline to verify
+        budget (int): Bytes to verify per window (default: stored state,
+                      else DEFAULT_BUDGET)
+        window (float): Length of a budget window in seconds
+        critical (list): fnmatch patterns of paths to check more often
+        min_interval (float): Shortest re-verification interval in seconds
+        max_interval (float): Longest re-verification interval in seconds
+        accept_changes (bool): Record changed files' new digests in the
+                               baseline instead of reporting them again
+    """
+
+    def __init__(self, baseline_file, budget=None, window=None, critical=(),
+                 min_interval=None, max_interval=None, accept_changes=False):
+        self.baseline_file = baseline_file
+        self.header = read_baseline_header(baseline_file)
+        state = dict(self.header.get("schedule") or {})
+        for key, value, default in (("budget", budget, DEFAULT_BUDGET), ("window", window, DEFAULT_WINDOW),
+                                    ("min_interval", min_interval, DEFAULT_MIN_INTERVAL),
+                                    ("max_interval", max_interval, DEFAULT_MAX_INTERVAL)):
+            if value is not None:
+                state[key] = value
+            state.setdefault(key, default)
+            if state[key] <= 0:
+                raise ValueError(f"Invalid {key.replace('_', ' ')}: {state[key]}")
+        if state["min_interval"] > state["max_interval"]:
+            raise ValueError("Minimum interval is longer than the maximum interval")
+        if critical:
+            state["critical"] = list(critical)
+        state.setdefault("critical", [])
+        state.setdefault("scale", 1.0)
+        self.state = state
+        self.accept_changes = accept_changes
+        self.selected = []
+        self.counts = {}
+        self.population = 0
+        self.due = 0
+        self.bytes_planned = 0
+        self.bytes_verified = 0
+        self.next_due = None
+        self._updates = {}
+
+    def _weight(self, path):
+        if any(fnmatch.fnmatch(path, pattern) for pattern in self.state["critical"]):
+            return CRITICAL_WEIGHT
+        return 1
+
+    def interval(self, path, history, now, scale=None):
+        """
+        Re-verification interval of an entry.
+
+        Args:
+            path (str): Entry path
+            history (dict): Verification history of the entry
+            now (float): Current time
+            scale (float): Budget scale (default: the stored one)
+
+        Returns:
+            float: Interval in seconds
+        """
+        scale = self.state["scale"] if scale is None else scale
+        unscaled = TARGET_CHANGES / (change_rate(history, now) * self._weight(path))
+        return min(self.state["max_interval"], max(self.state["min_interval"], unscaled * scale))
+
+    def _stat_moved(self, path, entry, history):
+        try:
+            stat_info = os.stat(path)
+        except OSError:
+            return history.get("observed") != STATUS_MISSING
+        size, mtime_ns = history.get("stat") or (entry.get("size"), entry.get("mtime_ns"))
+        return stat_info.st_size != size or stat_info.st_mtime_ns != mtime_ns
+
+    def window_budget(self, now=None):
+        """
+        Bytes left to verify in the current window (starting a new window
+        once the last one is over).
+
+        Args:
+            now (float): Current time
+
+        Returns:
+            int: Remaining bytes
+        """
+        now = time.time() if now is None else now
+        started = self.state.get("window_started")
+        if started is None or now - started >= self.state["window"]:
+            self.state["window_started"] = int(now)
+            self.state["window_spent"] = 0
+        return max(0, self.state["budget"] - self.state.get("window_spent", 0))
+
+    def plan(self, now=None):
+        """
+        Choose the entries to verify in this pass.
+
+        Also recomputes the budget scale from the steady-state load of
+        the whole baseline.
+
+        Args:
+            now (float): Current time
+
+        Returns:
+            list: (path, entry, reason) tuples, most urgent first
+        """
+        now = time.time() if now is None else now
+        budget = self.window_budget(now)
+        load = 0.0
+        candidates = []
+        self.population = 0
+        self.next_due = None
+        for entry in iter_baseline_entries(self.baseline_file):
+            path = entry["path"]
+            history = entry.get("history")
+            self.population += 1
+            size = entry.get("size") or 0
+            if history is None:
+                load += size / self.interval(path, {}, now, 1.0)
+                candidates.append((float("inf"), path, size, REASON_NEW))
+                continue
+            load += size / self.interval(path, history, now, 1.0)
+            if self._stat_moved(path, entry, history):
+                candidates.append((float("inf"), path, size, REASON_CHANGED))
+            elif history.get("next", 0) <= now:
+                urgency = (now - history["verified"]) / self.interval(path, history, now)
+                candidates.append((urgency, path, size, REASON_DUE))
+            elif self.next_due is None or history["next"] < self.next_due:
+                self.next_due = history["next"]
+        # Stretch every interval when the baseline needs more than one budget per window
+        self.state["scale"] = max(1.0, load * self.state["window"] / self.state["budget"])
+
+        candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+        picked = {}
+        self.bytes_planned = 0
+        for urgency, path, size, reason in candidates:
+            if self.bytes_planned + size <= budget or (not picked and budget >= self.state["budget"]):
+                picked[path] = reason
+                self.bytes_planned += size
+        self.due = len(candidates) - len(picked)
+        if self.due:
+            self.next_due = now
+        self.selected = [(entry["path"], entry, picked[entry["path"]])
+                         for entry in iter_baseline_entries(self.baseline_file) if entry["path"] in picked]
+        order = {path: position for position, path in enumerate(picked)}
+        self.selected.sort(key=lambda item: order[item[0]])
+        return self.selected
+
+    def _record(self, path, entry, result, stat_info, now, accepted=None):
+        """Update the history of a verified entry (and accept its new entry)"""
+        history = dict(entry.get("history") or {"since": now, "checks": 0, "changes": 0})
+        observed = result["actual"] if result["status"] != STATUS_MISSING else STATUS_MISSING
+        previous = history.get("observed", entry.get("hash"))
+        history["verified"] = now
+        history["checks"] += 1
+        if observed != previous:
+            history["changes"] += 1
+            history["changed"] = now
+        fields = {}
+        if accepted is not None:
+            fields = dict(accepted)
+            history.pop("observed", None)
+        elif observed != entry.get("hash"):
+            history["observed"] = observed
+        else:
+            history.pop("observed", None)
+        if stat_info is not None:
+            history["stat"] = [stat_info.st_size, stat_info.st_mtime_ns]
+        else:
+            history.pop("stat", None)
+        history["next"] = int(now + self.interval(path, history, now))
+        fields["history"] = history
+        self._updates[path] = fields
+        if self.next_due is None or history["next"] < self.next_due:
+            self.next_due = history["next"]
+
+    def results(self, workers=1, layout=None, cancel_event=None, **hash_options):
+        """
+        Verify the planned entries (planning first if needed).
+
+        Args:
+            workers (int): Number of worker threads
+            layout (str): Optional physical-layout scheduling (none, inode, fiemap)
+            cancel_event (threading.Event): Optional event that stops the pass
+            **hash_options: Extra keyword arguments for generate_file_hash
+
+        Yields:
+            dict: verify_entry result plus the "reason" it was picked
+        """
+        if not self.selected:
+            self.plan()
+        algorithm = self.header["algorithm"]
+        chunking = self.header.get("chunking")
+        append = self.header.get("append")
+        planned = {path: (entry, reason) for path, entry, reason in self.selected}
+
+        def check(path):
+            entry, reason = planned[path]
+            try:
+                stat_info = os.stat(path)
+            except OSError:
+                stat_info = None
+            result = verify_entry(path, entry, algorithm, chunking, **hash_options)
+            result["reason"] = reason
+            accepted = None
+            if self.accept_changes and result["status"] == STATUS_MODIFIED:
+                try:
+                    accepted = make_entry(path, algorithm, chunking, append, **hash_options)
+                except Exception:
+                    accepted = None
+            return result, stat_info, accepted
+
+        if workers > 1 or layout is not None:
+            from batch_scheduler import run_scheduled, LAYOUT_INODE
+            results = run_scheduled(planned, check, workers, layout or LAYOUT_INODE, cancel_event=cancel_event)
+        else:
+            results = (check(path) for path in planned
+                       if cancel_event is None or not cancel_event.is_set())
+        for result, stat_info, accepted in results:
+            path = result["path"]
+            status = result["status"]
+            self.counts[status] = self.counts.get(status, 0) + 1
+            if status != STATUS_ERROR:
+                self._record(path, planned[path][0], result, stat_info, int(time.time()), accepted)
+                if status != STATUS_MISSING:
+                    self.bytes_verified += stat_info.st_size if stat_info is not None else 0
+            yield result
+
+    def report(self):
+        """
+        Summarize the pass.
+
+        Returns:
+            dict: Counts, bytes verified against the budget, entries still
+                  due, the budget scale and the next due time
+        """
+        return {
+            "population": self.population,
+            "verified": sum(self.counts.values()),
+            "counts": dict(self.counts),
+            "bytes_verified": self.bytes_verified,
+            "budget": self.state["budget"],
+            "window_spent": self.state.get("window_spent", 0) + self.bytes_verified,
+            "still_due": self.due,
+            "scale": self.state["scale"],
+            "next_due": self.next_due,
+        }
+
+    def save(self):
+        """Write the histories and the schedule state back into the baseline file"""
+        self.state["window_spent"] = self.state.get("window_spent", 0) + self.bytes_verified
+        self.state["last_run"] = time.strftime('%Y-%m-%d %H:%M:%S')
+        header_fields = {
+            key: value for key, value in self.header.items()
+            if key not in ("format", "version", "algorithm", "created", "schedule")
+        }
+        if any("hash" in fields for fields in self._updates.values()):
+            # Accepted changes: rollups of the old digests no longer apply
+            header_fields.pop("generation", None)
+        directory = os.path.dirname(os.path.abspath(self.baseline_file))
+        fd, temp_file = tempfile.mkstemp(prefix=".baseline-", dir=directory)
+        os.close(fd)
+        try:
+            with BaselineWriter(temp_file, self.header["algorithm"], created=self.header["created"],
+                                schedule=self.state, **header_fields) as writer:
+                for entry in iter_baseline_entries(self.baseline_file):
+                    path = entry.pop("path")
+                    fields = self._updates.get(path)
+                    if fields:
+                        if "hash" in fields:
+                            # Accepted change: the rebuilt entry replaces the old one
+                            entry = {}
+                        entry.update(fields)
+                    writer.write_entry(path, entry)
+            shutil.copymode(self.baseline_file, temp_file)
+            os.replace(temp_file, self.baseline_file)
+        except BaseException:
+            os.unlink(temp_file)
+            raise
+        self.bytes_verified = 0
+        self._updates = {}
+        self.header = read_baseline_header(self.baseline_file)
+
+
+def serve(baseline_file, pass_callback, stop_event=None, scheduler_options=None, **run_options):
+    """
+    Run adaptive verification as a long-running service.
+
+    Each pass re-reads the baseline, verifies what is due within the
+    window's remaining budget and saves the histories; the service then
+    sleeps until the next entry is due or a new window starts.
+
+    Args:
+        baseline_file (str): Baseline to verify
+        pass_callback (function): Called with (scheduler, results) per
+                                  pass; must consume the results
+        stop_event (threading.Event): Set to stop the service
+        scheduler_options (dict): Keyword arguments for AdaptiveScheduler
+        **run_options: Keyword arguments for AdaptiveScheduler.results
+    """
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        scheduler = AdaptiveScheduler(baseline_file, **(scheduler_options or {}))
+        scheduler.plan()
+        if scheduler.selected:
+            pass_callback(scheduler, scheduler.results(cancel_event=stop_event, **run_options))
+            scheduler.save()
+        now = time.time()
+        window_end = scheduler.state["window_started"] + scheduler.state["window"]
+        if scheduler.due or scheduler.next_due is None:
+            wake = window_end           # Budget spent, or nothing scheduled yet
+        else:
+            wake = min(scheduler.next_due, window_end)
+        stop_event.wait(max(MIN_SLEEP, wake - now))
@@ -6,6 +6,8 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import os
 import json
+import queue
+import threading
 from datetime import datetime
 from hash_generator_advanced import (
     generate_file_hash, 
@@ -16,6 +18,189 @@ from hash_generator_advanced import (
     import_hashes_from_file,
     batch_hash_files
 )
+from batch_engine import iter_results, iter_result_batches, BatchResult
+from throttle import BudgetController
+from baseline_store import (read_baseline_header, iter_baseline_entries, verify_baseline, STATUS_MODIFIED,
+                            STATUS_MISSING, STATUS_ERROR)
+
+
+class VirtualResultsTable:
+    """
+    Virtualized results table built on ttk.Treeview.
+
+    All results live in a plain Python list; the Treeview only ever
+    holds one item per visible row, and scrolling just rewrites the
+    values of those items. Sorting and filtering work on a list of row
+    indices, so the widget cost stays constant however many results
+    arrive.
+    """
+
+    COLUMNS = ("path", "status", "hash")
+    HEADINGS = {"path": "File", "status": "Status", "hash": "Hash / Error"}
+    FILTERS = {
+        "All": None,
+        "Errors only": (STATUS_ERROR,),
+        "Mismatches only": (STATUS_MODIFIED, STATUS_MISSING),
+    }
+
+    def __init__(self, parent):
+        self.rows = []
+        self.view = []
+        self.offset = 0
+        self.visible_rows = 20
+        self.sort_column = None
+        self.sort_reverse = False
+        self.filter_statuses = None
+        self.counts = {}
+        
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(
+            self.frame,
+            columns=self.COLUMNS,
+            show="headings",
+            selectmode="browse",
+            height=self.visible_rows
+        )
+        for column in self.COLUMNS:
+            self.tree.heading(column, text=self.HEADINGS[column],
+                              command=lambda c=column: self.sort_by(c))
+        self.tree.column("path", width=330)
+        self.tree.column("status", width=80, anchor=tk.CENTER)
+        self.tree.column("hash", width=420)
+        self.tree.tag_configure(STATUS_ERROR, foreground="#e74c3c")
+        self.tree.tag_configure(STATUS_MODIFIED, foreground="#e67e22")
+        self.tree.tag_configure(STATUS_MISSING, foreground="#e67e22")
+        
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.tree.bind("<Configure>", self.on_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_wheel)
+        self.create_items()
+        
+    def create_items(self):
+        """Create exactly one Treeview item per visible row"""
+        self.tree.delete(*self.tree.get_children())
+        for index in range(self.visible_rows):
+            self.tree.insert("", tk.END, iid=f"row{index}", values=("", "", ""))
+        self.render()
+        
+    def row_matches(self, row):
+        """Check a row against the active filter"""
+        return self.filter_statuses is None or row.status in self.filter_statuses
+        
+    def sort_key(self, index):
+        """Sort key for a row index in the current sort column"""
+        value = getattr(self.rows[index], self.sort_column)
+        return value if value is not None else self.rows[index].error or ""
+        
+    def rebuild_view(self):
+        """Recompute the filtered and sorted list of row indices"""
+        self.view = [i for i, row in enumerate(self.rows) if self.row_matches(row)]
+        if self.sort_column:
+            self.view.sort(key=self.sort_key, reverse=self.sort_reverse)
+        self.offset = min(self.offset, max(0, len(self.view) - self.visible_rows))
+        self.render()
+        
+    def add_results(self, results):
+        """Append a batch of results and refresh the visible window"""
+        start = len(self.rows)
+        self.rows.extend(results)
+        for row in results:
+            self.counts[row.status] = self.counts.get(row.status, 0) + 1
+        added = [i for i in range(start, len(self.rows)) if self.row_matches(self.rows[i])]
+        if self.sort_column and len(added) * 8 < len(self.view):
+            self.insert_sorted(added)
+        else:
+            self.view.extend(added)
+            if self.sort_column:
+                self.view.sort(key=self.sort_key, reverse=self.sort_reverse)
+        self.render()
+        
+    def insert_sorted(self, indices):
+        """Insert row indices into the sorted view by binary search"""
+        view = self.view
+        low = 0
+        # Sorted and stable, like view.sort: equal keys keep arrival order
+        for index in sorted(indices, key=self.sort_key, reverse=self.sort_reverse):
+            key = self.sort_key(index)
+            high = len(view)
+            while low < high:
+                middle = (low + high) // 2
+                other = self.sort_key(view[middle])
+                if (other < key) if self.sort_reverse else (key < other):
+                    high = middle
+                else:
+                    low = middle + 1
+            view.insert(low, index)
+            low += 1
+        
+    def set_filter(self, name):
+        """Apply one of the FILTERS by name"""
+        self.filter_statuses = self.FILTERS[name]
+        self.offset = 0
+        self.rebuild_view()
+        
+    def sort_by(self, column):
+        """Sort by a column; clicking the same heading again reverses"""
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+        for name in self.COLUMNS:
+            arrow = (" ▼" if self.sort_reverse else " ▲") if name == column else ""
+            self.tree.heading(name, text=self.HEADINGS[name] + arrow)
+        self.rebuild_view()
+        
+    def render(self):
+        """Write the rows of the current window into the Treeview items"""
+        for index in range(self.visible_rows):
+            position = self.offset + index
+            if position < len(self.view):
+                row = self.rows[self.view[position]]
+                detail = row.hash if row.error is None else row.error
+                self.tree.item(f"row{index}", values=(row.path, row.status, detail), tags=(row.status,))
+            else:
+                self.tree.item(f"row{index}", values=("", "", ""), tags=())
+        total = len(self.view)
+        if total <= self.visible_rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + self.visible_rows) / total)
+            
+    def scroll_to(self, offset):
+        """Move the visible window to start at the given view position"""
+        offset = max(0, min(int(offset), len(self.view) - self.visible_rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+            
+    def on_scroll(self, action, amount, unit=None):
+        """Scrollbar command handler"""
+        if action == tk.MOVETO:
+            self.scroll_to(float(amount) * len(self.view))
+        elif action == tk.SCROLL:
+            step = self.visible_rows if unit == tk.PAGES else 1
+            self.scroll_to(self.offset + int(amount) * step)
+            
+    def on_wheel(self, event):
+        """Mouse wheel handler (Windows/macOS delta, X11 buttons 4/5)"""
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+        
+    def on_resize(self, event):
+        """Resize the item pool to the number of rows that fit"""
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        rows = max(1, (event.height - row_height) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.create_items()
 
 
 class AdvancedFileIntegrityChecker:
@@ -83,6 +268,7 @@ class AdvancedFileIntegrityChecker:
         file_menu.add_separator()
         file_menu.add_command(label="Export Hashes", command=self.export_hashes)
         file_menu.add_command(label="Import Hashes", command=self.import_hashes)
+        file_menu.add_command(label="Verify Against Baseline", command=self.verify_baseline)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
         
@@ -529,7 +715,7 @@ class AdvancedFileIntegrityChecker:
         file_path = filedialog.asksaveasfilename(
             title="Export Hashes",
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("Text files", "*.txt")]
+            filetypes=[("JSON files", "*.json"), ("Checksum files", "*.txt *SUMS *.sha256 *.md5")]
         )
         
         if file_path:
@@ -548,7 +734,8 @@ class AdvancedFileIntegrityChecker:
         """Import hashes from file"""
         file_path = filedialog.askopenfilename(
             title="Import Hashes",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=[("JSON files", "*.json"), ("Checksum files", "*.txt *SUMS *.sha256 *.md5"),
+                       ("All files", "*.*")]
         )
         
         if file_path:
@@ -567,34 +754,176 @@ class AdvancedFileIntegrityChecker:
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to import:\n{str(e)}")
                 
-    def batch_process_files(self, file_paths):
-        """Process multiple files"""
+    def batch_process_files(self, file_paths, expected=None, algorithm=None, title="Batch Processing Results",
+                            produce_results=None, total=None):
+        """
+        Process multiple files in a worker thread, streaming into a results table.
+
+        produce_results, when given, replaces hashing: it is called on the
+        worker thread as produce_results(cancel_event, budget) and must
+        return an iterable of BatchResult rows; total is then the number
+        of rows expected, if known.
+        """
+        # Produced rows are hashes only if an algorithm was named (not byte comparisons)
+        label = "byte comparison" if produce_results is not None and algorithm is None else None
+        algorithm = (algorithm or self.current_algorithm.get()).lower()
+        label = label or algorithm.upper()
+        
         result_window = tk.Toplevel(self.root)
-        result_window.title("Batch Processing Results")
-        result_window.geometry("700x500")
+        result_window.title(title)
+        result_window.geometry("900x550")
+        
+        toolbar = tk.Frame(result_window)
+        toolbar.pack(fill=tk.X, padx=10, pady=(10, 0))
+        
+        status_label = tk.Label(toolbar, text=f"Batch Hash Generation ({algorithm.upper()})",
+                                font=("Arial", 10, "bold"), anchor=tk.W)
+        status_label.pack(side=tk.LEFT)
+        
+        table = VirtualResultsTable(result_window)
+        table.frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        filter_var = tk.StringVar(value="All")
+        filter_box = ttk.Combobox(toolbar, textvariable=filter_var, state="readonly",
+                                  values=list(VirtualResultsTable.FILTERS), width=16)
+        filter_box.pack(side=tk.RIGHT)
+        filter_box.bind("<<ComboboxSelected>>", lambda event: table.set_filter(filter_var.get()))
+        tk.Label(toolbar, text="Show:", font=("Arial", 9)).pack(side=tk.RIGHT, padx=5)
         
-        text_widget = tk.Text(result_window, font=("Courier", 9), wrap=tk.WORD)
-        text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        # Budget controls - take effect immediately on the running batch
+        budget = BudgetController()
+        rate_var = tk.IntVar(value=0)
+        cpu_var = tk.IntVar(value=100)
         
-        scrollbar = tk.Scrollbar(text_widget)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        text_widget.config(yscrollcommand=scrollbar.set)
-        scrollbar.config(command=text_widget.yview)
+        def apply_budget():
+            try:
+                budget.set_rate(rate_var.get())
+                budget.set_cpu_share(cpu_var.get() / 100 if cpu_var.get() < 100 else None)
+            except tk.TclError:
+                pass
+                
+        tk.Spinbox(toolbar, from_=10, to=100, increment=10, width=4, textvariable=cpu_var,
+                   command=apply_budget).pack(side=tk.RIGHT, padx=(0, 15))
+        tk.Label(toolbar, text="CPU %:", font=("Arial", 9)).pack(side=tk.RIGHT, padx=5)
+        tk.Spinbox(toolbar, from_=0, to=2000, increment=10, width=5, textvariable=rate_var,
+                   command=apply_budget).pack(side=tk.RIGHT)
+        tk.Label(toolbar, text="Max MB/s (0 = unlimited):", font=("Arial", 9)).pack(side=tk.RIGHT, padx=5)
+        rate_var.trace_add("write", lambda *unused: apply_budget())
+        cpu_var.trace_add("write", lambda *unused: apply_budget())
+        
+        results_queue = queue.Queue()
+        cancel_event = threading.Event()
+        if file_paths is not None:
+            total = len(file_paths)
+        
+        def worker():
+            try:
+                if produce_results is not None:
+                    results = produce_results(cancel_event, budget)
+                else:
+                    results = iter_results(file_paths, algorithm, expected, cancel_event, throttle=budget)
+                for batch in iter_result_batches(results):
+                    results_queue.put(batch)
+            finally:
+                results_queue.put(None)
+                
+        def poll():
+            if not result_window.winfo_exists():
+                return
+            done = False
+            try:
+                while True:
+                    batch = results_queue.get_nowait()
+                    if batch is None:
+                        done = True
+                        break
+                    table.add_results(batch)
+            except queue.Empty:
+                pass
+            summary = ", ".join(f"{count} {status}" for status, count in sorted(table.counts.items()))
+            state = "Done" if done else "Processing"
+            progress = f"{len(table.rows)}/{total}" if total is not None else str(len(table.rows))
+            status_label.config(text=f"{state}: {progress} files ({label})"
+                                     + (f" - {summary}" if summary else ""))
+            if not done:
+                result_window.after(100, poll)
+                
+        def on_close():
+            cancel_event.set()
+            result_window.destroy()
+            
+        def on_destroy(event):
+            # Also stop the worker when the window goes away with its parent
+            if event.widget is result_window:
+                cancel_event.set()
+                
+        result_window.protocol("WM_DELETE_WINDOW", on_close)
+        result_window.bind("<Destroy>", on_destroy)
+        threading.Thread(target=worker, daemon=True).start()
+        poll()
         
-        algorithm = self.current_algorithm.get().lower()
-        text_widget.insert('1.0', f"Batch Hash Generation ({algorithm.upper()})\n")
-        text_widget.insert(tk.END, "="*70 + "\n\n")
+    def verify_baseline(self):
+        """Verify files against a baseline file in the results table"""
+        file_path = filedialog.askopenfilename(
+            title="Select Baseline",
+            filetypes=[("Baseline files", "*.jsonl"), ("All files", "*.*")]
+        )
         
-        for file_path in file_paths:
+        if file_path:
             try:
-                hash_val = generate_file_hash(file_path, algorithm)
-                text_widget.insert(tk.END, f"File: {os.path.basename(file_path)}\n")
-                text_widget.insert(tk.END, f"Hash: {hash_val}\n\n")
+                algorithm = read_baseline_header(file_path)["algorithm"]
+                count = sum(1 for _ in iter_baseline_entries(file_path))
             except Exception as e:
-                text_widget.insert(tk.END, f"File: {os.path.basename(file_path)}\n")
-                text_widget.insert(tk.END, f"Error: {str(e)}\n\n")
+                messagebox.showerror("Error", f"Failed to load baseline:\n{str(e)}")
+                return
                 
-        text_widget.config(state=tk.DISABLED)
+            def produce_results(cancel_event, budget):
+                # Same checks as the CLI: chunk regions and append-only entries included
+                for result in verify_baseline(file_path, throttle=budget):
+                    if cancel_event.is_set():
+                        return
+                    detail = result.get("error")
+                    if "regions" in result:
+                        detail = "changed: " + ", ".join(
+                            f"{offset}+{length}" for offset, length in result["regions"][:5]
+                        ) + (", ..." if len(result["regions"]) > 5 else "")
+                    yield BatchResult(result["path"], result["status"], result.get("actual"), detail)
+                    
+            self.batch_process_files(
+                None,
+                algorithm=algorithm,
+                title=f"Baseline Verification - {os.path.basename(file_path)}",
+                produce_results=produce_results,
+                total=count
+            )
+        
+    def compare_contents(self, folders=False):
+        """Compare two files or folders byte for byte in the results table"""
+        from content_compare import compare_paths
+        
+        kind = "Folder" if folders else "File"
+        paths = []
+        for which in ("First", "Second"):
+            if folders:
+                path = filedialog.askdirectory(title=f"Select {which} {kind}")
+            else:
+                path = filedialog.askopenfilename(title=f"Select {which} {kind}")
+            if not path:
+                return
+            paths.append(path)
+            
+        def produce_results(cancel_event, budget):
+            for result in compare_paths(paths[0], paths[1], cancel_event=cancel_event):
+                if result.status == STATUS_ERROR:
+                    yield BatchResult(result.path, result.status, None, result.detail)
+                else:
+                    yield BatchResult(result.path, result.status, result.detail, None)
+                    
+        self.batch_process_files(
+            None,
+            title=f"Compare {kind}s - {os.path.basename(paths[0])} vs {os.path.basename(paths[1])}",
+            produce_results=produce_results
+        )
         
     def batch_hash_window(self):
         """Open batch hash generator window"""
@@ -637,6 +966,24 @@ class AdvancedFileIntegrityChecker:
             pady=8
         ).pack(pady=10)
         
+        # Direct comparison: faster than hashing both sides, stops at the first difference
+        direct_frame = tk.Frame(comp_window)
+        direct_frame.pack(pady=5)
+        tk.Button(
+            direct_frame,
+            text="Compare Files...",
+            command=lambda: self.compare_contents(folders=False),
+            font=("Arial", 9),
+            padx=10
+        ).pack(side=tk.LEFT, padx=5)
+        tk.Button(
+            direct_frame,
+            text="Compare Folders...",
+            command=lambda: self.compare_contents(folders=True),
+            font=("Arial", 9),
+            padx=10
+        ).pack(side=tk.LEFT, padx=5)
+        
     def toggle_theme(self):
         """Toggle between light and dark theme"""
         if self.dark_mode.get():
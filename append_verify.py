@@ -0,0 +1,302 @@
+# append_verify.py
+# Incremental verification of append-only files for File Integrity Checker
+# Checks log and journal files by checkpoints instead of rehashing them
+#
+# An append-only entry splits the file into fixed-size segments and keeps
+# one checkpoint digest per complete segment plus the digest of the
+# partial segment at the end (the "tail"). Its "hash" is the digest of
+# the size and the checkpoint list, so it still changes with any byte of
+# the file. A re-check
+#
+#   - detects truncation from the size alone
+#   - re-reads the tail segment, confirming its old bytes against the
+#     stored tail digest, and hashes only the bytes appended since
+#   - re-reads a rotating 1/rotation of the complete segments, so a
+#     rewrite anywhere in the prefix is found within `rotation` runs
+#     (rotation=1 checks the whole prefix every time). The rotation only
+#     advances when the new state is written back, so checks that do not
+#     save it (rotate=False) re-read every complete segment instead
+#
+# Changed segments are reported as "regions", like chunked entries. The
+# new checkpoints are returned with the result; update_append_entries
+# writes them back so the next run starts where this one stopped.
+
+import fnmatch
+import os
+import shutil
+import tempfile
+
+from hash_generator_advanced import new_hash
+
+
+DEFAULT_SEGMENT = 64 * 1024 * 1024
+DEFAULT_ROTATION = 8
+READ_SIZE = 1024 * 1024
+
+
+def append_params(patterns, segment=DEFAULT_SEGMENT, rotation=DEFAULT_ROTATION):
+    """
+    Validate append-only parameters for a baseline.
+
+    Args:
+        patterns (list): fnmatch patterns of append-only paths
+        segment (int): Checkpoint segment size in bytes
+        rotation (int): Runs over which every complete segment is re-read
+
+    Returns:
+        dict: Parameters to pass to create_baseline
+    """
+    if segment < READ_SIZE or segment % READ_SIZE:
+        raise ValueError(f"Segment size must be a multiple of {READ_SIZE} bytes: {segment}")
+    if rotation < 1:
+        raise ValueError(f"Invalid rotation: {rotation}")
+    return {"patterns": list(patterns), "segment": segment, "rotation": rotation}
+
+
+def is_append_only(path, append):
+    """Check whether a path matches the append-only patterns"""
+    return bool(append) and any(fnmatch.fnmatch(path, pattern) for pattern in append["patterns"])
+
+
+def root_digest(algorithm, size, checkpoints, tail):
+    """Digest of an append-only entry: its size and its segment digests"""
+    hash_obj = new_hash(algorithm)
+    hash_obj.update(size.to_bytes(8, "big"))
+    for digest in checkpoints + [tail]:
+        hash_obj.update(bytes.fromhex(digest))
+    return hash_obj.hexdigest()
+
+
+class _Reader:
+    """Positional reads into one reusable buffer, with throttling, stats and progress"""
+
+    def __init__(self, f, throttle=None, progress_callback=None, total=0):
+        self.f = f
+        self.throttle = throttle
+        self.progress_callback = progress_callback
+        self.total = total
+        self.bytes_read = 0
+        self._buffer = bytearray(READ_SIZE)
+        self._view = memoryview(self._buffer)
+
+    def blocks(self, start, end):
+        """Yield (offset, memoryview) blocks of [start, end)"""
+        offset = start
+        while offset < end:
+            self.f.seek(offset)
+            count = self.f.readinto(self._view[:min(READ_SIZE, end - offset)])
+            if not count:
+                return
+            if self.throttle is not None:
+                self.throttle.consume(count)
+            self.bytes_read += count
+            if self.progress_callback and self.total > 0:
+                self.progress_callback(min(100, int((self.bytes_read / self.total) * 100)))
+            yield offset, self._view[:count]
+            offset += count
+
+    def digest(self, algorithm, start, end, backend='hashlib'):
+        hash_obj = new_hash(algorithm, backend)
+        for _, block in self.blocks(start, end):
+            hash_obj.update(block)
+        return hash_obj.hexdigest()
+
+
+def _segment_digests(reader, algorithm, start, end, segment, backend='hashlib', prefix_end=None):
+    """
+    Hash [start, end) as segments (start is segment-aligned).
+
+    With prefix_end, the digest of [start, prefix_end) is computed from
+    the same reads.
+
+    Returns:
+        tuple: (complete segment digests, tail digest, prefix digest,
+                bytes hashed)
+    """
+    checkpoints = []
+    count = 0
+    hash_obj = new_hash(algorithm, backend)
+    prefix = new_hash(algorithm, backend) if prefix_end is not None else None
+    boundary = start + segment
+    for offset, block in reader.blocks(start, end):
+        count += len(block)
+        if prefix is not None and offset < prefix_end:
+            prefix.update(block[:prefix_end - offset])
+        while offset + len(block) >= boundary:
+            split = boundary - offset
+            hash_obj.update(block[:split])
+            checkpoints.append(hash_obj.hexdigest())
+            hash_obj = new_hash(algorithm, backend)
+            block, offset, boundary = block[split:], boundary, boundary + segment
+        hash_obj.update(block)
+    return checkpoints, hash_obj.hexdigest(), prefix.hexdigest() if prefix is not None else None, count
+
+
+def append_entry(file_path, algorithm='sha256', segment=DEFAULT_SEGMENT, rotation=DEFAULT_ROTATION,
+                 io_stats=None, throttle=None, backend='hashlib', progress_callback=None, **hash_options):
+    """
+    Hash an append-only file into checkpoints.
+
+    Args:
+        file_path (str): Path to the file
+        algorithm (str): Hash algorithm
+        segment (int): Checkpoint segment size in bytes
+        rotation (int): Runs over which every complete segment is re-read
+        io_stats (IOStats): Optional statistics accumulator
+        throttle (BudgetController): Optional I/O and CPU budget to respect
+        backend (str): Hash implementation (hashlib, kernel)
+        progress_callback (function): Optional callback for progress updates
+        **hash_options: Other generate_file_hash options (ignored; append
+                        entries are always read with positional reads)
+
+    Returns:
+        dict: Baseline entry with hash, size, mtime_ns and "append" state
+    """
+    with open(file_path, "rb", buffering=0) as f:
+        stat_info = os.fstat(f.fileno())
+        reader = _Reader(f, throttle, progress_callback, stat_info.st_size)
+        checkpoints, tail, _, size = _segment_digests(reader, algorithm, 0, stat_info.st_size, segment, backend)
+    if io_stats is not None:
+        io_stats.files += 1
+        io_stats.bytes_read += reader.bytes_read
+        io_stats.logical_bytes += reader.bytes_read
+    return {
+        "hash": root_digest(algorithm, size, checkpoints, tail),
+        "size": size,
+        "mtime_ns": stat_info.st_mtime_ns,
+        "append": {"segment": segment, "rotation": rotation, "run": 0, "checkpoints": checkpoints, "tail": tail},
+    }
+
+
+def verify_append(path, entry, algorithm='sha256', io_stats=None, throttle=None, backend='hashlib',
+                  rotate=False, progress_callback=None, **hash_options):
+    """
+    Verify an append-only file against its checkpoints.
+
+    Args:
+        path (str): File path
+        entry (dict): Baseline entry with "append" state
+        algorithm (str): Algorithm the entry was hashed with
+        io_stats (IOStats): Optional statistics accumulator
+        throttle (BudgetController): Optional I/O and CPU budget to respect
+        backend (str): Hash implementation (hashlib, kernel)
+        rotate (bool): Re-read only this run's share of the complete
+                       segments. Only pass True when the returned "entry"
+                       is written back (update_append_entries); otherwise
+                       the same share would be checked every time
+        progress_callback (function): Optional callback for progress updates
+        **hash_options: Other generate_file_hash options (ignored)
+
+    Returns:
+        dict: verify_entry-style result. "appended" is the number of new
+              bytes; when the recorded prefix is intact the status is ok
+              and "entry" holds the updated entry for the baseline.
+              Truncated files get "truncated" and mismatching segments
+              are listed in "regions" as [offset, length]
+    """
+    from baseline_store import STATUS_OK, STATUS_MODIFIED, STATUS_MISSING, STATUS_ERROR
+
+    result = {"path": path, "status": STATUS_OK, "expected": entry.get("hash"), "actual": None}
+    state = entry["append"]
+    segment, checkpoints = state["segment"], state["checkpoints"]
+    old_size = entry["size"]
+    sealed_end = len(checkpoints) * segment
+    reader = None
+    try:
+        with open(path, "rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            if size < old_size:
+                result["status"] = STATUS_MODIFIED
+                result["truncated"] = True
+                result["regions"] = [[size, old_size - size]]
+                return result
+            reader = _Reader(f, throttle, progress_callback, size)
+            regions = []
+            checkpoints = list(checkpoints)
+            # A rotating share of the sealed prefix is re-read every run
+            rotation, run = state.get("rotation", DEFAULT_ROTATION), state.get("run", 0)
+            if not rotate:
+                rotation = 1
+            for index, expected in enumerate(state["checkpoints"]):
+                if index % rotation == run % rotation:
+                    start = index * segment
+                    checkpoints[index] = reader.digest(algorithm, start, start + segment, backend)
+                    if checkpoints[index] != expected:
+                        regions.append([start, segment])
+            # The tail is re-read in full: its old bytes are checked and the new ones hashed
+            new_checkpoints, tail, old_tail, count = _segment_digests(reader, algorithm, sealed_end, size,
+                                                                      segment, backend, prefix_end=old_size)
+    except FileNotFoundError:
+        result["status"] = STATUS_MISSING
+        return result
+    except Exception as e:
+        result["status"] = STATUS_ERROR
+        result["error"] = str(e)
+        return result
+    finally:
+        if io_stats is not None and reader is not None:
+            io_stats.files += 1
+            io_stats.bytes_read += reader.bytes_read
+            io_stats.logical_bytes += reader.bytes_read
+    size = sealed_end + count
+    if size < old_size:
+        # Truncated while it was read
+        result["status"] = STATUS_MODIFIED
+        result["truncated"] = True
+        result["regions"] = [[size, old_size - size]]
+        return result
+    if old_tail != state["tail"]:
+        regions.append([sealed_end, old_size - sealed_end])
+    checkpoints = checkpoints + new_checkpoints
+    result["actual"] = root_digest(algorithm, size, checkpoints, tail)
+    result["appended"] = size - old_size
+    if regions:
+        result["status"] = STATUS_MODIFIED
+        result["regions"] = regions
+        return result
+    result["entry"] = dict(entry, hash=result["actual"], size=size, mtime_ns=mtime_ns,
+                           append=dict(state, run=run + 1, checkpoints=checkpoints, tail=tail))
+    return result
+
+
+def update_append_entries(baseline_file, updates):
+    """
+    Write the advanced checkpoints of verified append-only files back
+    into a baseline.
+
+    Args:
+        baseline_file (str): Path to the baseline file
+        updates (dict): Path to updated entry ("entry" of verify_append)
+
+    Returns:
+        int: Number of entries updated
+    """
+    from baseline_store import BaselineWriter, read_baseline_header, iter_baseline_entries
+
+    if not updates:
+        return 0
+    header = read_baseline_header(baseline_file)
+    header_fields = {
+        key: value for key, value in header.items()
+        if key not in ("format", "version", "algorithm", "created", "generation")
+    }
+    directory = os.path.dirname(os.path.abspath(baseline_file))
+    fd, temp_file = tempfile.mkstemp(prefix=".baseline-", dir=directory)
+    os.close(fd)
+    updated = 0
+    try:
+        with BaselineWriter(temp_file, header["algorithm"], created=header["created"], **header_fields) as writer:
+            for entry in iter_baseline_entries(baseline_file):
+                path = entry.pop("path")
+                if path in updates:
+                    entry = dict(updates[path])
+                    entry.pop("path", None)
+                    updated += 1
+                writer.write_entry(path, entry)
+        shutil.copymode(baseline_file, temp_file)
+        os.replace(temp_file, baseline_file)
+    except BaseException:
+        os.unlink(temp_file)
+        raise
+    return updated
@@ -0,0 +1,360 @@
+# baseline_store.py
+# Baseline storage for File Integrity Checker
+# Records file hashes and metadata in a streamable JSON Lines format
+
+import json
+import os
+import uuid
+from datetime import datetime
+
+from hash_generator_advanced import file_digest, compare_hashes
+
+
+FORMAT_NAME = "file-integrity-baseline"
+FORMAT_VERSION = 1
+
+# Verification statuses
+STATUS_OK = "ok"
+STATUS_MODIFIED = "modified"
+STATUS_MISSING = "missing"
+STATUS_ERROR = "error"
+
+
+class BaselineWriter:
+    """
+    Write a baseline file one entry at a time.
+
+    The first line of a baseline is a header object describing the
+    baseline, every following line is one file entry. Entries are never
+    held in memory, so baselines of any size can be written.
+
+    Every header gets a random "generation" unless one is passed in.
+    Rewrites that keep the digests pass the old one on; rewrites that
+    change digests leave it out, so rollups of the old version are no
+    longer trusted (see merkle_rollup).
+    """
+
+    def __init__(self, output_file, algorithm='sha256', **header_fields):
+        self.output_file = output_file
+        self.algorithm = algorithm.lower()
+        self.header = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "algorithm": self.algorithm,
+            "created": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "generation": uuid.uuid4().hex,
+        }
+        self.header.update(header_fields)
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        """Open the output file and write the header line"""
+        try:
+            self._file = open(self.output_file, 'w', encoding='utf-8')
+            self._file.write(json.dumps(self.header) + "\n")
+        except Exception as e:
+            raise Exception(f"Failed to write baseline: {str(e)}")
+
+    def write_entry(self, path, entry):
+        """
+        Append one file entry to the baseline.
+
+        Args:
+            path (str): File path the entry describes
+            entry (dict): Entry fields (hash, size, mtime_ns, ...)
+        """
+        record = {"path": path}
+        record.update(entry)
+        self._file.write(json.dumps(record) + "\n")
+        self.count += 1
+
+    def flush(self):
+        """Flush written entries to the output file"""
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """Flush and close the output file"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _new_chunker(algorithm, chunking):
+    """Create a Chunker for baseline chunking parameters"""
+    from content_chunking import Chunker
+    return Chunker(algorithm, chunking["min"], chunking["avg"], chunking["max"])
+
+
+def make_entry(file_path, algorithm='sha256', chunking=None, append=None, **hash_options):
+    """
+    Hash a file and build its baseline entry.
+
+    Args:
+        file_path (str): Path to the file
+        algorithm (str): Hash algorithm to use
+        chunking (dict): Optional content-defined chunking parameters
+                         (see content_chunking.chunking_params)
+        append (dict): Optional append-only parameters (see
+                       append_verify.append_params); matching files get
+                       checkpoints instead of a whole-file digest
+        **hash_options: Extra keyword arguments for generate_file_hash
+
+    Returns:
+        dict: Entry with hash, size, modification time and, with
+              chunking, a "chunks" list of [size, digest] pairs
+    """
+    if append:
+        from append_verify import is_append_only, append_entry
+        if is_append_only(file_path, append):
+            return append_entry(file_path, algorithm, append["segment"], append["rotation"], **hash_options)
+    stat_info = os.stat(file_path)
+    chunker = _new_chunker(algorithm, chunking) if chunking else None
+    entry = {
+        "hash": file_digest(file_path, algorithm, chunker=chunker, **hash_options),
+        "size": stat_info.st_size,
+        "mtime_ns": stat_info.st_mtime_ns,
+    }
+    if chunker is not None:
+        entry["chunks"] = chunker.finish()
+    return entry
+
+
+def read_baseline_header(input_file):
+    """
+    Read only the header of a baseline file.
+
+    Args:
+        input_file (str): Path to the baseline file
+
+    Returns:
+        dict: Header fields
+    """
+    try:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+    except Exception as e:
+        raise Exception(f"Failed to read baseline: {str(e)}")
+    if header.get("format") != FORMAT_NAME:
+        raise ValueError(f"Not a baseline file: {input_file}")
+    return header
+
+
+def iter_baseline_entries(input_file):
+    """
+    Stream the entries of a baseline file.
+
+    Args:
+        input_file (str): Path to the baseline file
+
+    Yields:
+        dict: One entry per file, including its "path"
+    """
+    read_baseline_header(input_file)
+    with open(input_file, 'r', encoding='utf-8') as f:
+        f.readline()
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_baseline(input_file):
+    """
+    Load a whole baseline into memory.
+
+    Args:
+        input_file (str): Path to the baseline file
+
+    Returns:
+        dict: Header fields plus an "entries" dict of path: entry
+    """
+    baseline = dict(read_baseline_header(input_file))
+    entries = {}
+    for record in iter_baseline_entries(input_file):
+        entries[record.pop("path")] = record
+    baseline["entries"] = entries
+    return baseline
+
+
+def save_baseline(baseline, output_file):
+    """
+    Save an in-memory baseline (as returned by load_baseline).
+
+    Args:
+        baseline (dict): Header fields plus an "entries" dict
+        output_file (str): Path to output file
+    """
+    # The header is written on open, so "created" must be passed in up front
+    header_fields = {
+        key: value for key, value in baseline.items()
+        if key not in ("entries", "format", "version", "algorithm", "generation")
+    }
+    with BaselineWriter(output_file, baseline.get("algorithm", "sha256"), **header_fields) as writer:
+        for path, entry in baseline["entries"].items():
+            writer.write_entry(path, entry)
+    return True
+
+
+def _run(file_paths, worker_func, workers=1, layout=None, max_pending=None):
+    """Apply worker_func to every path, in order or through the scheduler"""
+    if workers > 1 or layout is not None:
+        from batch_scheduler import run_scheduled, LAYOUT_INODE
+        return run_scheduled(file_paths, worker_func, workers, layout or LAYOUT_INODE,
+                             max_pending=max_pending)
+    return map(worker_func, file_paths)
+
+
+def create_baseline(file_paths, output_file, algorithm='sha256', result_callback=None,
+                    workers=1, layout=None, chunking=None, memory_budget=None, append=None, **hash_options):
+    """
+    Hash files and stream their entries into a new baseline file.
+
+    Args:
+        file_paths (iterable): File paths to record
+        output_file (str): Path to the baseline file to create
+        algorithm (str): Hash algorithm to use
+        result_callback (function): Optional callback(path, entry, error)
+        workers (int): Number of worker threads
+        layout (str): Optional physical-layout scheduling (none, inode, fiemap)
+        chunking (dict): Optional content-defined chunking parameters;
+                         recorded in the header and used for every entry
+        memory_budget (MemoryBudget): Optional limit for workers and buffers
+        append (dict): Optional append-only parameters; recorded in the
+                       header and used for matching files
+        **hash_options: Extra keyword arguments for generate_file_hash
+
+    Returns:
+        dict: Counts of recorded and failed files
+    """
+    from memory_budget import fit_batch
+    workers, max_pending = fit_batch(memory_budget, workers, hash_options)
+
+    def record(file_path):
+        try:
+            return file_path, make_entry(file_path, algorithm, chunking, append, **hash_options), None
+        except Exception as e:
+            return file_path, None, str(e)
+
+    summary = {"recorded": 0, "errors": 0}
+    header_fields = {"chunking": chunking} if chunking else {}
+    if append:
+        header_fields["append"] = append
+    with BaselineWriter(output_file, algorithm, **header_fields) as writer:
+        for file_path, entry, error in _run(file_paths, record, workers, layout, max_pending):
+            if error is not None:
+                summary["errors"] += 1
+                if result_callback:
+                    result_callback(file_path, None, error)
+                continue
+            writer.write_entry(file_path, entry)
+            summary["recorded"] += 1
+            if result_callback:
+                result_callback(file_path, entry, None)
+    return summary
+
+
+def verify_entry(path, entry, algorithm='sha256', chunking=None, rotate_appends=False, **hash_options):
+    """
+    Verify one file against its baseline entry.
+
+    Args:
+        path (str): File path
+        entry (dict): Baseline entry for the file
+        algorithm (str): Algorithm the entry was hashed with
+        chunking (dict): Chunking parameters of the baseline, if any
+        rotate_appends (bool): Check only this run's share of append-only
+                               entries (see append_verify.verify_append)
+        **hash_options: Extra keyword arguments for generate_file_hash
+
+    Returns:
+        dict: Result with path, status, expected and actual hash. Modified
+              files with a chunk index also get "regions", the
+              [offset, length] byte ranges that changed. Append-only
+              entries are checked incrementally (see append_verify)
+    """
+    if "append" in entry:
+        from append_verify import verify_append
+        return verify_append(path, entry, algorithm, rotate=rotate_appends, **hash_options)
+    result = {"path": path, "status": STATUS_OK, "expected": entry.get("hash"), "actual": None}
+    chunker = _new_chunker(algorithm, chunking) if chunking and "chunks" in entry else None
+    try:
+        result["actual"] = file_digest(path, algorithm, chunker=chunker, **hash_options)
+    except FileNotFoundError:
+        result["status"] = STATUS_MISSING
+        return result
+    except Exception as e:
+        result["status"] = STATUS_ERROR
+        result["error"] = str(e)
+        return result
+    if not compare_hashes(result["expected"], result["actual"]):
+        result["status"] = STATUS_MODIFIED
+        if chunker is not None:
+            from content_chunking import changed_regions
+            result["regions"] = changed_regions(entry["chunks"], chunker.finish())
+    return result
+
+
+def verify_baseline(input_file, workers=1, layout=None, memory_budget=None, rotate_appends=False,
+                    **hash_options):
+    """
+    Verify every file recorded in a baseline.
+
+    Args:
+        input_file (str): Path to the baseline file
+        workers (int): Number of worker threads
+        layout (str): Optional physical-layout scheduling (none, inode, fiemap)
+        memory_budget (MemoryBudget): Optional limit for workers and buffers
+        rotate_appends (bool): Check only this run's share of append-only
+                               entries; pass True only when their returned
+                               "entry" is written back
+        **hash_options: Extra keyword arguments for generate_file_hash
+
+    Yields:
+        dict: One verification result per baseline entry
+    """
+    from memory_budget import fit_batch
+    workers, max_pending = fit_batch(memory_budget, workers, hash_options)
+    header = read_baseline_header(input_file)
+    algorithm = header["algorithm"]
+    chunking = header.get("chunking")
+    if workers == 1 and layout is None:
+        for record in iter_baseline_entries(input_file):
+            yield verify_entry(record["path"], record, algorithm, chunking, rotate_appends, **hash_options)
+        return
+    records = {record["path"]: record for record in iter_baseline_entries(input_file)}
+    yield from _run(records,
+                    lambda path: verify_entry(path, records[path], algorithm, chunking, rotate_appends,
+                                              **hash_options),
+                    workers, layout, max_pending)
+
+
+def diff_baselines(old_file, new_file):
+    """
+    Compare two baseline files.
+
+    Args:
+        old_file (str): Path to the older baseline
+        new_file (str): Path to the newer baseline
+
+    Yields:
+        dict: One change per differing path, with "change" set to
+              added, removed or changed
+    """
+    old_entries = load_baseline(old_file)["entries"]
+    for record in iter_baseline_entries(new_file):
+        path = record["path"]
+        old = old_entries.pop(path, None)
+        if old is None:
+            yield {"path": path, "change": "added", "new": record.get("hash")}
+        elif not compare_hashes(old.get("hash", ""), record.get("hash", "")):
+            yield {"path": path, "change": "changed", "old": old.get("hash"), "new": record.get("hash")}
+    for path, old in old_entries.items():
+        yield {"path": path, "change": "removed", "old": old.get("hash")}
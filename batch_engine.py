@@ -0,0 +1,199 @@
+# batch_engine.py
+# Batch processing engine for File Integrity Checker
+# Hashes many files and streams the results back in small batches
+
+import os
+import tempfile
+import threading
+import time
+import weakref
+from collections import namedtuple
+
+from hash_generator_advanced import file_digest, compare_hashes
+from baseline_store import (BaselineWriter, iter_baseline_entries,
+                            STATUS_OK, STATUS_MODIFIED, STATUS_MISSING, STATUS_ERROR)
+
+
+# One batch result. "hash" is the computed digest (None on error) and
+# "error" holds the error message for failed files.
+BatchResult = namedtuple("BatchResult", ["path", "status", "hash", "error"])
+
+def hash_one(file_path, algorithm='sha256', expected=None, **hash_options):
+    """
+    Hash a single file and classify the outcome.
+
+    Args:
+        file_path (str): Path to the file
+        algorithm (str): Hash algorithm to use
+        expected (str): Optional expected hash to verify against
+        **hash_options: Extra keyword arguments for generate_file_hash
+
+    Returns:
+        BatchResult: Result for the file
+    """
+    try:
+        value = file_digest(file_path, algorithm, **hash_options)
+    except FileNotFoundError as e:
+        status = STATUS_MISSING if expected is not None else STATUS_ERROR
+        return BatchResult(file_path, status, None, str(e))
+    except Exception as e:
+        return BatchResult(file_path, STATUS_ERROR, None, str(e))
+    if expected is not None and not compare_hashes(expected, value):
+        return BatchResult(file_path, STATUS_MODIFIED, value, None)
+    return BatchResult(file_path, STATUS_OK, value, None)
+
+
+def iter_results(file_paths, algorithm='sha256', expected=None, cancel_event=None,
+                 workers=1, layout=None, per_device_limit=None, memory_budget=None, **hash_options):
+    """
+    Hash files, yielding each result as it is ready.
+    
+    With workers=1 and no layout, files are hashed one after another in
+    the given order. Otherwise batch_scheduler orders the files by their
+    physical layout and hashes them on a thread pool, so results arrive
+    in completion order.
+
+    Args:
+        file_paths (iterable): File paths to hash
+        algorithm (str): Hash algorithm to use
+        expected (dict): Optional path: expected hash mapping
+        cancel_event (threading.Event): Optional event that stops the run
+        workers (int): Number of worker threads
+        layout (str): Scheduling layout (none, inode, fiemap)
+        per_device_limit (int): Max concurrent workers per device
+        memory_budget (MemoryBudget): Optional limit that caps the workers,
+                                      read buffers and finished-result queue
+        **hash_options: Extra keyword arguments for generate_file_hash
+
+    Yields:
+        BatchResult: One result per file
+    """
+    from memory_budget import fit_batch
+    workers, max_pending = fit_batch(memory_budget, workers, hash_options)
+    if workers > 1 or layout is not None:
+        from batch_scheduler import run_scheduled, LAYOUT_INODE
+
+        def work(file_path):
+            return hash_one(file_path, algorithm, expected.get(file_path) if expected else None, **hash_options)
+
+        yield from run_scheduled(file_paths, work, workers, layout or LAYOUT_INODE,
+                                 per_device_limit, cancel_event, max_pending)
+        return
+    for file_path in file_paths:
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        yield hash_one(file_path, algorithm, expected.get(file_path) if expected else None, **hash_options)
+
+
+def iter_result_batches(results, batch_size=500, max_delay=0.2):
+    """
+    Group a stream of results into lists for cheap incremental delivery.
+
+    A batch is emitted once it holds batch_size results or once max_delay
+    seconds have passed since the batch was started, whichever comes
+    first, so slow files still show up promptly.
+
+    Args:
+        results (iterable): Stream of results
+        batch_size (int): Maximum results per batch
+        max_delay (float): Maximum seconds to hold a non-empty batch
+
+    Yields:
+        list: Lists of results
+    """
+    batch = []
+    started = time.monotonic()
+    for result in results:
+        if not batch:
+            started = time.monotonic()
+        batch.append(result)
+        if len(batch) >= batch_size or time.monotonic() - started >= max_delay:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+
+def _remove_spill(spill_file):
+    """Delete a spill manifest, if it is still there"""
+    try:
+        os.unlink(spill_file)
+    except OSError:
+        pass
+
+
+class ResultSpool:
+    """
+    Collect batch results, spilling them to a manifest past a threshold.
+
+    The first spill_threshold results stay in memory; later ones are
+    written to a temporary baseline-format manifest and read back when
+    the spool is iterated, so a batch of any size keeps a bounded number
+    of results in RAM. Results come back in the order they were added.
+
+    Args:
+        algorithm (str): Hash algorithm of the results
+        spill_threshold (int): Results kept in memory before spilling
+        temp_dir (str): Directory for the spill manifest (default: system temp)
+    """
+
+    def __init__(self, algorithm='sha256', spill_threshold=10000, temp_dir=None):
+        self.algorithm = algorithm
+        self.spill_threshold = spill_threshold
+        self.temp_dir = temp_dir
+        self.spilled = 0
+        self._results = []
+        self._writer = None
+        self._spill_file = None
+
+    def add(self, result):
+        """Add one BatchResult"""
+        if len(self._results) < self.spill_threshold:
+            self._results.append(result)
+            return
+        if self._writer is None:
+            fd, self._spill_file = tempfile.mkstemp(prefix="integrity-spill-", suffix=".jsonl",
+                                                    dir=self.temp_dir)
+            os.close(fd)
+            self._finalizer = weakref.finalize(self, _remove_spill, self._spill_file)
+            self._writer = BaselineWriter(self._spill_file, self.algorithm)
+            self._writer.open()
+        self._writer.write_entry(result.path, {"status": result.status, "hash": result.hash,
+                                               "error": result.error})
+        self.spilled += 1
+
+    def __len__(self):
+        return len(self._results) + self.spilled
+
+    def __iter__(self):
+        yield from self._results
+        if self._writer is not None:
+            self._writer.flush()
+            for entry in iter_baseline_entries(self._spill_file):
+                yield BatchResult(entry["path"], entry["status"], entry["hash"], entry["error"])
+
+    def items(self):
+        """
+        Yield (path, hash) pairs like batch_hash_files' dictionary.
+
+        Yields:
+            tuple: Path and hex digest, or "Error: ..." for failed files
+        """
+        for result in self:
+            yield result.path, result.hash if result.error is None else f"Error: {result.error}"
+
+    def close(self):
+        """Delete the spill manifest"""
+        if self._writer is not None:
+            self._writer.close()
+            self._finalizer()
+            self._writer = None
+        self._results = []
+        self.spilled = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
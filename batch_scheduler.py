@@ -0,0 +1,284 @@
+# batch_scheduler.py
+# Physical-layout-aware scheduling for the batch engine
+# Orders files by their location on disk and spreads workers across devices
+#
+# Files are grouped by device. Within a device, large files are handed out
+# first, largest first, so the longest jobs start early and the pool
+# finishes evenly; the remaining files follow in on-disk order (FIEMAP
+# extent location where available, otherwise inode number) to turn random
+# seeks into a sweep. Each device has its own concurrency limit, so a slow
+# disk ties up at most that many workers while the rest keep going.
+# Small files are handed out and their results handed back in groups, so
+# trees of tiny files are not throttled by a lock and queue round-trip
+# per file.
+
+import os
+import queue
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no FIEMAP, inode order only
+    fcntl = None
+
+
+# Scheduling layouts
+LAYOUT_NONE = "none"        # Keep the given order
+LAYOUT_INODE = "inode"      # Order by device and inode number
+LAYOUT_FIEMAP = "fiemap"    # Order by physical extent location (Linux)
+LAYOUTS = (LAYOUT_NONE, LAYOUT_INODE, LAYOUT_FIEMAP)
+
+# Files at least this big are scheduled largest-first before the sweep
+LARGE_FILE_SIZE = 64 * 1024 * 1024
+
+# Files smaller than GROUP_FILE_SIZE are handed to a worker up to
+# GROUP_COUNT at a time (and at most GROUP_BYTES together). A worker hands
+# its results over per group, or after EMIT_DELAY seconds, so slow files
+# never hold results back for long.
+GROUP_COUNT = 64
+GROUP_FILE_SIZE = 256 * 1024
+GROUP_BYTES = 4 * 1024 * 1024
+EMIT_DELAY = 0.05
+
+FS_IOC_FIEMAP = 0xC020660B
+_FIEMAP_HEADER = struct.Struct("=QQIIII")
+_FIEMAP_EXTENT = struct.Struct("=QQQQQIIII")
+_UNMAPPED = 1 << 64
+
+# A planned unit of work. "location" is a sort key for the on-disk
+# position, "device" is None for paths that could not be
+# stat'ed; those are still handed to the worker so it can report the error.
+FileTask = namedtuple("FileTask", ["path", "device", "location", "size"])
+
+
+def physical_offset(file_path):
+    """
+    Find the physical disk offset of a file's first extent with FIEMAP.
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        int: Physical byte offset, or None when FIEMAP is not supported
+    """
+    if fcntl is None:
+        return None
+    request = bytearray(_FIEMAP_HEADER.size + _FIEMAP_EXTENT.size)
+    _FIEMAP_HEADER.pack_into(request, 0, 0, 0xFFFFFFFFFFFFFFFF, 0, 0, 1, 0)
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        fcntl.ioctl(fd, FS_IOC_FIEMAP, request, True)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    mapped_extents = _FIEMAP_HEADER.unpack_from(request, 0)[3]
+    if not mapped_extents:
+        return None
+    return _FIEMAP_EXTENT.unpack_from(request, _FIEMAP_HEADER.size)[1]
+
+
+def plan_tasks(file_paths, layout=LAYOUT_INODE, large_file_size=LARGE_FILE_SIZE):
+    """
+    Stat files and arrange them into per-device work queues.
+
+    Args:
+        file_paths (iterable): File paths to schedule
+        layout (str): One of LAYOUTS
+        large_file_size (int): Files this big or bigger go first, largest first
+
+    Returns:
+        dict: Device id (None for unreadable paths) to list of FileTask
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unsupported layout: {layout}")
+    by_device = {}
+    for file_path in file_paths:
+        try:
+            stat_info = os.stat(file_path)
+        except OSError:
+            by_device.setdefault(None, []).append(FileTask(file_path, None, (0, 0), 0))
+            continue
+        location = (0, stat_info.st_ino)
+        if layout == LAYOUT_FIEMAP:
+            # Files without a known extent (inline, delayed allocation)
+            # sort after the mapped ones, by inode
+            offset = physical_offset(file_path)
+            location = (offset, stat_info.st_ino) if offset else (_UNMAPPED, stat_info.st_ino)
+        by_device.setdefault(stat_info.st_dev, []).append(
+            FileTask(file_path, stat_info.st_dev, location, stat_info.st_size)
+        )
+    if layout != LAYOUT_NONE:
+        for device, tasks in by_device.items():
+            if device is None:
+                continue
+            large = sorted((t for t in tasks if t.size >= large_file_size), key=lambda t: -t.size)
+            small = sorted((t for t in tasks if t.size < large_file_size), key=lambda t: t.location)
+            by_device[device] = large + small
+    return by_device
+
+
+class DeviceScheduler:
+    """
+    Hands out FileTasks to worker threads with a per-device concurrency cap.
+
+    A worker asks for the next task with acquire() and reports completion
+    with release(). Among devices with a free slot, the one with the
+    fewest active workers (then the most remaining bytes) is served, so
+    every device keeps making progress.
+    """
+
+    def __init__(self, tasks_by_device, per_device_limit):
+        self._condition = threading.Condition()
+        self._queues = {device: deque(tasks) for device, tasks in tasks_by_device.items()}
+        self._remaining = {device: sum(t.size for t in tasks) for device, tasks in tasks_by_device.items()}
+        self._active = {device: 0 for device in tasks_by_device}
+        self._limit = max(1, per_device_limit)
+        self._closed = False
+        self._waiting = 0
+
+    def acquire_group(self, max_count=1):
+        """
+        Block until work is available, like acquire().
+
+        Consecutive small tasks of one device (see GROUP_FILE_SIZE) are
+        handed out together, up to max_count of them and no more than a
+        fair share of the device's queue; a group takes one device slot.
+
+        Args:
+            max_count (int): Largest group to hand out
+
+        Returns:
+            list: FileTasks to run, then release(); empty when all are
+                  handed out
+        """
+        with self._condition:
+            while not self._closed:
+                candidates = [
+                    device for device, tasks in self._queues.items()
+                    if tasks and self._active[device] < self._limit
+                ]
+                if candidates:
+                    device = min(candidates, key=lambda d: (self._active[d], -self._remaining[d]))
+                    tasks = self._queues[device]
+                    group = [tasks.popleft()]
+                    size = group[0].size
+                    if size < GROUP_FILE_SIZE:
+                        count = min(max_count, -(-(len(tasks) + 1) // self._limit))
+                        while (tasks and len(group) < count and tasks[0].size < GROUP_FILE_SIZE
+                               and size + tasks[0].size <= GROUP_BYTES):
+                            size += tasks[0].size
+                            group.append(tasks.popleft())
+                    self._active[device] += 1
+                    self._remaining[device] -= size
+                    return group
+                if not any(self._queues.values()):
+                    return []
+                self._waiting += 1
+                self._condition.wait()
+                self._waiting -= 1
+            return []
+
+    def acquire(self):
+        """Block until a task is available; return None when all are handed out"""
+        group = self.acquire_group()
+        return group[0] if group else None
+
+    def release(self, task):
+        """Mark a task (or a group, by any of its tasks) as finished, freeing its device slot"""
+        with self._condition:
+            self._active[task.device] -= 1
+            if self._waiting:
+                self._condition.notify_all()
+
+    def close(self):
+        """Stop handing out tasks (used on cancellation)"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+def run_scheduled(file_paths, worker_func, workers=4, layout=LAYOUT_INODE,
+                  per_device_limit=None, cancel_event=None, max_pending=None):
+    """
+    Run worker_func over files with layout-aware ordering and a thread pool.
+
+    Args:
+        file_paths (iterable): File paths to process
+        worker_func (function): Called as worker_func(path); must not raise
+        workers (int): Number of worker threads
+        layout (str): One of LAYOUTS
+        per_device_limit (int): Max concurrent workers per device
+                                (default: workers spread evenly over devices)
+        cancel_event (threading.Event): Optional event that stops the run
+        max_pending (int): Optional cap on finished results waiting for the
+                           consumer (rounded up to whole GROUP_COUNT
+                           groups); workers pause while it is reached
+
+    Yields:
+        Return values of worker_func, in completion order
+    """
+    tasks_by_device = plan_tasks(file_paths, layout)
+    if not tasks_by_device:
+        return
+    devices = sum(1 for device in tasks_by_device if device is not None) or 1
+    if per_device_limit is None:
+        per_device_limit = -(-workers // devices)
+    scheduler = DeviceScheduler(tasks_by_device, per_device_limit)
+    results = queue.Queue(-(-max_pending // GROUP_COUNT) if max_pending else 0)
+    done = object()
+    closed = threading.Event()
+
+    def put(item):
+        # A bounded queue must not block workers after the consumer has gone
+        while not closed.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def work():
+        try:
+            while cancel_event is None or not cancel_event.is_set():
+                group = scheduler.acquire_group(GROUP_COUNT)
+                if not group:
+                    break
+                try:
+                    batch = []
+                    started = time.monotonic()
+                    for task in group:
+                        if cancel_event is not None and cancel_event.is_set():
+                            break
+                        batch.append(worker_func(task.path))
+                        if time.monotonic() - started >= EMIT_DELAY:
+                            put(batch)
+                            batch = []
+                            started = time.monotonic()
+                    if batch:
+                        put(batch)
+                finally:
+                    scheduler.release(group[0])
+        finally:
+            put(done)
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    finished = 0
+    try:
+        while finished < len(threads):
+            batch = results.get()
+            if batch is done:
+                finished += 1
+            else:
+                yield from batch
+    finally:
+        closed.set()
+        scheduler.close()
@@ -0,0 +1,184 @@
+# benchmark.py
+# Hashing benchmarks for File Integrity Checker
+# Measures throughput and CPU use of hash backends and I/O modes
+#
+# Each case hashes the same file with generate_file_hash and records the
+# best wall-clock time of a few repeats, together with the user and
+# system CPU time of that run. Kernel-side hashing (AF_ALG) shows up as
+# system time, so the user/system split shows how much interpreter CPU
+# a backend leaves free for other work. The peak RSS of each case shows
+# what its read buffers cost in memory.
+#
+# benchmark_small_files measures files per second on a tree of small
+# files instead, where per-file system calls rather than bytes dominate.
+
+import os
+import tempfile
+import time
+
+from hash_generator_advanced import generate_file_hash, HASH_BACKENDS
+from memory_budget import peak_rss, reset_peak_rss
+
+
+DEFAULT_SIZE = 256 * 1024 * 1024
+DEFAULT_REPEAT = 3
+DEFAULT_SMALL_FILES = 10000
+DEFAULT_SMALL_SIZE = 4096
+
+
+def make_test_file(size=DEFAULT_SIZE, directory=None):
+    """
+    Write a file of random data to benchmark with.
+
+    Args:
+        size (int): File size in bytes
+        directory (str): Directory for the file (default: system temp)
+
+    Returns:
+        str: Path of the new file (the caller removes it)
+    """
+    fd, path = tempfile.mkstemp(prefix="integrity-bench-", dir=directory)
+    block = os.urandom(min(size, 1024 * 1024))
+    with os.fdopen(fd, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            remaining -= f.write(block[:remaining])
+    return path
+
+
+def time_case(func, repeat=DEFAULT_REPEAT):
+    """
+    Run a benchmark case several times and keep the fastest run.
+
+    Args:
+        func (function): The case; called without arguments
+        repeat (int): Number of runs
+
+    Returns:
+        dict: "seconds", "user_cpu" and "sys_cpu" of the fastest run and
+              "peak_rss", the peak resident set size over all runs (bytes,
+              0 where unknown; without a reset it includes earlier work)
+    """
+    best = None
+    reset_peak_rss()
+    for _ in range(max(1, repeat)):
+        times_before = os.times()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        times_after = os.times()
+        run = {
+            "seconds": elapsed,
+            "user_cpu": times_after.user - times_before.user,
+            "sys_cpu": times_after.system - times_before.system,
+        }
+        if best is None or run["seconds"] < best["seconds"]:
+            best = run
+    best["peak_rss"] = peak_rss()
+    return best
+
+
+def benchmark_hashing(file_path, algorithms=('sha256',), backends=HASH_BACKENDS, io_modes=('buffered',),
+                      repeat=DEFAULT_REPEAT):
+    """
+    Benchmark every combination of algorithm, backend and I/O mode.
+
+    Args:
+        file_path (str): File to hash
+        algorithms (list): Hash algorithms
+        backends (list): Hash backends (hashlib, kernel)
+        io_modes (list): I/O modes
+        repeat (int): Runs per case; the fastest one is reported
+
+    Returns:
+        list: One dict per case with its throughput and CPU times;
+              unavailable backends are reported with "available": False
+    """
+    import kernel_crypto
+
+    size = os.path.getsize(file_path)
+    results = []
+    for algorithm in algorithms:
+        for backend in backends:
+            for io_mode in io_modes:
+                case = {"algorithm": algorithm, "backend": backend, "io_mode": io_mode, "bytes": size}
+                if backend == 'kernel' and not kernel_crypto.available(algorithm):
+                    case["available"] = False
+                    results.append(case)
+                    continue
+                case["available"] = True
+                case.update(time_case(
+                    lambda: generate_file_hash(file_path, algorithm, io_mode=io_mode, backend=backend), repeat))
+                case["mb_per_s"] = size / case["seconds"] / (1024 * 1024) if case["seconds"] else 0.0
+                results.append(case)
+    return results
+
+
+def make_small_files(count=DEFAULT_SMALL_FILES, size=DEFAULT_SMALL_SIZE, directory=None):
+    """
+    Write a tree of small random files to benchmark with.
+
+    Files are spread over subdirectories of 1000 files each.
+
+    Args:
+        count (int): Number of files
+        size (int): Size of every file in bytes
+        directory (str): Parent directory for the tree (default: system temp)
+
+    Returns:
+        tuple: (root directory, list of file paths); the caller removes
+               the directory
+    """
+    root = tempfile.mkdtemp(prefix="integrity-bench-", dir=directory)
+    paths = []
+    for index in range(count):
+        subdirectory = os.path.join(root, f"{index // 1000:04d}")
+        if index % 1000 == 0:
+            os.mkdir(subdirectory)
+        path = os.path.join(subdirectory, f"{index:07d}")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        paths.append(path)
+    return root, paths
+
+
+def benchmark_small_files(file_paths, algorithm='sha256', workers=(1,), repeat=DEFAULT_REPEAT):
+    """
+    Measure files per second on small files.
+
+    Compares generate_file_hash per file, hash_regular_file (the
+    single-read path of the batch engine, baseline and verify) and the
+    batch engine with each worker count.
+
+    Args:
+        file_paths (list): Small files to hash
+        algorithm (str): Hash algorithm
+        workers (list): Worker counts to run the batch engine with
+        repeat (int): Runs per case; the fastest one is reported
+
+    Returns:
+        list: One dict per case with "method", "workers", "files",
+              "files_per_s" and the time_case measurements
+    """
+    from batch_engine import iter_results
+    from hash_generator_advanced import hash_regular_file
+
+    def per_file():
+        for path in file_paths:
+            generate_file_hash(path, algorithm)
+
+    def fast_path():
+        for path in file_paths:
+            hash_regular_file(path, algorithm)
+
+    cases = [("generate_file_hash", 1, per_file), ("hash_regular_file", 1, fast_path)]
+    for count in workers:
+        cases.append(("batch engine", count,
+                      lambda count=count: sum(1 for _ in iter_results(file_paths, algorithm, workers=count))))
+    results = []
+    for method, count, func in cases:
+        case = {"method": method, "workers": count, "algorithm": algorithm, "files": len(file_paths)}
+        case.update(time_case(func, repeat))
+        case["files_per_s"] = len(file_paths) / case["seconds"] if case["seconds"] else 0.0
+        results.append(case)
+    return results
@@ -0,0 +1,194 @@
+# checksum_files.py
+# Checksum file support for File Integrity Checker
+# Reads and writes md5sum/sha*sum (GNU) and BSD-tag checksum files
+#
+# Supported line formats:
+#   GNU:  <hex>  <path>        (text mode)
+#         <hex> *<path>        (binary mode)
+#   BSD:  SHA256 (<path>) = <hex>
+# A leading backslash marks a GNU or BSD line whose file name contains a
+# backslash or newline, escaped as \\ and \n, exactly as coreutils does.
+# GNU lines carry no algorithm name; it is taken from the digest length
+# unless given explicitly. Files are streamed line by line, so
+# million-line files are never held in memory by the reader.
+
+import os
+import sys
+from collections import namedtuple
+
+from batch_engine import hash_one
+
+
+# Digest length in hex characters for each algorithm
+DIGEST_LENGTHS = {'md5': 32, 'sha1': 40, 'sha256': 64, 'sha512': 128}
+ALGORITHM_BY_LENGTH = {length: algorithm for algorithm, length in DIGEST_LENGTHS.items()}
+BSD_TAGS = {algorithm.upper(): algorithm for algorithm in DIGEST_LENGTHS}
+
+# One parsed line. "line" is its line number in the checksum file.
+ChecksumEntry = namedtuple("ChecksumEntry", ["path", "algorithm", "hash", "line"])
+
+_UNESCAPES = {"\\": "\\", "n": "\n", "r": "\r"}
+
+
+def _unescape(name):
+    """Undo coreutils file name escaping (\\\\, \\n, \\r)"""
+    parts = []
+    index = 0
+    while True:
+        backslash = name.find("\\", index)
+        if backslash < 0 or backslash + 1 >= len(name):
+            parts.append(name[index:])
+            return "".join(parts)
+        parts.append(name[index:backslash])
+        parts.append(_UNESCAPES.get(name[backslash + 1], name[backslash:backslash + 2]))
+        index = backslash + 2
+
+
+def parse_checksum_line(line, algorithm=None):
+    """
+    Parse one line of a GNU or BSD-tag checksum file.
+
+    Args:
+        line (str): The line (trailing newline allowed)
+        algorithm (str): Algorithm of GNU lines (default: from digest length)
+
+    Returns:
+        ChecksumEntry: Parsed entry (line number 0), or None if malformed
+    """
+    line = line.rstrip("\r\n")
+    escaped = line.startswith("\\")
+    if escaped:
+        line = line[1:]
+
+    paren = line.find(" (")
+    tag = line[:paren] if paren > 0 else None
+    if tag in BSD_TAGS:
+        end = line.rfind(") = ")
+        if end < paren:
+            return None
+        line_algorithm = BSD_TAGS[tag]
+        if algorithm is not None and line_algorithm != algorithm:
+            return None
+        path = line[paren + 2:end]
+        digest = line[end + 4:]
+    else:
+        space = line.find(" ")
+        if space <= 0 or line[space + 1:space + 2] not in (" ", "*"):
+            return None
+        digest = line[:space]
+        path = line[space + 2:]
+        line_algorithm = algorithm or ALGORITHM_BY_LENGTH.get(len(digest))
+
+    if not path or DIGEST_LENGTHS.get(line_algorithm) != len(digest):
+        return None
+    try:
+        bytes.fromhex(digest)
+    except ValueError:
+        return None
+    if escaped:
+        path = _unescape(path)
+    return ChecksumEntry(path, line_algorithm, digest.lower(), 0)
+
+
+def format_checksum_line(path, algorithm, digest, tag=False):
+    """
+    Format one checksum line the way md5sum/sha*sum write it.
+
+    Args:
+        path (str): File path
+        algorithm (str): Hash algorithm of the digest
+        digest (str): Hexadecimal digest
+        tag (bool): Write a BSD-style tagged line
+
+    Returns:
+        str: The line, without a trailing newline
+    """
+    prefix = ""
+    if "\\" in path or "\n" in path or "\r" in path:
+        prefix = "\\"
+        path = path.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+    if tag:
+        return f"{prefix}{algorithm.upper()} ({path}) = {digest}"
+    return f"{prefix}{digest}  {path}"
+
+
+class ChecksumReader:
+    """
+    Stream the entries of a checksum file.
+
+    Iterating yields one ChecksumEntry per well-formed line; the number of
+    malformed lines is counted in .malformed.
+
+    Args:
+        input_file (str): Path to the checksum file ("-" for stdin)
+        algorithm (str): Algorithm of GNU lines (default: from digest length)
+    """
+
+    def __init__(self, input_file, algorithm=None):
+        self.input_file = input_file
+        self.algorithm = algorithm.lower() if algorithm else None
+        self.malformed = 0
+
+    def __iter__(self):
+        if self.input_file == "-":
+            stream = open(sys.stdin.fileno(), "r", encoding="utf-8", errors="surrogateescape",
+                          newline="\n", closefd=False)
+        else:
+            stream = open(self.input_file, "r", encoding="utf-8", errors="surrogateescape", newline="\n")
+        with stream:
+            for number, line in enumerate(stream, 1):
+                entry = parse_checksum_line(line, self.algorithm)
+                if entry is None:
+                    if line.strip():
+                        self.malformed += 1
+                    continue
+                yield entry._replace(line=number)
+
+
+def verify_checksums(entries, workers=1, layout=None, base_dir=None, cancel_event=None, memory_budget=None,
+                     **hash_options):
+    """
+    Verify checksum file entries, in parallel through the batch scheduler.
+
+    With workers=1 and no layout the entries are streamed in file order.
+    In parallel mode the entries are collected first (the scheduler orders
+    them by disk location); every line naming the same file is checked
+    by one task, so results match the serial run.
+
+    Args:
+        entries (iterable): ChecksumEntry objects (e.g. a ChecksumReader)
+        workers (int): Number of worker threads
+        layout (str): Optional physical-layout scheduling (none, inode, fiemap)
+        base_dir (str): Directory relative paths are resolved against
+                        (default: current directory, like sha256sum -c)
+        cancel_event (threading.Event): Optional event that stops the run
+        memory_budget (MemoryBudget): Optional limit for workers and buffers
+        **hash_options: Extra keyword arguments for generate_file_hash
+
+    Yields:
+        BatchResult: One result per entry, reporting the path as listed
+    """
+    from memory_budget import fit_batch
+    workers, max_pending = fit_batch(memory_budget, workers, hash_options)
+
+    def resolve(path):
+        return os.path.join(base_dir, path) if base_dir else path
+
+    def check(entry):
+        result = hash_one(resolve(entry.path), entry.algorithm, entry.hash, **hash_options)
+        return result._replace(path=entry.path)
+
+    if workers <= 1 and layout is None:
+        for entry in entries:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            yield check(entry)
+        return
+
+    from batch_scheduler import run_scheduled, LAYOUT_INODE
+    listed = {}
+    for entry in entries:
+        listed.setdefault(resolve(entry.path), []).append(entry)
+    for results in run_scheduled(listed, lambda path: [check(entry) for entry in listed[path]], workers,
+                                 layout or LAYOUT_INODE, cancel_event=cancel_event, max_pending=max_pending):
+        yield from results
@@ -0,0 +1,285 @@
+# content_chunking.py
+# Content-defined chunking for File Integrity Checker
+# Splits files into chunks whose boundaries follow the content (FastCDC style)
+#
+# A whole-file digest only says that a file changed. With a chunk index in
+# the baseline, re-verification can say where: boundaries are placed where
+# a rolling Gear hash of the last 32 bytes matches a mask, so an insertion
+# or deletion only disturbs the chunks around it and every other chunk
+# keeps its digest. The same index gives a cheap deduplication estimate.
+#
+# The boundary scan is vectorized with numpy when it is installed. Without
+# numpy it is batched over Python integers instead: every byte becomes a
+# 64-bit lane of one large integer, so each step of the window sum is a
+# single shift and add over a whole block rather than a loop over its
+# bytes. Both find exactly the same boundaries; numpy is several times
+# faster.
+
+import hashlib
+from bisect import bisect_left
+
+from hash_generator_advanced import new_hash
+
+try:
+    import numpy
+except ImportError:  # Optional: batched integer boundary scan
+    numpy = None
+
+
+MIN_SIZE = 2 * 1024
+AVG_SIZE = 8 * 1024
+MAX_SIZE = 64 * 1024
+SCAN_BLOCK = 4 * 1024 * 1024     # Bytes buffered before each boundary scan
+LANE_BLOCK = 64 * 1024           # Bytes per integer in the scan without numpy
+
+WINDOW = 32                      # Bytes that influence a 32-bit Gear hash
+_HASH_MASK = 0xFFFFFFFF
+
+# Fixed pseudo-random Gear table; part of the chunk format, never change it
+GEAR = [int.from_bytes(hashlib.sha256(b"gear" + bytes([value])).digest()[:4], "little")
+        for value in range(256)]
+_gear_array = None
+# Byte k of every Gear value, as bytes.translate tables
+_GEAR_BYTES = [bytes((value >> (8 * k)) & 0xFF for value in GEAR) for k in range(4)]
+_lane_constants = {}
+
+
+def chunking_params(min_size=MIN_SIZE, avg_size=AVG_SIZE, max_size=MAX_SIZE):
+    """
+    Build the chunking parameters recorded in a baseline header.
+
+    Args:
+        min_size (int): Smallest chunk (except the last one of a file)
+        avg_size (int): Target average chunk size
+        max_size (int): Largest chunk
+
+    Returns:
+        dict: "min", "avg" and "max" sizes in bytes
+    """
+    if not 0 < min_size <= avg_size <= max_size:
+        raise ValueError(f"Invalid chunk sizes: {min_size}/{avg_size}/{max_size}")
+    return {"min": min_size, "avg": avg_size, "max": max_size}
+
+
+def _masks(avg_size):
+    """
+    FastCDC normalized chunking masks: a stricter mask below the average
+    size and a looser one above it. Only the high bits are used because
+    they depend on the full 32-byte window.
+    """
+    bits = max(avg_size.bit_length() - 1, 3)
+    strict = ((1 << (bits + 2)) - 1) << (32 - bits - 2)
+    loose = ((1 << (bits - 2)) - 1) << (32 - bits + 2)
+    return strict, loose
+
+
+def _scan_numpy(context, data, strict_mask, loose_mask):
+    """Vectorized Gear hash over context + data; returns candidate positions"""
+    global _gear_array
+    if _gear_array is None:
+        _gear_array = numpy.array(GEAR, dtype=numpy.uint32)
+    values = numpy.frombuffer(bytes(context) + bytes(data), dtype=numpy.uint8)
+    hashes = _gear_array[values]
+    # h[i] = sum(G[b[i-k]] << k for k < 32), built by doubling the window
+    span = 1
+    while span < WINDOW:
+        hashes[span:] = hashes[span:] + (hashes[:-span] << numpy.uint32(span))
+        span *= 2
+    hashes = hashes[len(context):]
+    loose = numpy.flatnonzero((hashes & numpy.uint32(loose_mask)) == 0)
+    strict = loose[(hashes[loose] & numpy.uint32(strict_mask)) == 0]
+    return strict.tolist(), loose.tolist()
+
+
+def _scan_lanes(data, skip, strict_mask, loose_mask):
+    """
+    Gear hash of every byte of data as 64-bit lanes of one integer.
+
+    Lane i starts as G[b[i]]; the window sum is built by doubling, like
+    _scan_numpy, with a shift by whole lanes plus the bit shift. A full
+    window sum stays below 2**64, so lanes never carry into each other.
+
+    Returns:
+        tuple: strict and loose candidate positions, minus skip (the
+               context bytes at the start of data)
+    """
+    count = len(data)
+    lanes = bytearray(8 * count)
+    for k in range(4):
+        lanes[k::8] = data.translate(_GEAR_BYTES[k])
+    hashes = int.from_bytes(lanes, "little")
+    span = 1
+    while span < WINDOW:
+        hashes += hashes << (span * 65)
+        span *= 2
+    key = (count, loose_mask)
+    if key not in _lane_constants:
+        _lane_constants.clear()
+        ones = int.from_bytes(b"\x01\0\0\0\0\0\0\0" * count, "little")
+        _lane_constants[key] = (ones, ones * loose_mask, ones * _HASH_MASK)
+    ones, loose_masks, low_masks = _lane_constants[key]
+    # Adding 2**32 - 1 sets bit 32 of every lane whose masked hash is not zero
+    nonzero = (((hashes & loose_masks) + low_masks) >> 32) & ones
+    flags = (nonzero ^ ones).to_bytes(8 * count, "little")
+    strict, loose = [], []
+    raw = None
+    index = flags.find(1, 8 * skip)
+    while index >= 0:
+        if raw is None:
+            raw = (hashes & ((1 << (64 * count)) - 1)).to_bytes(8 * count, "little")
+        loose.append(index // 8 - skip)
+        if not int.from_bytes(raw[index:index + 4], "little") & strict_mask:
+            strict.append(index // 8 - skip)
+        index = flags.find(1, index + 8)
+    return strict, loose
+
+
+def _scan_batched(context, data, strict_mask, loose_mask):
+    """Gear hash over context + data in LANE_BLOCK steps; returns candidate positions"""
+    data = bytes(data)
+    strict, loose = [], []
+    for start in range(0, len(data), LANE_BLOCK):
+        # Each block is scanned with the WINDOW - 1 bytes before it
+        head = (bytes(context) + data[max(0, start - WINDOW):start])[-(WINDOW - 1):]
+        block_strict, block_loose = _scan_lanes(head + data[start:start + LANE_BLOCK], len(head),
+                                                strict_mask, loose_mask)
+        strict.extend(position + start for position in block_strict)
+        loose.extend(position + start for position in block_loose)
+    return strict, loose
+
+
+_scan = _scan_numpy if numpy is not None else _scan_batched
+
+
+class Chunker:
+    """
+    Streaming content-defined chunker.
+
+    Feed file data in any block sizes with update(); finish() returns the
+    chunk list. Boundaries only depend on the content, never on how the
+    data was split into blocks.
+
+    Args:
+        algorithm (str): Hash algorithm for chunk digests
+        min_size (int): Smallest chunk
+        avg_size (int): Target average chunk size
+        max_size (int): Largest chunk
+    """
+
+    def __init__(self, algorithm='sha256', min_size=MIN_SIZE, avg_size=AVG_SIZE, max_size=MAX_SIZE):
+        chunking_params(min_size, avg_size, max_size)
+        self.algorithm = algorithm
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        self._strict_mask, self._loose_mask = _masks(avg_size)
+        self._pending = bytearray()
+        self._context = b""
+        self.chunks = []
+
+    def update(self, data):
+        """Add the next block of file data"""
+        self._pending += data
+        if len(self._pending) >= SCAN_BLOCK:
+            self._cut(eof=False)
+
+    def finish(self):
+        """
+        Cut the remaining data and return the chunk list.
+
+        Returns:
+            list: [size, hex digest] per chunk, in file order
+        """
+        self._cut(eof=True)
+        return self.chunks
+
+    def _cut(self, eof):
+        """Emit every chunk whose end can be decided from the pending data"""
+        pending = self._pending
+        strict, loose = _scan(self._context, pending, self._strict_mask, self._loose_mask)
+        start = 0
+        with memoryview(pending) as view:
+            while start < len(pending):
+                remaining = len(pending) - start
+                cut = None
+                if remaining > self.min_size:
+                    # Positions are the last byte of a candidate chunk
+                    index = bisect_left(strict, start + self.min_size - 1)
+                    if index < len(strict) and strict[index] < start + self.avg_size - 1:
+                        cut = strict[index] + 1
+                    else:
+                        index = bisect_left(loose, start + self.avg_size - 1)
+                        if index < len(loose) and loose[index] < start + self.max_size - 1:
+                            cut = loose[index] + 1
+                if cut is None:
+                    if remaining >= self.max_size:
+                        cut = start + self.max_size
+                    elif eof:
+                        cut = len(pending)
+                    else:
+                        break
+                digest = new_hash(self.algorithm)
+                digest.update(view[start:cut])
+                self.chunks.append([cut - start, digest.hexdigest()])
+                start = cut
+        self._context = (bytes(self._context) + bytes(pending[max(0, start - WINDOW):start]))[-(WINDOW - 1):]
+        del pending[:start]
+
+
+def changed_regions(old_chunks, new_chunks):
+    """
+    Find the byte ranges of a file that are not in its recorded chunk list.
+
+    Chunks of the current file whose digest does not appear in the old
+    chunk list are merged into contiguous regions.
+
+    Args:
+        old_chunks (list): [size, digest] pairs from the baseline
+        new_chunks (list): [size, digest] pairs of the current file
+
+    Returns:
+        list: [offset, length] of every changed region in the current file
+    """
+    known = {digest for _, digest in old_chunks}
+    regions = []
+    offset = 0
+    for size, digest in new_chunks:
+        if digest not in known:
+            if regions and regions[-1][0] + regions[-1][1] == offset:
+                regions[-1][1] += size
+            else:
+                regions.append([offset, size])
+        offset += size
+    return regions
+
+
+def dedup_estimate(entries):
+    """
+    Estimate how much space deduplication would save, from chunk indexes.
+
+    Args:
+        entries (iterable): Baseline entries that carry a "chunks" list
+
+    Returns:
+        dict: Total and unique bytes and chunks, and the dedup ratio
+    """
+    seen = {}
+    total_bytes = total_chunks = files = 0
+    for entry in entries:
+        chunks = entry.get("chunks")
+        if chunks is None:
+            continue
+        files += 1
+        for size, digest in chunks:
+            total_bytes += size
+            total_chunks += 1
+            seen.setdefault(digest, size)
+    unique_bytes = sum(seen.values())
+    return {
+        "files": files,
+        "chunks": total_chunks,
+        "unique_chunks": len(seen),
+        "total_bytes": total_bytes,
+        "unique_bytes": unique_bytes,
+        "ratio": total_bytes / unique_bytes if unique_bytes else 1.0,
+    }
@@ -0,0 +1,151 @@
+# content_compare.py
+# Direct content comparison for File Integrity Checker
+# Compares two files or two directory trees byte for byte, stopping early
+#
+# For mirror verification a direct comparison is much cheaper than two
+# full digests: files whose sizes differ are reported without reading a
+# byte, and equal-sized files are read side by side (the second side on a
+# helper thread) in chunks, stopping at the first chunk that differs.
+
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from hash_generator_advanced import iter_regular_files
+from baseline_store import STATUS_OK, STATUS_MODIFIED, STATUS_MISSING, STATUS_ERROR
+
+
+CHUNK_SIZE = 1024 * 1024
+
+# One comparison outcome. "path" is relative to the tree roots (or the
+# first file for a plain file comparison), "detail" explains the status.
+ComparisonResult = namedtuple("ComparisonResult", ["path", "status", "detail"])
+
+_reader_pool = None
+
+
+def _get_reader_pool():
+    """Shared helper threads that read the second side of comparisons"""
+    global _reader_pool
+    if _reader_pool is None:
+        _reader_pool = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 2),
+                                          thread_name_prefix="compare-reader")
+    return _reader_pool
+
+
+def _first_difference(chunk_a, chunk_b):
+    """Locate the first differing byte of two chunks by bisection"""
+    low, high = 0, min(len(chunk_a), len(chunk_b))
+    while high - low > 64:
+        middle = (low + high) // 2
+        if chunk_a[low:middle] == chunk_b[low:middle]:
+            low = middle
+        else:
+            high = middle
+    while low < high and chunk_a[low] == chunk_b[low]:
+        low += 1
+    return low
+
+
+def compare_files(path_a, path_b, chunk_size=CHUNK_SIZE, label=None):
+    """
+    Compare the contents of two files, stopping at the first difference.
+
+    Args:
+        path_a (str): First file
+        path_b (str): Second file
+        chunk_size (int): Bytes compared per step
+        label (str): Path to report in the result (default: path_a)
+
+    Returns:
+        ComparisonResult: STATUS_OK when identical, STATUS_MODIFIED with the
+                          offset of the first difference, or STATUS_ERROR
+    """
+    label = label or path_a
+    try:
+        with open(path_a, "rb", buffering=0) as file_a, open(path_b, "rb", buffering=0) as file_b:
+            size_a = os.fstat(file_a.fileno()).st_size
+            size_b = os.fstat(file_b.fileno()).st_size
+            if size_a != size_b:
+                return ComparisonResult(label, STATUS_MODIFIED, f"size differs: {size_a} vs {size_b} bytes")
+            # Each side is read sequentially by exactly one thread
+            pool = _get_reader_pool() if size_a > chunk_size else None
+            offset = 0
+            while True:
+                if pool is not None:
+                    pending = pool.submit(file_b.read, chunk_size)
+                    chunk_a = file_a.read(chunk_size)
+                    chunk_b = pending.result()
+                else:
+                    chunk_a = file_a.read(chunk_size)
+                    chunk_b = file_b.read(chunk_size)
+                if chunk_a != chunk_b:
+                    position = offset + _first_difference(chunk_a, chunk_b)
+                    return ComparisonResult(label, STATUS_MODIFIED, f"content differs at byte {position}")
+                if not chunk_a:
+                    return ComparisonResult(label, STATUS_OK, "identical")
+                offset += len(chunk_a)
+    except OSError as e:
+        return ComparisonResult(label, STATUS_ERROR, str(e))
+
+
+def _relative_files(root):
+    """Set of file paths below root, relative to root"""
+    return {os.path.relpath(path, root) for path in iter_regular_files(root)}
+
+
+def compare_trees(root_a, root_b, workers=4, layout=None, cancel_event=None, chunk_size=CHUNK_SIZE):
+    """
+    Compare two directory trees, streaming results as they are found.
+
+    Files present on only one side are reported first; common files are
+    then compared in parallel through the batch scheduler.
+
+    Args:
+        root_a (str): First tree
+        root_b (str): Second tree
+        workers (int): Number of files compared at once
+        layout (str): Scheduling layout for side A (none, inode, fiemap)
+        cancel_event (threading.Event): Optional event that stops the run
+        chunk_size (int): Bytes compared per step
+
+    Yields:
+        ComparisonResult: One result per file (relative path)
+    """
+    from batch_scheduler import run_scheduled, LAYOUT_INODE
+
+    files_a = _relative_files(root_a)
+    files_b = _relative_files(root_b)
+    for relative in sorted(files_a - files_b):
+        yield ComparisonResult(relative, STATUS_MISSING, f"only in {root_a}")
+    for relative in sorted(files_b - files_a):
+        yield ComparisonResult(relative, STATUS_MISSING, f"only in {root_b}")
+
+    prefix_length = len(os.path.join(root_a, ""))
+
+    def work(path_a):
+        relative = path_a[prefix_length:]
+        return compare_files(path_a, os.path.join(root_b, relative), chunk_size, label=relative)
+
+    common = (os.path.join(root_a, relative) for relative in sorted(files_a & files_b))
+    yield from run_scheduled(common, work, workers, layout or LAYOUT_INODE, cancel_event=cancel_event)
+
+
+def compare_paths(path_a, path_b, workers=4, layout=None, cancel_event=None):
+    """
+    Compare two files or two directory trees.
+
+    Args:
+        path_a (str): First file or directory
+        path_b (str): Second file or directory
+        workers (int): Number of files compared at once (trees only)
+        layout (str): Scheduling layout (trees only)
+        cancel_event (threading.Event): Optional event that stops the run
+
+    Yields:
+        ComparisonResult: One result per compared file
+    """
+    if os.path.isdir(path_a) and os.path.isdir(path_b):
+        yield from compare_trees(path_a, path_b, workers, layout, cancel_event)
+    else:
+        yield compare_files(path_a, path_b)
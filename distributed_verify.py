@@ -0,0 +1,453 @@
+# distributed_verify.py
+# Distributed verification for File Integrity Checker
+# A coordinator hands out baseline entries to workers on other machines
+#
+# The coordinator splits a baseline into work units (contiguous ranges of
+# entries, bounded by count and bytes) and serves them over TCP as JSON
+# lines. Workers pull a unit, verify its files against shared storage and
+# stream results back in small batches. When the queue runs dry, an idle
+# worker steals the unprocessed second half of the busiest unit; the
+# victim learns its new end from the next acknowledgement. Units of a
+# worker that disconnects or stops reporting are re-queued, and results
+# are de-duplicated per entry, so every file is reported exactly once.
+#
+# The protocol has no encryption; run it on a trusted network and use a
+# shared token to keep strangers out. The coordinator only listens on
+# loopback addresses without a token, and it only accepts results for
+# entries of the unit it handed to that connection, with the path and
+# expected digest taken from its own baseline.
+
+import hmac
+import ipaddress
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+
+from baseline_store import (
+    read_baseline_header,
+    iter_baseline_entries,
+    verify_entry,
+    STATUS_OK,
+    STATUS_MODIFIED,
+    STATUS_MISSING,
+    STATUS_ERROR,
+)
+from hash_generator_advanced import compare_hashes
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7311
+UNIT_SIZE = 256                      # Entries per work unit
+UNIT_BYTES = 4 * 1024 ** 3           # Bytes of file data per work unit
+MIN_STEAL = 4                        # Smallest range worth stealing
+RESULT_BATCH = 64                    # Results per message from a worker
+RESULT_INTERVAL = 0.25               # Seconds before a partial batch is sent
+HEARTBEAT_INTERVAL = 5.0             # Seconds between worker messages at most
+LEASE_TIMEOUT = 60.0                 # Silent workers lose their unit after this
+MAX_ATTEMPTS = 3                     # Re-queues before entries are reported as errors
+WAIT_DELAY = 0.5                     # Idle worker poll interval
+
+
+def _send(stream, message):
+    """Write one JSON line message"""
+    stream.write((json.dumps(message) + "\n").encode("utf-8"))
+    stream.flush()
+
+
+def _receive(stream):
+    """Read one JSON line message"""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    return json.loads(line)
+
+
+def parse_address(address, default_host=DEFAULT_HOST):
+    """
+    Split "host:port" (or ":port", "port") into a (host, port) tuple.
+
+    Args:
+        address (str): Address string
+        default_host (str): Host used when none is given
+
+    Returns:
+        tuple: (host, port)
+    """
+    host, _, port = address.rpartition(":")
+    try:
+        return host or default_host, int(port)
+    except ValueError:
+        raise ValueError(f"Invalid address: {address}")
+
+
+def is_loopback(host):
+    """
+    Check whether a listen address only accepts local connections.
+
+    Args:
+        host (str): Host name or IP address ("" and 0.0.0.0 mean all)
+
+    Returns:
+        bool: True if every address the host resolves to is a loopback one
+    """
+    if not host:
+        return False
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except OSError:
+        return False
+    return bool(addresses) and all(ipaddress.ip_address(address.split("%")[0]).is_loopback
+                                   for address in addresses)
+
+
+class _Lease:
+    """A work unit handed out to one worker: entries [start, end)"""
+
+    def __init__(self, unit_id, start, end, attempts, worker):
+        self.unit_id = unit_id
+        self.start = start
+        self.end = end
+        self.attempts = attempts
+        self.worker = worker
+        self.limit = end              # End as handed out; steals only shrink end
+        self.progress = start         # First index not yet reported
+        self.shrunk = False           # End moved by a steal, tell the worker
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serves one worker connection"""
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        self.request.settimeout(coordinator.lease_timeout)
+        lease = None
+        coordinator._connection_opened()
+        try:
+            hello = _receive(self.rfile)
+            if hello.get("type") != "hello" or not coordinator._check_token(hello.get("token")):
+                _send(self.wfile, {"type": "error", "error": "authentication failed"})
+                return
+            worker = hello.get("worker") or "%s:%d" % self.client_address
+            _send(self.wfile, {"type": "welcome", "algorithm": coordinator.algorithm,
+                               "chunking": coordinator.chunking})
+            while True:
+                message = _receive(self.rfile)
+                kind = message.get("type")
+                if kind == "request":
+                    if lease is not None:
+                        coordinator._release(lease)
+                        lease = None
+                    reply, lease = coordinator._assign(worker)
+                    _send(self.wfile, reply)
+                    if reply["type"] == "finished":
+                        return
+                elif kind in ("results", "heartbeat") and lease is not None:
+                    end = coordinator._record(lease, message.get("results", []))
+                    _send(self.wfile, {"type": "ack", "end": end})
+                else:
+                    _send(self.wfile, {"type": "error", "error": f"unexpected message: {kind}"})
+                    return
+        except (OSError, ValueError):
+            pass
+        finally:
+            if lease is not None:
+                coordinator._release(lease)
+            coordinator._connection_closed()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Coordinator:
+    """
+    Serves the entries of a baseline to verification workers.
+
+    Args:
+        baseline_file (str): Baseline to verify
+        host (str): Address to listen on
+        port (int): TCP port (0 picks a free one, see .address)
+        unit_size (int): Entries per work unit
+        unit_bytes (int): File bytes per work unit
+        token (str): Shared secret workers must present (None = no check,
+                     only allowed on loopback addresses)
+        lease_timeout (float): Seconds of worker silence before its unit is re-queued
+    """
+
+    def __init__(self, baseline_file, host=DEFAULT_HOST, port=DEFAULT_PORT, unit_size=UNIT_SIZE,
+                 unit_bytes=UNIT_BYTES, token=None, lease_timeout=LEASE_TIMEOUT):
+        if not token and not is_loopback(host):
+            raise ValueError(f"Refusing to listen on {host or 'all interfaces'} without a token: "
+                             f"anyone who can connect could report results")
+        header = read_baseline_header(baseline_file)
+        self.algorithm = header["algorithm"]
+        self.chunking = header.get("chunking")
+        self.entries = list(iter_baseline_entries(baseline_file))
+        self.token = token or None
+        self.lease_timeout = lease_timeout
+        self._lock = threading.Lock()
+        self._done = bytearray(len(self.entries))
+        self._remaining = len(self.entries)
+        self._queue = deque((start, end, 0) for start, end in self._split(unit_size, unit_bytes))
+        self._leases = {}
+        self._next_unit = 0
+        self._connections = 0
+        self._results = queue.Queue()
+        self._server = _Server((host, port), _Handler)
+        self._server.coordinator = self
+        self.address = self._server.server_address[:2]
+        self.stats = {"units": 0, "steals": 0, "requeued": 0}
+
+    def _split(self, unit_size, unit_bytes):
+        """Cut the entry list into ranges bounded by count and bytes"""
+        start = 0
+        size = 0
+        for index, entry in enumerate(self.entries):
+            size += entry.get("size") or 0
+            if index + 1 - start >= unit_size or size >= unit_bytes:
+                yield start, index + 1
+                start = index + 1
+                size = 0
+        if start < len(self.entries):
+            yield start, len(self.entries)
+
+    def _check_token(self, token):
+        if self.token is None:
+            return True
+        return isinstance(token, str) and hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    def _connection_opened(self):
+        with self._lock:
+            self._connections += 1
+
+    def _connection_closed(self):
+        with self._lock:
+            self._connections -= 1
+
+    def _new_lease(self, start, end, attempts, worker):
+        lease = _Lease(self._next_unit, start, end, attempts, worker)
+        self._next_unit += 1
+        self._leases[lease.unit_id] = lease
+        self.stats["units"] += 1
+        return lease
+
+    def _unit_message(self, lease):
+        return {"type": "unit", "unit": lease.unit_id, "start": lease.start, "end": lease.end,
+                "entries": self.entries[lease.start:lease.end]}
+
+    def _assign(self, worker):
+        """Pick the next unit for a worker; returns (reply, lease or None)"""
+        with self._lock:
+            while self._queue:
+                start, end, attempts = self._queue.popleft()
+                # Skip what a previous holder already reported
+                while start < end and self._done[start]:
+                    start += 1
+                if start < end:
+                    lease = self._new_lease(start, end, attempts, worker)
+                    return self._unit_message(lease), lease
+            if not self._remaining:
+                return {"type": "finished"}, None
+            # Queue is empty: steal the second half of the busiest unit
+            victim = max(self._leases.values(), key=lambda l: l.end - l.progress, default=None)
+            if victim is not None and victim.end - victim.progress >= 2 * MIN_STEAL:
+                split = victim.progress + (victim.end - victim.progress) // 2
+                lease = self._new_lease(split, victim.end, victim.attempts, worker)
+                victim.end = split
+                victim.shrunk = True
+                self.stats["steals"] += 1
+                return self._unit_message(lease), lease
+            return {"type": "wait", "delay": WAIT_DELAY}, None
+
+    def _accept(self, entry, result):
+        """
+        A worker's result, checked against the baseline entry.
+
+        Returns:
+            dict: The result to report, or None if it is malformed
+        """
+        if not isinstance(result, dict):
+            return None
+        status = result.get("status")
+        if status not in (STATUS_OK, STATUS_MODIFIED, STATUS_MISSING, STATUS_ERROR):
+            return None
+        # Plain entries can only be ok with the recorded digest
+        if status == STATUS_OK and "append" not in entry and not compare_hashes(
+                str(result.get("actual")), entry.get("hash") or ""):
+            return None
+        return dict(result, path=entry["path"], expected=entry.get("hash"))
+
+    def _record(self, lease, results):
+        """Accept results for a lease; returns the lease's end if it changed"""
+        with self._lock:
+            remaining = self._remaining
+            for result in results if isinstance(results, list) else []:
+                index = result.pop("index", None) if isinstance(result, dict) else None
+                # Only entries of this connection's unit, each reported once
+                if not isinstance(index, int) or not lease.start <= index < lease.limit or self._done[index]:
+                    continue
+                result = self._accept(self.entries[index], result)
+                if result is None:
+                    continue
+                self._done[index] = 1
+                self._remaining -= 1
+                lease.progress = max(lease.progress, index + 1)
+                self._results.put(result)
+            if remaining and not self._remaining:
+                self._results.put(None)
+            if lease.shrunk:
+                lease.shrunk = False
+                return lease.end
+            return None
+
+    def _release(self, lease):
+        """End a lease; whatever it did not report goes back on the queue"""
+        with self._lock:
+            if self._leases.pop(lease.unit_id, None) is None:
+                return
+            index = lease.start
+            while index < lease.end:
+                if self._done[index]:
+                    index += 1
+                    continue
+                run_start = index
+                while index < lease.end and not self._done[index]:
+                    index += 1
+                if lease.attempts + 1 >= MAX_ATTEMPTS:
+                    self._fail(run_start, index, lease.worker)
+                else:
+                    self._queue.appendleft((run_start, index, lease.attempts + 1))
+                    self.stats["requeued"] += 1
+
+    def _fail(self, start, end, worker):
+        """Report entries no worker managed to verify (lock held)"""
+        if not self._remaining:
+            return
+        for index in range(start, end):
+            entry = self.entries[index]
+            self._done[index] = 1
+            self._remaining -= 1
+            self._results.put({"path": entry["path"], "status": STATUS_ERROR,
+                               "expected": entry.get("hash"), "actual": None,
+                               "error": f"gave up after {MAX_ATTEMPTS} failed attempts (last worker: {worker})"})
+        if not self._remaining:
+            self._results.put(None)
+
+    def start(self):
+        """Start serving workers in a background thread"""
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        if not self.entries:
+            self._results.put(None)
+
+    def results(self):
+        """
+        Wait for the workers and stream their verification results.
+
+        Yields:
+            dict: One verify_entry result per baseline entry, in arrival
+                  order, with the reporting "worker" added
+        """
+        while True:
+            result = self._results.get()
+            if result is None:
+                return
+            yield result
+
+    def close(self, grace=2.0):
+        """Stop serving, giving connected workers a moment to be told to exit"""
+        deadline = time.monotonic() + grace
+        while self._connections and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def run_worker(address, name=None, token=None, path_map=None, connect_timeout=30.0, **hash_options):
+    """
+    Verify work units from a coordinator until it reports that all are done.
+
+    Args:
+        address (tuple): Coordinator (host, port)
+        name (str): Worker name shown in results (default: host name and pid)
+        token (str): Shared secret expected by the coordinator
+        path_map (tuple): Optional (prefix, replacement) for locally mounted paths
+        connect_timeout (float): Seconds to keep retrying the first connection
+        **hash_options: Extra keyword arguments for generate_file_hash
+
+    Returns:
+        dict: Counts of units and files processed by this worker
+    """
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            connection = socket.create_connection(address)
+            break
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.5)
+
+    stats = {"units": 0, "files": 0}
+    with connection, connection.makefile("rwb") as stream:
+        _send(stream, {"type": "hello", "worker": name, "token": token})
+        welcome = _receive(stream)
+        if welcome.get("type") != "welcome":
+            raise Exception(f"Coordinator refused worker: {welcome.get('error')}")
+        algorithm = welcome["algorithm"]
+        chunking = welcome.get("chunking")
+
+        while True:
+            _send(stream, {"type": "request"})
+            reply = _receive(stream)
+            if reply["type"] == "finished":
+                return stats
+            if reply["type"] == "wait":
+                time.sleep(reply.get("delay", WAIT_DELAY))
+                continue
+            if reply["type"] != "unit":
+                raise Exception(f"Coordinator error: {reply.get('error')}")
+
+            start, entries = reply["start"], reply["entries"]
+            unit = {"end": reply["end"], "pending": [], "sent": time.monotonic()}
+
+            def flush():
+                message = "results" if unit["pending"] else "heartbeat"
+                _send(stream, {"type": message, "unit": reply["unit"], "results": unit["pending"]})
+                ack = _receive(stream)
+                if ack.get("end") is not None:
+                    unit["end"] = min(unit["end"], ack["end"])
+                unit["pending"] = []
+                unit["sent"] = time.monotonic()
+
+            def keep_alive(progress):
+                # Long files: keep the lease alive from inside the hashing loop
+                if time.monotonic() - unit["sent"] >= HEARTBEAT_INTERVAL:
+                    flush()
+
+            index = start
+            while index < unit["end"]:
+                entry = entries[index - start]
+                path = entry["path"]
+                if path_map and path.startswith(path_map[0]):
+                    path = path_map[1] + path[len(path_map[0]):]
+                result = verify_entry(path, entry, algorithm, chunking,
+                                      progress_callback=keep_alive, **hash_options)
+                result["path"] = entry["path"]
+                result["index"] = index
+                result["worker"] = name
+                unit["pending"].append(result)
+                stats["files"] += 1
+                index += 1
+                # Frequent reports keep steals accurate: the ack carries the new end
+                if len(unit["pending"]) >= RESULT_BATCH or time.monotonic() - unit["sent"] >= RESULT_INTERVAL:
+                    flush()
+            if unit["pending"]:
+                flush()
+            stats["units"] += 1
@@ -5,10 +5,191 @@
 import hashlib
 import os
 import json
+import stat
+import threading
 from datetime import datetime
 
 
-def generate_file_hash(file_path, algorithm='sha256', progress_callback=None):
+# Supported hash algorithms
+HASH_ALGORITHMS = {
+    'md5': hashlib.md5,
+    'sha1': hashlib.sha1,
+    'sha256': hashlib.sha256,
+    'sha512': hashlib.sha512
+}
+
+# Hash implementations:
+#   hashlib - Python's hashlib (default)
+#   kernel  - Linux kernel crypto API over AF_ALG, falls back to hashlib
+HASH_BACKENDS = ('hashlib', 'kernel')
+
+# Supported ways of reading file data:
+#   buffered - ordinary reads through the page cache (default)
+#   nocache  - sequential readahead, read pages dropped from the cache again
+#   direct   - O_DIRECT reads that bypass the page cache
+#   sparse   - read only data extents (SEEK_DATA), holes hashed as zeros
+IO_MODES = ('buffered', 'nocache', 'direct', 'sparse')
+
+# Files up to this size are hashed from a single read (see hash_regular_file)
+SMALL_FILE_SIZE = 64 * 1024
+
+_read_buffers = threading.local()
+
+
+class IOStats:
+    """
+    Accumulates I/O statistics over one or more hashed files.
+    
+    Pass an instance as io_stats to generate_file_hash. With
+    measure_cache=True the page cache residency of every file is also
+    sampled before and after it is hashed.
+    """
+    
+    def __init__(self, measure_cache=False):
+        self.measure_cache = measure_cache
+        self.files = 0
+        self.bytes_read = 0
+        self.logical_bytes = 0
+        self.cache_before = 0
+        self.cache_after = 0
+        
+    def summary(self):
+        """Return the statistics as a dictionary"""
+        result = {"files": self.files, "bytes_read": self.bytes_read, "logical_bytes": self.logical_bytes}
+        if self.measure_cache:
+            result["cache_before"] = self.cache_before
+            result["cache_after"] = self.cache_after
+            result["cache_growth"] = self.cache_after - self.cache_before
+        return result
+
+
+class FileRecord:
+    """
+    Compact per-file record: raw stat fields and the binary digest.
+    
+    Records are meant to be kept by the million, so nothing is formatted
+    up front. Names, dates and the hex digest are produced only when they
+    are accessed for display or export.
+    """
+    
+    __slots__ = ("path", "size", "mtime_ns", "ctime_ns", "algorithm", "digest", "error")
+    
+    def __init__(self, path, size=0, mtime_ns=0, ctime_ns=0, algorithm=None, digest=None, error=None):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.ctime_ns = ctime_ns
+        self.algorithm = algorithm
+        self.digest = digest
+        self.error = error
+        
+    @classmethod
+    def from_stat(cls, path, stat_info):
+        """Build a record from an os.stat / os.fstat result"""
+        return cls(path, stat_info.st_size, stat_info.st_mtime_ns, stat_info.st_ctime_ns)
+        
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+        
+    @property
+    def extension(self):
+        return os.path.splitext(self.name)[1]
+        
+    @property
+    def hexdigest(self):
+        return self.digest.hex() if self.digest is not None else None
+        
+    @property
+    def modified(self):
+        return datetime.fromtimestamp(self.mtime_ns / 1e9).strftime('%Y-%m-%d %H:%M:%S')
+        
+    @property
+    def created(self):
+        return datetime.fromtimestamp(self.ctime_ns / 1e9).strftime('%Y-%m-%d %H:%M:%S')
+        
+    def to_dict(self):
+        """Return the formatted fields (get_file_info keys, plus hash or error)"""
+        result = {
+            "name": self.name,
+            "size": self.size,
+            "path": self.path,
+            "modified": self.modified,
+            "created": self.created,
+            "extension": self.extension
+        }
+        if self.digest is not None:
+            result[self.algorithm] = self.hexdigest
+        if self.error is not None:
+            result["error"] = self.error
+        return result
+        
+    def __repr__(self):
+        return f"FileRecord({self.path!r}, size={self.size}, {self.algorithm}={self.hexdigest})"
+
+
+def new_hash(algorithm, backend='hashlib'):
+    """
+    Create a fresh hash object for an algorithm name.
+    
+    Args:
+        algorithm (str): Hash algorithm (md5, sha1, sha256, sha512)
+        backend (str): One of HASH_BACKENDS; "kernel" falls back to
+                       hashlib where AF_ALG is not available
+        
+    Returns:
+        Hash object with update() and hexdigest()
+    """
+    if backend not in HASH_BACKENDS:
+        raise ValueError(f"Unsupported hash backend: {backend}")
+    try:
+        factory = HASH_ALGORITHMS[algorithm.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    if backend == 'kernel':
+        import kernel_crypto
+        if kernel_crypto.available(algorithm):
+            return kernel_crypto.KernelHash(algorithm)
+    return factory()
+
+
+def iter_file_chunks(file_path, io_mode='buffered', counter=None, chunk_size=None):
+    """
+    Read a file chunk by chunk using the given I/O mode.
+    
+    Args:
+        file_path (str): Path to the file
+        io_mode (str): One of IO_MODES
+        counter (ExtentCounter): Optional read/hole byte counter (sparse mode)
+        chunk_size (int): Read size for nocache/direct/sparse (default 1 MiB)
+        
+    Yields:
+        bytes-like: File data; only valid until the next chunk is read
+    """
+    if io_mode == 'buffered':
+        with open(file_path, "rb") as f:
+            # Read file in chunks to handle large files efficiently
+            while True:
+                byte_block = f.read(4096)
+                if not byte_block:
+                    break
+                yield byte_block
+    elif io_mode == 'nocache':
+        from page_cache import iter_chunks_nocache, CHUNK_SIZE
+        yield from iter_chunks_nocache(file_path, chunk_size or CHUNK_SIZE)
+    elif io_mode == 'direct':
+        from page_cache import iter_chunks_direct, CHUNK_SIZE
+        yield from iter_chunks_direct(file_path, chunk_size or CHUNK_SIZE)
+    elif io_mode == 'sparse':
+        from sparse_io import iter_chunks_sparse, CHUNK_SIZE
+        yield from iter_chunks_sparse(file_path, chunk_size or CHUNK_SIZE, counter)
+    else:
+        raise ValueError(f"Unsupported I/O mode: {io_mode}")
+
+
+def generate_file_hash(file_path, algorithm='sha256', progress_callback=None,
+                       io_mode='buffered', io_stats=None, throttle=None, chunker=None,
+                       pipeline=False, backend='hashlib', buffer_size=None, digest_cache=None):
     """
     Generate hash for a given file using specified algorithm.
     
@@ -16,43 +197,103 @@ def generate_file_hash(file_path, algorithm='sha256', progress_callback=None):
         file_path (str): Path to the file to hash
         algorithm (str): Hash algorithm (md5, sha1, sha256, sha512)
         progress_callback (function): Optional callback for progress updates
+        io_mode (str): How to read the file (buffered, nocache, direct, sparse)
+        io_stats (IOStats): Optional statistics accumulator
+        throttle (BudgetController): Optional I/O and CPU budget to respect
+        chunker (Chunker): Optional content-defined chunker fed the same data
+        pipeline (bool): Read on a separate thread so reads overlap hashing
+        backend (str): Hash implementation (hashlib, kernel)
+        buffer_size (int): Read buffer size for pipelined, nocache, direct
+                           and sparse reads (default 1 MiB)
+        digest_cache (XattrCache): Optional cache consulted before reading
+                                   and updated afterwards
         
     Returns:
         str: Hexadecimal hash of the file
     """
     # Select hash algorithm
-    hash_algorithms = {
-        'md5': hashlib.md5(),
-        'sha1': hashlib.sha1(),
-        'sha256': hashlib.sha256(),
-        'sha512': hashlib.sha512()
-    }
-    
-    if algorithm.lower() not in hash_algorithms:
-        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    hash_obj = new_hash(algorithm, backend)
+    if io_mode not in IO_MODES:
+        raise ValueError(f"Unsupported I/O mode: {io_mode}")
     
-    hash_obj = hash_algorithms[algorithm.lower()]
+    measure_cache = io_stats is not None and io_stats.measure_cache
+    counter = None
+    if io_mode == 'sparse':
+        from sparse_io import ExtentCounter
+        counter = ExtentCounter()
     
     try:
-        file_size = os.path.getsize(file_path)
+        stat_info = os.stat(file_path)
+        # Opening a FIFO would block forever; devices never end
+        if not stat.S_ISREG(stat_info.st_mode):
+            raise Exception(f"Not a regular file: {file_path}")
+        if digest_cache is not None and chunker is None:
+            cached = digest_cache.lookup(file_path, algorithm, stat_info)
+            if cached is not None:
+                if hasattr(hash_obj, "close"):
+                    hash_obj.close()
+                return cached
+        file_size = stat_info.st_size
         bytes_read = 0
         
-        with open(file_path, "rb") as f:
-            # Read file in chunks to handle large files efficiently
-            while True:
-                byte_block = f.read(4096)
-                if not byte_block:
-                    break
-                    
+        if measure_cache:
+            from page_cache import cache_footprint
+            cache_before = cache_footprint(file_path) or 0
+        
+        def on_count(count):
+            nonlocal bytes_read
+            bytes_read += count
+            
+            # Update progress if callback provided
+            if progress_callback and file_size > 0:
+                progress = int((bytes_read / file_size) * 100)
+                progress_callback(progress)
+        
+        def on_data(byte_block):
+            if chunker is not None:
+                chunker.update(byte_block)
+            on_count(len(byte_block))
+        
+        if hasattr(hash_obj, "splice_from") and io_mode == 'buffered' and chunker is None and not pipeline:
+            # Kernel backend: file data goes straight from the page cache to
+            # the kernel hash and never enters a Python buffer
+            def on_splice(count):
+                if throttle is not None:
+                    throttle.consume(count)
+                on_count(count)
+            with open(file_path, "rb", buffering=0) as f:
+                hash_obj.splice_from(f.fileno(), on_splice)
+        elif pipeline:
+            from hash_pipeline import pipelined_hash
+            pipeline_options = {"buffer_size": buffer_size} if buffer_size else {}
+            pipelined_hash(file_path, [hash_obj], io_mode, on_data=on_data, throttle=throttle,
+                           counter=counter, **pipeline_options)
+        else:
+            charged = 0
+            for byte_block in iter_file_chunks(file_path, io_mode, counter, buffer_size):
                 hash_obj.update(byte_block)
-                bytes_read += len(byte_block)
-                
-                # Update progress if callback provided
-                if progress_callback and file_size > 0:
-                    progress = int((bytes_read / file_size) * 100)
-                    progress_callback(progress)
-                    
-        return hash_obj.hexdigest()
+                if throttle is not None:
+                    if counter is None:
+                        throttle.consume(len(byte_block))
+                    else:
+                        # Synthesized holes do not count against the read budget
+                        throttle.consume(counter.data_bytes - charged)
+                        charged = counter.data_bytes
+                on_data(byte_block)
+        
+        if io_stats is not None:
+            io_stats.files += 1
+            # Holes of sparse files are hashed but never read
+            io_stats.bytes_read += counter.data_bytes if counter is not None else bytes_read
+            io_stats.logical_bytes += bytes_read
+            if measure_cache:
+                io_stats.cache_before += cache_before
+                io_stats.cache_after += cache_footprint(file_path) or 0
+        
+        digest = hash_obj.hexdigest()
+        if digest_cache is not None:
+            digest_cache.store(file_path, algorithm, stat_info, digest)
+        return digest
         
     except FileNotFoundError:
         raise FileNotFoundError(f"File not found: {file_path}")
@@ -62,10 +303,112 @@ def generate_file_hash(file_path, algorithm='sha256', progress_callback=None):
         raise Exception(f"Error reading file: {str(e)}")
 
 
+def hash_regular_file(file_path, algorithm='sha256', io_stats=None, throttle=None):
+    """
+    Hash a regular file with as few system calls as possible.
+
+    The file is opened with O_NOATIME (where allowed) and O_NONBLOCK, so
+    a FIFO or device cannot block the open, checked with fstat on the
+    open descriptor and read with readv into a per-thread buffer of
+    SMALL_FILE_SIZE bytes, so a small file takes one read and one hash
+    update. Larger files are read on from the same descriptor.
+
+    Args:
+        file_path (str): Path to the file
+        algorithm (str): Hash algorithm to use
+        io_stats (IOStats): Optional statistics accumulator
+        throttle (BudgetController): Optional I/O and CPU budget to respect
+
+    Returns:
+        str: Hexadecimal hash
+
+    Raises:
+        Exception: If the path is not a regular file
+    """
+    hash_obj = new_hash(algorithm)
+    flags = os.O_RDONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_NONBLOCK", 0)
+    noatime = getattr(os, "O_NOATIME", 0)
+    total = 0
+    try:
+        try:
+            fd = os.open(file_path, flags | noatime)
+        except PermissionError:
+            if not noatime:
+                raise
+            # O_NOATIME is only allowed on our own files
+            fd = os.open(file_path, flags)
+        try:
+            if not stat.S_ISREG(os.fstat(fd).st_mode):
+                raise Exception(f"Not a regular file: {file_path}")
+            buffer = getattr(_read_buffers, "buffer", None)
+            if buffer is None:
+                buffer = _read_buffers.buffer = memoryview(bytearray(SMALL_FILE_SIZE))
+            while True:
+                if hasattr(os, "readv"):
+                    count = os.readv(fd, [buffer])
+                else:
+                    data = os.read(fd, len(buffer))
+                    count = len(data)
+                    buffer[:count] = data
+                hash_obj.update(buffer[:count])
+                total += count
+                if throttle is not None:
+                    throttle.consume(count)
+                # A short read of a regular file is its end
+                if count < len(buffer):
+                    break
+        finally:
+            os.close(fd)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File not found: {file_path}")
+    except PermissionError:
+        raise PermissionError(f"Permission denied: {file_path}")
+    except OSError as e:
+        raise Exception(f"Error reading file: {str(e)}")
+    if io_stats is not None:
+        io_stats.files += 1
+        io_stats.bytes_read += total
+        io_stats.logical_bytes += total
+    return hash_obj.hexdigest()
+
+
+def _plain_read_options(hash_options):
+    """Check whether generate_file_hash options allow hash_regular_file"""
+    io_stats = hash_options.get("io_stats")
+    return (hash_options.get("io_mode", "buffered") == "buffered"
+            and hash_options.get("backend", "hashlib") == "hashlib"
+            and not hash_options.get("pipeline")
+            and hash_options.get("chunker") is None
+            and hash_options.get("digest_cache") is None
+            and hash_options.get("progress_callback") is None
+            and (io_stats is None or not io_stats.measure_cache))
+
+
+def file_digest(file_path, algorithm='sha256', **hash_options):
+    """
+    Hash a file with hash_regular_file when the options are the plain
+    defaults, otherwise with generate_file_hash.
+
+    Args:
+        file_path (str): Path to the file
+        algorithm (str): Hash algorithm to use
+        **hash_options: Extra keyword arguments for generate_file_hash
+
+    Returns:
+        str: Hexadecimal hash of the file
+    """
+    if _plain_read_options(hash_options):
+        return hash_regular_file(file_path, algorithm, hash_options.get("io_stats"), hash_options.get("throttle"))
+    return generate_file_hash(file_path, algorithm, **hash_options)
+
+
 def generate_multiple_hashes(file_path, algorithms=['md5', 'sha1', 'sha256', 'sha512'], progress_callback=None):
     """
     Generate multiple hash values for a file.
     
+    The file is read once; every algorithm hashes the same buffers on its
+    own thread while the next block is being read.
+    
     Args:
         file_path (str): Path to the file
         algorithms (list): List of algorithms to use
@@ -74,19 +417,67 @@ def generate_multiple_hashes(file_path, algorithms=['md5', 'sha1', 'sha256', 'sh
     Returns:
         dict: Dictionary of algorithm: hash pairs
     """
+    from hash_pipeline import pipelined_hash
+    
     results = {}
-    total_algorithms = len(algorithms)
+    hashers = {}
+    for algorithm in algorithms:
+        try:
+            hashers[algorithm.upper()] = new_hash(algorithm)
+        except ValueError as e:
+            results[algorithm.upper()] = f"Error: {str(e)}"
     
-    for idx, algorithm in enumerate(algorithms):
+    if hashers:
         try:
-            results[algorithm.upper()] = generate_file_hash(file_path, algorithm)
-            if progress_callback:
-                progress = int(((idx + 1) / total_algorithms) * 100)
-                progress_callback(progress)
+            file_size = os.path.getsize(file_path)
+            bytes_read = 0
+            
+            def on_data(byte_block):
+                nonlocal bytes_read
+                bytes_read += len(byte_block)
+                if progress_callback and file_size > 0:
+                    progress_callback(int((bytes_read / file_size) * 100))
+            
+            pipelined_hash(file_path, list(hashers.values()), on_data=on_data)
+            for name, hash_obj in hashers.items():
+                results[name] = hash_obj.hexdigest()
         except Exception as e:
-            results[algorithm.upper()] = f"Error: {str(e)}"
+            for name in hashers:
+                results[name] = f"Error: {str(e)}"
             
-    return results
+    return {algorithm.upper(): results[algorithm.upper()] for algorithm in algorithms}
+
+
+def hash_file_record(file_path, algorithm='sha256', chunk_size=1024 * 1024):
+    """
+    Hash a file into a FileRecord.
+    
+    The stat fields come from fstat on the descriptor being hashed, so
+    they describe exactly the file that was read and cost no extra path
+    lookup. The read buffer is sized to the file, so small files take a
+    single read into a small buffer.
+    
+    Args:
+        file_path (str): Path to the file
+        algorithm (str): Hash algorithm to use
+        chunk_size (int): Largest read size
+        
+    Returns:
+        FileRecord: Record with the binary digest
+    """
+    hash_obj = new_hash(algorithm)
+    with open(file_path, "rb", buffering=0) as f:
+        record = FileRecord.from_stat(file_path, os.fstat(f.fileno()))
+        buffer = bytearray(max(1, min(record.size + 1, chunk_size)))
+        view = memoryview(buffer)
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            hash_obj.update(view[:count])
+    record.algorithm = algorithm.lower()
+    record.digest = hash_obj.digest()
+    return record
 
 
 def compare_hashes(original_hash, new_hash):
@@ -113,33 +504,32 @@ def get_file_info(file_path):
     Returns:
         dict: File information including size, name, dates
     """
-    if os.path.exists(file_path):
-        stat_info = os.stat(file_path)
-        file_size = stat_info.st_size
-        file_name = os.path.basename(file_path)
-        
-        return {
-            "name": file_name,
-            "size": file_size,
-            "path": file_path,
-            "modified": datetime.fromtimestamp(stat_info.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-            "created": datetime.fromtimestamp(stat_info.st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
-            "extension": os.path.splitext(file_name)[1]
-        }
-    return None
+    try:
+        return FileRecord.from_stat(file_path, os.stat(file_path)).to_dict()
+    except OSError:
+        return None
 
 
 def export_hashes_to_file(hash_data, output_file):
     """
     Export hash data to a JSON file.
     
+    Files not ending in .json are written as BSD-style checksum lines
+    instead, which sha256sum -c and friends can verify directly.
+    
     Args:
         hash_data (dict): Hash data to export
         output_file (str): Path to output file
     """
     try:
-        with open(output_file, 'w') as f:
-            json.dump(hash_data, f, indent=4)
+        if output_file.lower().endswith('.json'):
+            with open(output_file, 'w') as f:
+                json.dump(hash_data, f, indent=4)
+        else:
+            from checksum_files import format_checksum_line
+            with open(output_file, 'w', encoding='utf-8', errors='surrogateescape', newline='\n') as f:
+                for algorithm, digest in hash_data['hashes'].items():
+                    f.write(format_checksum_line(hash_data['file'], algorithm, digest, tag=True) + "\n")
         return True
     except Exception as e:
         raise Exception(f"Failed to export hashes: {str(e)}")
@@ -149,6 +539,10 @@ def import_hashes_from_file(input_file):
     """
     Import hash data from a JSON file.
     
+    md5sum/sha*sum and BSD-tag checksum files are accepted too; the
+    hashes of the first file listed are returned, keyed by upper-case
+    algorithm name, and every listed file under 'files'.
+    
     Args:
         input_file (str): Path to input file
         
@@ -158,21 +552,49 @@ def import_hashes_from_file(input_file):
     try:
         with open(input_file, 'r') as f:
             return json.load(f)
+    except ValueError:
+        pass
     except Exception as e:
         raise Exception(f"Failed to import hashes: {str(e)}")
+    
+    try:
+        from checksum_files import ChecksumReader
+        files = {}
+        for entry in ChecksumReader(input_file):
+            files.setdefault(entry.path, {})[entry.algorithm.upper()] = entry.hash
+    except Exception as e:
+        raise Exception(f"Failed to import hashes: {str(e)}")
+    if not files:
+        raise Exception("Failed to import hashes: no JSON data or checksum lines found")
+    first = next(iter(files))
+    return {'file': first, 'hashes': files[first], 'files': files}
 
 
-def batch_hash_files(file_paths, algorithm='sha256'):
+def batch_hash_files(file_paths, algorithm='sha256', workers=1, layout=None, memory_budget=None):
     """
     Generate hashes for multiple files.
     
     Args:
         file_paths (list): List of file paths
         algorithm (str): Hash algorithm to use
+        workers (int): Number of worker threads
+        layout (str): Optional physical-layout scheduling (none, inode, fiemap)
+        memory_budget (MemoryBudget): Optional memory limit for workers and
+                                      read buffers (see batch_hash_files_spooled
+                                      to bound the results too)
         
     Returns:
         dict: Dictionary of file paths and their hashes
     """
+    if workers > 1 or layout is not None or memory_budget is not None:
+        from batch_engine import iter_results
+        # Keep the caller's order in the returned dictionary
+        results = dict.fromkeys(file_paths)
+        for result in iter_results(results, algorithm, workers=workers, layout=layout,
+                                   memory_budget=memory_budget):
+            results[result.path] = result.hash if result.error is None else f"Error: {result.error}"
+        return results
+    
     results = {}
     for file_path in file_paths:
         try:
@@ -180,3 +602,124 @@ def batch_hash_files(file_paths, algorithm='sha256'):
         except Exception as e:
             results[file_path] = f"Error: {str(e)}"
     return results
+
+
+def batch_hash_files_spooled(file_paths, algorithm='sha256', workers=1, layout=None, memory_budget=None,
+                             spill_threshold=None):
+    """
+    Hash multiple files into a ResultSpool instead of a dictionary.
+    
+    Args:
+        file_paths (list): List of file paths
+        algorithm (str): Hash algorithm to use
+        workers (int): Number of worker threads
+        layout (str): Optional physical-layout scheduling (none, inode, fiemap)
+        memory_budget (MemoryBudget): Optional memory limit; also sets the
+                                      default spill threshold
+        spill_threshold (int): Results kept in memory before the rest go
+                               to a temporary manifest
+        
+    Returns:
+        ResultSpool: BatchResults in completion order (.items() yields
+                     path and hash pairs); close it to delete the manifest
+    """
+    from batch_engine import iter_results, ResultSpool
+    if spill_threshold is None:
+        spill_threshold = memory_budget.plan(workers)["spill_threshold"] if memory_budget is not None else 10000
+    spool = ResultSpool(algorithm, spill_threshold)
+    try:
+        for result in iter_results(file_paths, algorithm, workers=workers, layout=layout,
+                                   memory_budget=memory_budget):
+            spool.add(result)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+def iter_file_records(file_paths, algorithm='sha256', workers=1, layout=None):
+    """
+    Hash many files into compact FileRecords.
+    
+    Unlike batch_hash_files no dictionary of hex strings is built; records
+    are streamed and can be kept, written out or dropped by the caller.
+    
+    Args:
+        file_paths (iterable): File paths
+        algorithm (str): Hash algorithm to use
+        workers (int): Number of worker threads
+        layout (str): Optional physical-layout scheduling (none, inode, fiemap)
+        
+    Yields:
+        FileRecord: One record per file (error set when it could not be
+                    read); in completion order when run in parallel
+    """
+    def record(file_path):
+        try:
+            return hash_file_record(file_path, algorithm)
+        except Exception as e:
+            return FileRecord(file_path, algorithm=algorithm.lower(), error=str(e))
+    
+    if workers > 1 or layout is not None:
+        from batch_scheduler import run_scheduled, LAYOUT_INODE
+        yield from run_scheduled(file_paths, record, workers, layout or LAYOUT_INODE)
+    else:
+        yield from map(record, file_paths)
+
+
+def iter_regular_files(root):
+    """
+    Walk a directory tree for regular files (or symlinks to them).
+
+    FIFOs, sockets and device nodes are skipped, since reading them would
+    block or never end; symlinked directories are not followed and
+    unreadable directories are skipped, like os.walk.
+
+    Args:
+        root (str): Directory to walk
+
+    Yields:
+        str: Path of each regular file, files of a directory (sorted by
+             name) before its sub-directories
+    """
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as scan:
+                entries = sorted(scan, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirectories = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.is_file():
+                    yield entry.path
+            except OSError:
+                continue
+        pending.extend(reversed(subdirectories))
+
+
+def iter_files(paths, recursive=True):
+    """
+    Expand a list of files and directories into individual file paths.
+    
+    Args:
+        paths (list): File and/or directory paths
+        recursive (bool): Descend into sub-directories of directory arguments
+        
+    Yields:
+        str: Path of each regular file found, in a stable sorted order
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                yield from iter_regular_files(path)
+            else:
+                for entry in sorted(os.scandir(path), key=lambda e: e.name):
+                    if entry.is_file():
+                        yield entry.path
+        else:
+            yield path
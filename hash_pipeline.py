@@ -0,0 +1,195 @@
+# hash_pipeline.py
+# Pipelined hashing for File Integrity Checker
+# Overlaps file reads with hashing using a small pool of reusable buffers
+#
+# A reader thread fills buffers from a fixed-size pool while hasher
+# threads consume them. When every buffer is in use the reader blocks, so
+# memory stays at buffer_count * buffer_size however fast the disk is.
+# hashlib releases the GIL while it hashes large blocks, so with several
+# algorithms each one runs on its own core and the file is read only once.
+
+import queue
+import threading
+
+from hash_generator_advanced import iter_file_chunks
+
+
+BUFFER_COUNT = 4
+BUFFER_SIZE = 1024 * 1024
+
+_END = object()
+
+
+class BufferPool:
+    """
+    Fixed set of reusable buffers; get() blocks while all are in use.
+
+    Args:
+        count (int): Number of buffers
+        size (int): Size of each buffer in bytes
+    """
+
+    def __init__(self, count=BUFFER_COUNT, size=BUFFER_SIZE):
+        self.size = size
+        self._free = queue.Queue()
+        for _ in range(count):
+            self._free.put(bytearray(size))
+
+    def get(self, timeout=None):
+        """Take a free buffer, waiting up to timeout seconds (None = forever)"""
+        return self._free.get(timeout=timeout)
+
+    def put(self, buffer):
+        """Return a buffer to the pool"""
+        self._free.put(buffer)
+
+
+class _Block:
+    """A filled buffer shared by every hasher until all are done with it"""
+
+    __slots__ = ("buffer", "count", "users")
+
+    def __init__(self, buffer, count, users):
+        self.buffer = buffer
+        self.count = count
+        self.users = users
+
+
+def pipelined_hash(file_path, hash_objects, io_mode='buffered', on_data=None, throttle=None,
+                   buffer_count=BUFFER_COUNT, buffer_size=BUFFER_SIZE, counter=None):
+    """
+    Feed a file through one or more hash objects with reads and hashing overlapped.
+
+    The first hash object is updated on the calling thread (together with
+    on_data, so callbacks stay on the caller's thread); every further
+    hash object gets a thread of its own.
+
+    Args:
+        file_path (str): Path to the file
+        hash_objects (list): Hash objects to update with the file data
+        io_mode (str): How to read the file (buffered, nocache, direct, sparse)
+        on_data (function): Optional callback(memoryview) for each block
+        throttle (BudgetController): Optional I/O and CPU budget to respect
+        buffer_count (int): Buffers in the pool (blocks in flight)
+        buffer_size (int): Bytes per buffer
+        counter (ExtentCounter): Optional read/hole byte counter (sparse mode)
+
+    Returns:
+        int: Number of bytes read
+    """
+    pool = BufferPool(buffer_count, buffer_size)
+    queues = [queue.Queue() for _ in hash_objects]
+    lock = threading.Lock()
+    stop = threading.Event()
+    errors = []
+    total = [0]
+
+    def publish(buffer, count, charge):
+        block = _Block(buffer, count, len(queues))
+        for block_queue in queues:
+            block_queue.put(block)
+        total[0] += count
+        if throttle is not None and charge:
+            throttle.consume(charge)
+
+    def take_buffer():
+        # Backpressure: wait for a hasher to hand a buffer back
+        while not stop.is_set():
+            try:
+                return pool.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def release(block):
+        with lock:
+            block.users -= 1
+            if block.users:
+                return
+        pool.put(block.buffer)
+
+    def read():
+        # Always ends every hasher queue with _END or the read error
+        outcome = _END
+        try:
+            if io_mode == 'buffered':
+                with open(file_path, "rb", buffering=0) as f:
+                    while True:
+                        buffer = take_buffer()
+                        if buffer is None:
+                            return
+                        count = f.readinto(buffer)
+                        if not count:
+                            pool.put(buffer)
+                            return
+                        publish(buffer, count, count)
+            else:
+                # Other modes reuse their own buffers: copy into the pool
+                charged = 0
+                for chunk in iter_file_chunks(file_path, io_mode, counter):
+                    chunk = memoryview(chunk)
+                    # Synthesized holes (sparse mode) do not count against the read budget
+                    charge = len(chunk) if counter is None else counter.data_bytes - charged
+                    charged += charge if counter is not None else 0
+                    while chunk:
+                        buffer = take_buffer()
+                        if buffer is None:
+                            return
+                        count = min(len(chunk), len(buffer))
+                        memoryview(buffer)[:count] = chunk[:count]
+                        publish(buffer, count, charge)
+                        charge = 0
+                        chunk = chunk[count:]
+        except BaseException as e:
+            outcome = e
+        finally:
+            for block_queue in queues:
+                block_queue.put(outcome)
+
+    def consume(block_queue, hash_obj, callback=None):
+        """Hash blocks until the reader is done; returns the read error, if any"""
+        while True:
+            item = block_queue.get()
+            if item is _END:
+                return None
+            if isinstance(item, BaseException):
+                return item
+            view = memoryview(item.buffer)[:item.count]
+            try:
+                hash_obj.update(view)
+                if callback is not None:
+                    callback(view)
+            except BaseException:
+                stop.set()
+                view.release()
+                release(item)
+                # Keep handing buffers back so the reader and other hashers finish
+                while not (item is _END or isinstance(item, BaseException)):
+                    item = block_queue.get()
+                    if isinstance(item, _Block):
+                        release(item)
+                raise
+            view.release()
+            release(item)
+
+    def consume_in_thread(block_queue, hash_obj):
+        try:
+            consume(block_queue, hash_obj)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read, daemon=True)]
+    threads += [threading.Thread(target=consume_in_thread, args=(block_queue, hash_obj), daemon=True)
+                for block_queue, hash_obj in zip(queues[1:], hash_objects[1:])]
+    for thread in threads:
+        thread.start()
+    try:
+        read_error = consume(queues[0], hash_objects[0], on_data)
+    finally:
+        for thread in threads:
+            thread.join()
+    if read_error is not None:
+        raise read_error
+    if errors:
+        raise errors[0]
+    return total[0]
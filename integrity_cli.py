@@ -0,0 +1,1043 @@
+# integrity_cli.py
+# Command-line interface for File Integrity Checker
+# Headless hashing, baselines and verification for scripts and cron jobs
+#
+# Usage: python -m integrity_cli <command> [options]
+#
+# Only the backend modules are imported here - never Tkinter - and the
+# heavier subsystems are imported inside the command that needs them, so
+# that a cold start stays in the tens of milliseconds.
+
+import argparse
+import json
+import math
+import os
+import sys
+
+from hash_generator_advanced import (
+    generate_file_hash,
+    generate_multiple_hashes,
+    iter_files,
+    IOStats,
+    IO_MODES,
+    HASH_BACKENDS
+)
+
+
+# Exit codes
+EXIT_OK = 0             # Everything hashed / verified cleanly
+EXIT_MISMATCH = 1       # Integrity differences were found
+EXIT_USAGE = 2          # Bad command-line usage (argparse default)
+EXIT_ERROR = 3          # Files or baselines could not be read
+
+ALGORITHMS = ['md5', 'sha1', 'sha256', 'sha512']
+
+# Shared secret for coordinator/worker connections (keeps it out of ps)
+TOKEN_VARIABLE = "INTEGRITY_CLUSTER_TOKEN"
+
+
+def emit(args, record, text):
+    """Print one result as a JSON line or as human-readable text"""
+    if args.json:
+        sys.stdout.write(json.dumps(record) + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+def report_error(args, path, error):
+    """Report a per-file error on stdout (JSON) or stderr (text)"""
+    if args.json:
+        emit(args, {"path": path, "status": "error", "error": error}, "")
+    else:
+        sys.stderr.write(f"{path}: {error}\n")
+
+
+def hash_options(args):
+    """Build the generate_file_hash keyword arguments from the I/O options"""
+    args.io_stats = IOStats(measure_cache=getattr(args, "cache_report", False))
+    options = {"io_mode": getattr(args, "io_mode", "buffered"), "io_stats": args.io_stats}
+    if getattr(args, "pipeline", False):
+        options["pipeline"] = True
+    backend = getattr(args, "backend", "hashlib")
+    if backend != "hashlib":
+        import kernel_crypto
+        if not kernel_crypto.available(getattr(args, "algorithm", None) or "sha256"):
+            sys.stderr.write("Kernel crypto (AF_ALG) is not available here; hashing with hashlib\n")
+        options["backend"] = backend
+    xattr_mode = getattr(args, "xattr_cache", None)
+    if xattr_mode:
+        import atexit
+        import xattr_cache
+        if xattr_cache.available():
+            args.digest_cache = xattr_cache.XattrCache(write=xattr_mode == "write")
+            atexit.register(args.digest_cache.close)
+            options["digest_cache"] = args.digest_cache
+        else:
+            sys.stderr.write("Extended attributes are not available here; hashing without the xattr cache\n")
+    budget = (getattr(args, "max_mbps", None), getattr(args, "cpu_share", None),
+              getattr(args, "pressure_threshold", None), getattr(args, "load_threshold", None))
+    if any(value is not None for value in budget):
+        from throttle import BudgetController, install_signal_handlers
+        options["throttle"] = BudgetController(*budget)
+        install_signal_handlers(options["throttle"])
+    return options
+
+
+def memory_budget(args):
+    """Build the MemoryBudget of a batch from --memory-limit, or None"""
+    if getattr(args, "memory_limit", None) is None:
+        return None
+    from memory_budget import MemoryBudget
+    return MemoryBudget(args.memory_limit * 1024 * 1024)
+
+
+def report_io(args):
+    """Print the I/O statistics of the run on stderr when requested"""
+    digest_cache = getattr(args, "digest_cache", None)
+    if digest_cache is not None:
+        digest_cache.flush()
+    cache_report = getattr(args, "cache_report", False)
+    if not cache_report and getattr(args, "io_mode", None) != "sparse":
+        return
+    stats = args.io_stats.summary()
+    if cache_report and digest_cache is not None:
+        stats["xattr_cache"] = digest_cache.summary()
+    if args.json:
+        sys.stderr.write(json.dumps({"io_stats": stats}) + "\n")
+        return
+    mib = 1024 * 1024
+    report = f"I/O mode {args.io_mode}: {stats['files']} files, {stats['bytes_read'] / mib:.1f} MiB read"
+    if stats["logical_bytes"] != stats["bytes_read"]:
+        report += f" of {stats['logical_bytes'] / mib:.1f} MiB hashed (holes skipped)"
+    if cache_report:
+        report += (f"; page cache {stats['cache_before'] / mib:.1f} MiB before, "
+                   f"{stats['cache_after'] / mib:.1f} MiB after ({stats['cache_growth'] / mib:+.1f} MiB)")
+        if digest_cache is not None:
+            xattr = stats["xattr_cache"]
+            report += (f"; xattr cache {xattr['hits']} hits, {xattr['misses']} misses, "
+                       f"{xattr['stored']} stored, {xattr['skipped']} not stored")
+    sys.stderr.write(report + "\n")
+
+
+def cmd_hash(args):
+    """Hash the given files"""
+    from checksum_files import format_checksum_line
+
+    exit_code = EXIT_OK
+    options = hash_options(args)
+    for file_path in args.files:
+        try:
+            if file_path == "-":
+                # stdin: pipes and generated data, hashed without a temp file
+                from stream_hash import HashSession
+                session = HashSession(ALGORITHMS if args.all else [args.algorithm],
+                                      options.get("backend", "hashlib"), throttle=options.get("throttle"))
+                session.update_from(sys.stdin.buffer)
+                hashes = session.hexdigests()
+            if args.all:
+                if file_path != "-":
+                    hashes = generate_multiple_hashes(file_path, ALGORITHMS)
+                failed = [value for value in hashes.values() if value.startswith("Error:")]
+                if failed:
+                    raise Exception(failed[0][len("Error: "):])
+                if args.tag:
+                    text = "\n".join(format_checksum_line(file_path, algo, value, tag=True)
+                                     for algo, value in hashes.items())
+                else:
+                    text = "\n".join(f"{algo}  {value}  {file_path}" for algo, value in hashes.items())
+                emit(args, {"path": file_path, "hashes": hashes}, text)
+            else:
+                if file_path == "-":
+                    value = hashes[args.algorithm.upper()]
+                else:
+                    value = generate_file_hash(file_path, args.algorithm, **options)
+                emit(args, {"path": file_path, "algorithm": args.algorithm, "hash": value},
+                     format_checksum_line(file_path, args.algorithm, value, args.tag))
+        except Exception as e:
+            report_error(args, file_path, str(e))
+            exit_code = EXIT_ERROR
+    report_io(args)
+    return exit_code
+
+
+def cmd_batch(args):
+    """Hash every file below the given paths"""
+    from batch_engine import iter_results
+    from checksum_files import format_checksum_line
+
+    indexes = {}
+    if args.known:
+        from known_hashes import open_indexes, match_labels
+        try:
+            indexes = open_indexes(args.known)
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"{e}\n")
+            return EXIT_ERROR
+        for label, index in indexes.items():
+            if index.algorithm != args.algorithm:
+                sys.stderr.write(f"{label}: index holds {index.algorithm} digests, not {args.algorithm}\n")
+                return EXIT_USAGE
+
+    exit_code = EXIT_OK
+    results = iter_results(
+        iter_files(args.paths, recursive=not args.no_recursive),
+        args.algorithm,
+        workers=args.workers,
+        layout=args.layout,
+        memory_budget=memory_budget(args),
+        **hash_options(args)
+    )
+    for result in results:
+        if result.error is not None:
+            report_error(args, result.path, result.error)
+            exit_code = EXIT_ERROR
+            continue
+        record = {"path": result.path, "algorithm": args.algorithm, "hash": result.hash}
+        if indexes:
+            # Keep stdout a valid checksum file: text-mode matches go to stderr
+            record["known"] = match_labels(result.hash, indexes)
+            if record["known"] and not args.json:
+                sys.stderr.write(f"{result.path}: known ({', '.join(record['known'])})\n")
+        emit(args, record, format_checksum_line(result.path, args.algorithm, result.hash, args.tag))
+    report_io(args)
+    return exit_code
+
+
+def cmd_known_index(args):
+    """Build a known-hash index from digest lists"""
+    from known_hashes import build_index
+
+    try:
+        count = build_index(args.lists, args.output, args.algorithm, run_size=args.run_size)
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    emit(args, {"index": args.output, "algorithm": args.algorithm, "digests": count},
+         f"{args.output}: {count} {args.algorithm} digests")
+    return EXIT_OK
+
+
+def cmd_baseline(args):
+    """Record a baseline for every file below the given paths"""
+    from baseline_store import create_baseline
+
+    def on_result(path, entry, error):
+        if error:
+            report_error(args, path, error)
+        elif args.verbose:
+            emit(args, dict(entry, path=path), f"{entry['hash']}  {path}")
+
+    chunking = None
+    if args.chunks:
+        from content_chunking import chunking_params
+        try:
+            chunking = chunking_params(args.chunk_size // 4, args.chunk_size, args.chunk_size * 8)
+        except ValueError as e:
+            sys.stderr.write(f"{e}\n")
+            return EXIT_USAGE
+    append = None
+    if args.append:
+        from append_verify import append_params
+        try:
+            append = append_params(args.append, args.segment_size * 1024 * 1024, args.rotation)
+        except ValueError as e:
+            sys.stderr.write(f"{e}\n")
+            return EXIT_USAGE
+
+    try:
+        summary = create_baseline(
+            iter_files(args.paths, recursive=not args.no_recursive),
+            args.output,
+            args.algorithm,
+            result_callback=on_result,
+            workers=args.workers,
+            layout=args.layout,
+            chunking=chunking,
+            memory_budget=memory_budget(args),
+            append=append,
+            **hash_options(args)
+        )
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    if args.rollup:
+        from merkle_rollup import build_rollup
+        try:
+            build_rollup(args.output)
+        except Exception as e:
+            sys.stderr.write(f"{e}\n")
+            return EXIT_ERROR
+    report_io(args)
+    if not args.json:
+        sys.stderr.write(f"Recorded {summary['recorded']} files in {args.output}"
+                         f" ({summary['errors']} errors)\n")
+    return EXIT_ERROR if summary["errors"] else EXIT_OK
+
+
+def report_verification(args, results):
+    """Print verification results and a summary; returns the exit code"""
+    from baseline_store import STATUS_OK, STATUS_ERROR
+
+    counts = {}
+    try:
+        for result in results:
+            status = result["status"]
+            counts[status] = counts.get(status, 0) + 1
+            if status != STATUS_OK or args.verbose:
+                text = f"{status.upper():9} {result['path']}"
+                if "regions" in result:
+                    text += "  (changed: " + ", ".join(
+                        f"{offset}+{length}" for offset, length in result["regions"][:5]
+                    ) + (", ..." if len(result["regions"]) > 5 else "") + ")"
+                emit(args, result, text)
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    if not args.json:
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+        sys.stderr.write(f"Verified: {summary or 'no entries'}\n")
+    report_io(args)
+    if counts.get(STATUS_ERROR):
+        return EXIT_ERROR
+    if sum(counts.values()) != counts.get(STATUS_OK, 0):
+        return EXIT_MISMATCH
+    return EXIT_OK
+
+
+def cmd_verify(args):
+    """Verify files against a baseline"""
+    from baseline_store import verify_baseline
+
+    results = verify_baseline(args.baseline, workers=args.workers, layout=args.layout,
+                              memory_budget=memory_budget(args), rotate_appends=args.update_appends,
+                              **hash_options(args))
+    updates = {}
+
+    def collect(results):
+        # Advanced append-only entries are kept for the baseline, not printed
+        for result in results:
+            if "entry" in result:
+                updates[result["path"]] = result.pop("entry")
+            yield result
+
+    exit_code = report_verification(args, collect(results))
+    if not args.update_appends:
+        return exit_code
+    from append_verify import update_append_entries
+    try:
+        updated = update_append_entries(args.baseline, updates)
+    except Exception as e:
+        sys.stderr.write(f"Failed to update append-only entries: {e}\n")
+        return EXIT_ERROR
+    if updated and not args.json:
+        sys.stderr.write(f"Advanced the checkpoints of {updated} append-only files\n")
+    return exit_code
+
+
+def cmd_sample(args):
+    """Verify this run's rotating sample of a baseline"""
+    from sampled_verify import SampledVerification
+
+    runs = args.runs
+    if args.fraction is not None:
+        if not 0 < args.fraction <= 1:
+            sys.stderr.write("--fraction must be between 0 and 1\n")
+            return EXIT_USAGE
+        runs = math.ceil(1 / args.fraction)
+    try:
+        sampler = SampledVerification(args.baseline, runs=runs, priority=args.priority or (),
+                                      recent_days=args.recent_days)
+        sampler.plan()
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    exit_code = report_verification(
+        args, sampler.results(workers=args.workers, layout=args.layout, **hash_options(args))
+    )
+    report = sampler.report(args.confidence)
+    if args.json:
+        sys.stderr.write(json.dumps({"sampling": report}) + "\n")
+    else:
+        sys.stderr.write(
+            f"Run {report['run']} (full coverage every {report['runs']} runs): "
+            f"{report['verified']} of {report['population']} entries verified\n"
+            f"{report['confidence']:.0%} confidence that at most {report['max_failure_rate']:.3%} of entries "
+            f"(~{report['max_failed_files']} files) fail verification "
+            f"[{report['sample_failures']} failures in a random sample of {report['sample_size']}]\n"
+        )
+    if not args.dry_run:
+        try:
+            sampler.save()
+        except Exception as e:
+            sys.stderr.write(f"Failed to save rotation state: {e}\n")
+            return EXIT_ERROR
+    return exit_code
+
+
+def cmd_schedule(args):
+    """Verify what the change histories say is due, once or as a service"""
+    import signal
+    import threading
+    import time
+    from adaptive_verify import AdaptiveScheduler, serve
+
+    scheduler_options = {
+        "budget": args.budget * 1024 * 1024 if args.budget is not None else None,
+        "window": args.window * 3600 if args.window is not None else None,
+        "critical": args.critical or (),
+        "min_interval": args.min_interval * 3600 if args.min_interval is not None else None,
+        "max_interval": args.max_interval * 86400 if args.max_interval is not None else None,
+        "accept_changes": args.accept_changes,
+    }
+    exit_codes = []
+
+    def run_pass(scheduler, results):
+        exit_codes.append(report_verification(args, results))
+        report = scheduler.report()
+        if args.json:
+            sys.stderr.write(json.dumps({"schedule": report}) + "\n")
+            return
+        mib = 1024 * 1024
+        next_due = (time.strftime('%Y-%m-%d %H:%M', time.localtime(report["next_due"]))
+                    if report["next_due"] is not None else "-")
+        sys.stderr.write(
+            f"{report['verified']} of {report['population']} entries verified, "
+            f"{report['bytes_verified'] / mib:.1f} MiB ({report['window_spent'] / mib:.1f} of "
+            f"{report['budget'] / mib:.1f} MiB this window); {report['still_due']} still due, "
+            f"interval scale {report['scale']:.2f}, next due {next_due}\n"
+        )
+
+    try:
+        scheduler = AdaptiveScheduler(args.baseline, **scheduler_options)
+        if args.once or args.dry_run:
+            scheduler.plan()
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    if args.dry_run:
+        for path, entry, reason in scheduler.selected:
+            emit(args, {"path": path, "reason": reason, "size": entry.get("size")}, f"{reason:8} {path}")
+        sys.stderr.write(f"{len(scheduler.selected)} entries due in this pass, "
+                         f"{scheduler.bytes_planned / (1024 * 1024):.1f} MiB; {scheduler.due} left for later\n")
+        return EXIT_OK
+    options = hash_options(args)
+    if args.once:
+        run_pass(scheduler, scheduler.results(workers=args.workers, layout=args.layout, **options))
+        try:
+            scheduler.save()
+        except Exception as e:
+            sys.stderr.write(f"Failed to save schedule state: {e}\n")
+            return EXIT_ERROR
+        return exit_codes[0]
+
+    stop_event = threading.Event()
+    for name in ("SIGINT", "SIGTERM"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), lambda signum, frame: stop_event.set())
+    try:
+        serve(args.baseline, run_pass, stop_event, scheduler_options,
+              workers=args.workers, layout=args.layout, **options)
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    return EXIT_OK
+
+
+def cmd_coordinate(args):
+    """Serve a baseline to verification workers and collect their results"""
+    import subprocess
+    from distributed_verify import Coordinator, parse_address
+
+    try:
+        host, port = parse_address(args.listen)
+        coordinator = Coordinator(args.baseline, host, port, unit_size=args.unit_size,
+                                  token=args.token, lease_timeout=args.lease_timeout)
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    coordinator.start()
+    if not args.json:
+        sys.stderr.write("Coordinator listening on %s:%d (%d entries)\n"
+                         % (coordinator.address + (len(coordinator.entries),)))
+
+    # Local worker processes, for a single machine or for testing
+    workers = []
+    worker_address = "127.0.0.1:%d" % coordinator.address[1]
+    environment = dict(os.environ)
+    if args.token:
+        environment[TOKEN_VARIABLE] = args.token
+    for number in range(args.local_workers):
+        # Run by path, so workers keep our cwd and resolve relative baseline paths like we do
+        workers.append(subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "worker", worker_address,
+             "--name", f"local-{number + 1}"],
+            env=environment, stdout=subprocess.DEVNULL
+        ))
+    try:
+        exit_code = report_verification(args, coordinator.results())
+    finally:
+        coordinator.close()
+        for worker in workers:
+            try:
+                worker.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+    if not args.json:
+        stats = coordinator.stats
+        sys.stderr.write(f"Work units: {stats['units']} handed out, {stats['steals']} stolen, "
+                         f"{stats['requeued']} re-queued\n")
+    return exit_code
+
+
+def cmd_worker(args):
+    """Verify work units handed out by a coordinator"""
+    from distributed_verify import run_worker, parse_address
+
+    path_map = None
+    if args.path_map:
+        prefix, separator, replacement = args.path_map.partition("=")
+        if not separator:
+            sys.stderr.write("--path-map expects PREFIX=REPLACEMENT\n")
+            return EXIT_USAGE
+        path_map = (prefix, replacement)
+    try:
+        stats = run_worker(parse_address(args.coordinator, "127.0.0.1"), name=args.name,
+                           token=args.token, path_map=path_map, **hash_options(args))
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    if not args.json:
+        sys.stderr.write(f"Worker done: {stats['files']} files in {stats['units']} units\n")
+    report_io(args)
+    return EXIT_OK
+
+
+def cmd_diff(args):
+    """Compare two baselines"""
+    from baseline_store import diff_baselines
+
+    changes = 0
+    rollups = []
+    if not args.no_rollup:
+        from merkle_rollup import matching_rollup
+        rollups = [matching_rollup(args.old), matching_rollup(args.new)]
+        if None in rollups:
+            for rollup in rollups:
+                if rollup is not None:
+                    rollup.close()
+            rollups = []
+    old_root = new_root = None
+    if args.root:
+        old_root, separator, new_root = args.root.partition("=")
+        if not separator or not old_root or not new_root:
+            sys.stderr.write("--root expects OLD_DIR=NEW_DIR\n")
+            return EXIT_USAGE
+        if not rollups:
+            sys.stderr.write("--root needs up-to-date rollups of both baselines (see 'rollup')\n")
+            return EXIT_USAGE
+    if rollups:
+        from merkle_rollup import diff_rollups
+        changes_found = diff_rollups(*rollups, old_root, new_root)
+    elif args.memory_limit is not None or args.workers > 1:
+        from manifest_diff import diff_manifests, DEFAULT_MEMORY_LIMIT
+        memory_limit = args.memory_limit * 1024 * 1024 if args.memory_limit else DEFAULT_MEMORY_LIMIT
+        changes_found = diff_manifests(args.old, args.new, memory_limit, args.workers, args.temp_dir)
+    else:
+        changes_found = diff_baselines(args.old, args.new)
+    try:
+        for change in changes_found:
+            changes += 1
+            emit(args, change, f"{change['change'].upper():9} {change['path']}")
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    return EXIT_MISMATCH if changes else EXIT_OK
+
+
+def cmd_bench_small(args):
+    """Benchmark files per second on a tree of small files"""
+    import shutil
+    from benchmark import benchmark_small_files, make_small_files
+
+    root = None
+    if args.file is not None:
+        file_paths = list(iter_files([args.file]))
+    else:
+        root, file_paths = make_small_files(args.small_files, args.small_size)
+    try:
+        results = benchmark_small_files(file_paths, (args.algorithms or ["sha256"])[0],
+                                        args.workers or [1, 4], args.repeat)
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    finally:
+        if root is not None:
+            shutil.rmtree(root, ignore_errors=True)
+    for case in results:
+        emit(args, case, f"{case['method']:18} -j {case['workers']:<3} {case['files_per_s']:10.0f} files/s  "
+                         f"user {case['user_cpu']:.2f}s  sys {case['sys_cpu']:.2f}s")
+    return EXIT_OK
+
+
+def cmd_bench(args):
+    """Benchmark hash backends and I/O modes"""
+    from benchmark import benchmark_hashing, make_test_file
+
+    if args.small_files or (args.file is not None and os.path.isdir(args.file)):
+        return cmd_bench_small(args)
+    file_path = args.file
+    if file_path is None:
+        file_path = make_test_file(args.size * 1024 * 1024)
+    try:
+        results = benchmark_hashing(file_path, args.algorithms or ["sha256"], args.backends or HASH_BACKENDS,
+                                    args.io_modes or ["buffered"], args.repeat)
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    finally:
+        if args.file is None:
+            os.unlink(file_path)
+    for case in results:
+        label = f"{case['algorithm']:7} {case['backend']:8} {case['io_mode']:9}"
+        if not case["available"]:
+            emit(args, case, f"{label} unavailable")
+            continue
+        text = f"{label} {case['mb_per_s']:9.1f} MB/s  user {case['user_cpu']:.2f}s  sys {case['sys_cpu']:.2f}s"
+        if case["peak_rss"]:
+            text += f"  peak RSS {case['peak_rss'] / (1024 * 1024):.0f} MiB"
+        emit(args, case, text)
+    return EXIT_OK
+
+
+def cmd_rollup(args):
+    """Build the directory rollup digests of a baseline"""
+    from merkle_rollup import build_rollup, rollup_path
+
+    output = args.output or rollup_path(args.baseline)
+    memory_limit = args.memory_limit * 1024 * 1024 if args.memory_limit else None
+    try:
+        digest = build_rollup(args.baseline, output, memory_limit, args.workers)
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    emit(args, {"rollup": output, "digest": digest}, f"{digest}  {output}")
+    return EXIT_OK
+
+
+def cmd_check(args):
+    """Verify md5sum/sha*sum or BSD-tag checksum files, like sha256sum -c"""
+    from checksum_files import ChecksumReader, verify_checksums
+    from baseline_store import STATUS_OK, STATUS_MODIFIED, STATUS_MISSING
+
+    options = hash_options(args)
+    budget = memory_budget(args)
+    mismatched = unreadable = checked = malformed = 0
+    for checksum_file in args.checksum_files:
+        reader = ChecksumReader(checksum_file, args.algorithm)
+        file_checked = 0
+        try:
+            results = verify_checksums(reader, workers=args.workers, layout=args.layout,
+                                       memory_budget=budget, **options)
+            for result in results:
+                if result.status == STATUS_MISSING and args.ignore_missing:
+                    continue
+                file_checked += 1
+                if result.status == STATUS_OK:
+                    if not args.quiet:
+                        emit(args, result._asdict(), f"{result.path}: OK")
+                    continue
+                if result.status == STATUS_MODIFIED:
+                    mismatched += 1
+                    emit(args, result._asdict(), f"{result.path}: FAILED")
+                else:
+                    unreadable += 1
+                    emit(args, result._asdict(), f"{result.path}: FAILED open or read")
+                    if not args.json:
+                        sys.stderr.write(f"{result.path}: {result.error}\n")
+        except OSError as e:
+            sys.stderr.write(f"{checksum_file}: {e}\n")
+            unreadable += 1
+            continue
+        checked += file_checked
+        malformed += reader.malformed
+        if not file_checked and not reader.malformed and not args.ignore_missing:
+            sys.stderr.write(f"{checksum_file}: no properly formatted checksum lines found\n")
+            unreadable += 1
+
+    if malformed:
+        sys.stderr.write(f"WARNING: {malformed} line{'s are' if malformed != 1 else ' is'} improperly formatted\n")
+    if unreadable:
+        sys.stderr.write(f"WARNING: {unreadable} listed file{'s' if unreadable != 1 else ''} could not be read\n")
+    if mismatched:
+        sys.stderr.write(f"WARNING: {mismatched} computed checksum{'s' if mismatched != 1 else ''} did NOT match\n")
+    report_io(args)
+    if unreadable or (malformed and args.strict):
+        return EXIT_ERROR
+    return EXIT_MISMATCH if mismatched else EXIT_OK
+
+
+def cmd_dedup(args):
+    """Estimate deduplication savings from a baseline's chunk index"""
+    from baseline_store import iter_baseline_entries
+    from content_chunking import dedup_estimate
+
+    try:
+        estimate = dedup_estimate(iter_baseline_entries(args.baseline))
+    except Exception as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_ERROR
+    if not estimate["files"]:
+        sys.stderr.write(f"{args.baseline}: no chunk index (record it with baseline --chunks)\n")
+        return EXIT_ERROR
+    emit(args, estimate,
+         f"{estimate['files']} files, {estimate['chunks']} chunks ({estimate['unique_chunks']} unique)\n"
+         f"{estimate['total_bytes']} bytes, {estimate['unique_bytes']} unique"
+         f" - dedup ratio {estimate['ratio']:.2f}")
+    return EXIT_OK
+
+
+def cmd_archive(args):
+    """Hash the members of an archive, or verify them against a manifest"""
+    from archive_hashing import hash_archive, verify_archive, iter_archive_members, STATUS_OK
+
+    def on_member(member, entry):
+        if args.verbose:
+            emit(args, dict(entry, path=member), f"{entry['hash']}  {member}")
+
+    try:
+        if args.verify:
+            problems = 0
+            for result in verify_archive(args.archive, args.verify):
+                if result["status"] != STATUS_OK:
+                    problems += 1
+                if result["status"] != STATUS_OK or args.verbose:
+                    emit(args, result, f"{result['status'].upper():9} {result['path']}")
+            return EXIT_MISMATCH if problems else EXIT_OK
+        if args.output:
+            hash_archive(args.archive, args.output, args.algorithm, result_callback=on_member)
+        else:
+            for member in iter_archive_members(args.archive, (args.algorithm,)):
+                value = member["hashes"][args.algorithm]
+                emit(args, {"path": member["member"], "algorithm": args.algorithm,
+                            "hash": value, "size": member["size"]},
+                     f"{value}  {member['member']}")
+    except Exception as e:
+        sys.stderr.write(f"{args.archive}: {e}\n")
+        return EXIT_ERROR
+    return EXIT_OK
+
+
+def cmd_copy(args):
+    """Copy files, hashing them in the same pass"""
+    from verified_copy import copy_files
+
+    if len(args.sources) > 1 and not os.path.isdir(args.destination):
+        sys.stderr.write(f"{args.destination}: not a directory\n")
+        return EXIT_USAGE
+    if os.path.isdir(args.destination):
+        pairs = [(src, os.path.join(args.destination, os.path.basename(src))) for src in args.sources]
+    else:
+        pairs = [(args.sources[0], args.destination)]
+    algorithm = None if args.no_hash else args.algorithm
+    options = hash_options(args)
+
+    writer = None
+    if args.manifest and algorithm:
+        from baseline_store import BaselineWriter
+        writer = BaselineWriter(args.manifest, algorithm)
+        writer.open()
+    exit_code = EXIT_OK
+    try:
+        for result in copy_files(pairs, algorithm, args.verify, throttle=options.get("throttle")):
+            if result["error"] is not None:
+                report_error(args, result["src"], result["error"])
+                exit_code = EXIT_MISMATCH if result.get("mismatch") else EXIT_ERROR
+                continue
+            if writer is not None:
+                writer.write_entry(result["dst"], {"hash": result["hash"], "size": result["bytes"]})
+            emit(args, result, f"{result['hash'] or 'copied'}  {result['dst']}")
+    finally:
+        if writer is not None:
+            writer.close()
+    return exit_code
+
+
+def cmd_compare(args):
+    """Compare two files or directory trees byte for byte"""
+    from content_compare import compare_paths
+    from baseline_store import STATUS_OK, STATUS_ERROR
+
+    counts = {}
+    for result in compare_paths(args.first, args.second, workers=args.workers, layout=args.layout):
+        counts[result.status] = counts.get(result.status, 0) + 1
+        if result.status != STATUS_OK or args.verbose:
+            emit(args, result._asdict(), f"{result.status.upper():9} {result.path}  ({result.detail})")
+    if not args.json:
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+        sys.stderr.write(f"Compared: {summary or 'no files'}\n")
+    if counts.get(STATUS_ERROR):
+        return EXIT_ERROR
+    if sum(counts.values()) != counts.get(STATUS_OK, 0):
+        return EXIT_MISMATCH
+    return EXIT_OK
+
+
+def build_parser():
+    """Build the argument parser with all sub-commands"""
+    parser = argparse.ArgumentParser(
+        prog="integrity_cli",
+        description="Headless File Integrity Checker"
+    )
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON lines")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    io_options = argparse.ArgumentParser(add_help=False)
+    io_options.add_argument("--io-mode", default="buffered", choices=IO_MODES,
+                            help="nocache/direct keep the sweep out of the page cache, sparse skips file holes")
+    io_options.add_argument("--pipeline", action="store_true",
+                            help="read on a separate thread so reads overlap hashing")
+    io_options.add_argument("--backend", default="hashlib", choices=HASH_BACKENDS,
+                            help="kernel hashes in the Linux kernel (AF_ALG) where available")
+    io_options.add_argument("--xattr-cache", nargs="?", const="write", choices=["read", "write"],
+                            help="reuse digests stored in user.integrity.* xattrs of unchanged files; "
+                                 "'write' (default) also stores new ones")
+    io_options.add_argument("--cache-report", action="store_true",
+                            help="report bytes read and page cache footprint on stderr")
+
+    batch_options = argparse.ArgumentParser(add_help=False)
+    batch_options.add_argument("-j", "--workers", type=int, default=1,
+                               help="number of worker threads")
+    batch_options.add_argument("--layout", choices=["none", "inode", "fiemap"],
+                               help="order files by their location on disk")
+
+    memory_options = argparse.ArgumentParser(add_help=False)
+    memory_options.add_argument("--memory-limit", type=int, metavar="MB",
+                                help="size workers, read buffers and result queues to stay within this")
+
+    budget_options = argparse.ArgumentParser(add_help=False)
+    budget_options.add_argument("--max-mbps", type=float,
+                                help="cap the read rate in MB/s (SIGUSR1 halves, SIGUSR2 doubles it)")
+    budget_options.add_argument("--cpu-share", type=float,
+                                help="target fraction of one CPU, e.g. 0.25")
+    budget_options.add_argument("--pressure-threshold", type=float,
+                                help="back off while /proc/pressure/io some avg10 exceeds this %%")
+    budget_options.add_argument("--load-threshold", type=float,
+                                help="back off while the load average per CPU exceeds this")
+
+    hash_parser = subparsers.add_parser("hash", parents=[io_options], help="hash individual files")
+    hash_parser.add_argument("files", nargs="+", help="files to hash ('-' for stdin)")
+    hash_parser.add_argument("-a", "--algorithm", default="sha256", choices=ALGORITHMS)
+    hash_parser.add_argument("--all", action="store_true", help="compute every algorithm")
+    hash_parser.add_argument("--tag", action="store_true", help="print BSD-style checksum lines")
+    hash_parser.set_defaults(func=cmd_hash)
+
+    batch_parser = subparsers.add_parser("batch", parents=[io_options, batch_options, memory_options, budget_options], help="hash all files below paths")
+    batch_parser.add_argument("paths", nargs="+")
+    batch_parser.add_argument("-a", "--algorithm", default="sha256", choices=ALGORITHMS)
+    batch_parser.add_argument("--no-recursive", action="store_true")
+    batch_parser.add_argument("--tag", action="store_true", help="print BSD-style checksum lines")
+    batch_parser.add_argument("--known", action="append", default=[], metavar="[LABEL=]INDEX",
+                              help="tag files whose digest is in a known-hash index (repeatable)")
+    batch_parser.set_defaults(func=cmd_batch)
+
+    known_parser = subparsers.add_parser("known-index", help="build a known-hash index from digest lists")
+    known_parser.add_argument("lists", nargs="+", help="digest lists, checksum files or NSRL-style CSV")
+    known_parser.add_argument("-o", "--output", required=True, help="index file to write")
+    known_parser.add_argument("-a", "--algorithm", default="sha256", choices=ALGORITHMS)
+    known_parser.add_argument("--run-size", type=int, default=4 * 1024 * 1024,
+                              help="digests sorted in memory per run (bounds memory use)")
+    known_parser.set_defaults(func=cmd_known_index)
+
+    baseline_parser = subparsers.add_parser("baseline", parents=[io_options, batch_options, memory_options, budget_options], help="record a baseline")
+    baseline_parser.add_argument("paths", nargs="+")
+    baseline_parser.add_argument("-o", "--output", required=True, help="baseline file to write")
+    baseline_parser.add_argument("-a", "--algorithm", default="sha256", choices=ALGORITHMS)
+    baseline_parser.add_argument("--no-recursive", action="store_true")
+    baseline_parser.add_argument("-v", "--verbose", action="store_true", help="print every entry")
+    baseline_parser.add_argument("--chunks", action="store_true",
+                                 help="record a content-defined chunk index to locate later changes")
+    baseline_parser.add_argument("--chunk-size", type=int, default=8192,
+                                 help="average chunk size in bytes (default: 8192)")
+    baseline_parser.add_argument("--append", action="append", metavar="PATTERN",
+                                 help="treat matching files (e.g. '*.log') as append-only: record checkpoints "
+                                      "so later checks hash only new data (repeatable)")
+    baseline_parser.add_argument("--segment-size", type=int, default=64, metavar="MB",
+                                 help="checkpoint spacing of append-only files (default: 64)")
+    baseline_parser.add_argument("--rotation", type=int, default=8,
+                                 help="re-read every append-only checkpoint within this many checks (default: 8)")
+    baseline_parser.add_argument("--rollup", action="store_true",
+                                 help="also write directory rollup digests (BASELINE.rollup) for fast diffs")
+    baseline_parser.set_defaults(func=cmd_baseline)
+
+    verify_parser = subparsers.add_parser("verify", parents=[io_options, batch_options, memory_options, budget_options],
+                                          help="verify files against a baseline")
+    verify_parser.add_argument("baseline")
+    verify_parser.add_argument("-v", "--verbose", action="store_true", help="print OK results too")
+    verify_parser.add_argument("--update-appends", action="store_true",
+                               help="record data appended to intact append-only files, so the next check "
+                                    "starts after it; only then does a check re-read just 1/rotation of "
+                                    "their older segments")
+    verify_parser.set_defaults(func=cmd_verify)
+
+    sample_parser = subparsers.add_parser("sample", parents=[io_options, batch_options, budget_options],
+                                          help="verify a rotating sample of a baseline")
+    sample_parser.add_argument("baseline")
+    rotation = sample_parser.add_mutually_exclusive_group()
+    rotation.add_argument("--runs", type=int, help="verify every file within this many runs (default: 30)")
+    rotation.add_argument("--fraction", type=float, help="fraction of the baseline to verify per run")
+    sample_parser.add_argument("--priority", action="append", metavar="PATTERN",
+                               help="weight up paths matching this pattern (repeatable)")
+    sample_parser.add_argument("--recent-days", type=float, default=7,
+                               help="weight up files written this soon before the baseline")
+    sample_parser.add_argument("--confidence", type=float, default=0.95, help="confidence level to report")
+    sample_parser.add_argument("--dry-run", action="store_true", help="do not advance the rotation")
+    sample_parser.add_argument("-v", "--verbose", action="store_true", help="print OK results too")
+    sample_parser.set_defaults(func=cmd_sample)
+
+    schedule_parser = subparsers.add_parser("schedule", parents=[io_options, batch_options, budget_options],
+                                            help="re-verify files as their change history makes them due")
+    schedule_parser.add_argument("baseline")
+    schedule_parser.add_argument("--budget", type=int, metavar="MB",
+                                 help="data to verify per window (default: stored, else 102400)")
+    schedule_parser.add_argument("--window", type=float, metavar="HOURS",
+                                 help="length of a budget window (default: stored, else 24)")
+    schedule_parser.add_argument("--critical", action="append", metavar="PATTERN",
+                                 help="check paths matching this pattern more often (repeatable)")
+    schedule_parser.add_argument("--min-interval", type=float, metavar="HOURS",
+                                 help="shortest re-verification interval (default: 1)")
+    schedule_parser.add_argument("--max-interval", type=float, metavar="DAYS",
+                                 help="longest re-verification interval (default: 90)")
+    schedule_parser.add_argument("--accept-changes", action="store_true",
+                                 help="record changed files' new digests instead of reporting them again")
+    schedule_parser.add_argument("--once", action="store_true", help="run one pass and exit instead of serving")
+    schedule_parser.add_argument("--dry-run", action="store_true", help="list this pass's entries only")
+    schedule_parser.add_argument("-v", "--verbose", action="store_true", help="print OK results too")
+    schedule_parser.set_defaults(func=cmd_schedule)
+
+    coordinate_parser = subparsers.add_parser("coordinate",
+                                              help="serve a baseline to verification workers on other hosts")
+    coordinate_parser.add_argument("baseline")
+    coordinate_parser.add_argument("--listen", default="127.0.0.1:7311",
+                                   help="HOST:PORT to listen on (default: 127.0.0.1:7311; other addresses "
+                                        "need --token)")
+    coordinate_parser.add_argument("--unit-size", type=int, default=256, help="files per work unit")
+    coordinate_parser.add_argument("--lease-timeout", type=float, default=60.0,
+                                   help="re-queue a worker's unit after this many silent seconds")
+    coordinate_parser.add_argument("--local-workers", type=int, default=0,
+                                   help="also start this many worker processes on this machine")
+    coordinate_parser.add_argument("--token", default=os.environ.get(TOKEN_VARIABLE),
+                                   help=f"shared secret workers must present (default: ${TOKEN_VARIABLE})")
+    coordinate_parser.add_argument("-v", "--verbose", action="store_true", help="print OK results too")
+    coordinate_parser.set_defaults(func=cmd_coordinate)
+
+    worker_parser = subparsers.add_parser("worker", parents=[io_options, budget_options],
+                                          help="verify work units from a coordinator")
+    worker_parser.add_argument("coordinator", help="coordinator HOST:PORT")
+    worker_parser.add_argument("--name", help="worker name shown in results")
+    worker_parser.add_argument("--token", default=os.environ.get(TOKEN_VARIABLE),
+                               help=f"shared secret (default: ${TOKEN_VARIABLE})")
+    worker_parser.add_argument("--path-map", metavar="PREFIX=REPLACEMENT",
+                               help="rewrite baseline paths to where the storage is mounted here")
+    worker_parser.set_defaults(func=cmd_worker)
+
+    diff_parser = subparsers.add_parser("diff", help="compare two baselines")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    diff_parser.add_argument("--memory-limit", type=int, metavar="MB",
+                             help="sort both baselines on disk within about this much memory")
+    diff_parser.add_argument("-j", "--workers", type=int, default=1,
+                             help="processes sorting in parallel (implies the on-disk sort)")
+    diff_parser.add_argument("--temp-dir", help="directory for on-disk sort runs")
+    diff_parser.add_argument("--no-rollup", action="store_true",
+                             help="compare every entry even if both baselines have directory rollups")
+    diff_parser.add_argument("--root", metavar="OLD_DIR=NEW_DIR",
+                             help="compare OLD_DIR of the old baseline with NEW_DIR of the new one, for "
+                                  "replicas stored under different paths (needs rollups)")
+
+    bench_parser = subparsers.add_parser("bench", help="benchmark hash backends and I/O modes")
+    bench_parser.add_argument("file", nargs="?",
+                              help="file (or directory of small files) to hash (default: temporary data)")
+    bench_parser.add_argument("--size", type=int, default=256, metavar="MB", help="size of the temporary file")
+    bench_parser.add_argument("-a", "--algorithm", dest="algorithms", action="append", choices=ALGORITHMS,
+                              help="algorithm to benchmark (repeatable, default: sha256)")
+    bench_parser.add_argument("--backend", dest="backends", action="append", choices=HASH_BACKENDS,
+                              help="backend to benchmark (repeatable, default: all)")
+    bench_parser.add_argument("--io-mode", dest="io_modes", action="append", choices=IO_MODES,
+                              help="I/O mode to benchmark (repeatable, default: buffered)")
+    bench_parser.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is reported")
+    bench_parser.add_argument("--small-files", type=int, metavar="N",
+                              help="measure files/s on N temporary small files instead (or pass a directory)")
+    bench_parser.add_argument("--small-size", type=int, default=4096, metavar="BYTES",
+                              help="size of the temporary small files (default: 4096)")
+    bench_parser.add_argument("-j", "--workers", type=int, action="append",
+                              help="worker count for the small-file batch runs (repeatable, default: 1 and 4)")
+    bench_parser.set_defaults(func=cmd_bench)
+
+    rollup_parser = subparsers.add_parser("rollup", help="build directory rollup digests for a baseline")
+    rollup_parser.add_argument("baseline")
+    rollup_parser.add_argument("-o", "--output", help="rollup file (default: BASELINE.rollup)")
+    rollup_parser.add_argument("--memory-limit", type=int, metavar="MB",
+                               help="memory ceiling for sorting the baseline")
+    rollup_parser.add_argument("-j", "--workers", type=int, default=1,
+                               help="processes sorting the baseline in parallel")
+    rollup_parser.set_defaults(func=cmd_rollup)
+    diff_parser.set_defaults(func=cmd_diff)
+
+    check_parser = subparsers.add_parser("check", parents=[io_options, batch_options, memory_options, budget_options],
+                                         help="verify SHA256SUMS-style checksum files (like sha256sum -c)")
+    check_parser.add_argument("checksum_files", nargs="+", metavar="FILE", help="checksum file ('-' for stdin)")
+    check_parser.add_argument("-a", "--algorithm", choices=ALGORITHMS,
+                              help="algorithm of untagged lines (default: from digest length)")
+    check_parser.add_argument("--quiet", action="store_true", help="don't print OK for each verified file")
+    check_parser.add_argument("--ignore-missing", action="store_true", help="skip files that do not exist")
+    check_parser.add_argument("--strict", action="store_true", help="fail on improperly formatted lines")
+    check_parser.set_defaults(func=cmd_check)
+
+    dedup_parser = subparsers.add_parser("dedup", help="estimate dedup savings from a chunked baseline")
+    dedup_parser.add_argument("baseline")
+    dedup_parser.set_defaults(func=cmd_dedup)
+
+    archive_parser = subparsers.add_parser("archive", help="hash zip/tar members without extracting")
+    archive_parser.add_argument("archive")
+    archive_parser.add_argument("-a", "--algorithm", default="sha256", choices=ALGORITHMS)
+    archive_parser.add_argument("-o", "--output", help="write a member manifest instead of printing")
+    archive_parser.add_argument("--verify", metavar="MANIFEST", help="verify members against a manifest")
+    archive_parser.add_argument("-v", "--verbose", action="store_true", help="print every member")
+    archive_parser.set_defaults(func=cmd_archive)
+
+    copy_parser = subparsers.add_parser("copy", parents=[budget_options],
+                                        help="copy files and hash them in the same pass")
+    copy_parser.add_argument("sources", nargs="+")
+    copy_parser.add_argument("destination")
+    copy_parser.add_argument("-a", "--algorithm", default="sha256", choices=ALGORITHMS)
+    copy_parser.add_argument("--verify", action="store_true",
+                             help="re-read each copy from disk and compare digests")
+    copy_parser.add_argument("--no-hash", action="store_true",
+                             help="plain kernel copy (copy_file_range/sendfile), no digest")
+    copy_parser.add_argument("--manifest", help="record destination digests in a baseline file")
+    copy_parser.set_defaults(func=cmd_copy)
+
+    compare_parser = subparsers.add_parser("compare", parents=[batch_options],
+                                           help="compare two files or trees directly, stopping at the first difference")
+    compare_parser.add_argument("first")
+    compare_parser.add_argument("second")
+    compare_parser.add_argument("-v", "--verbose", action="store_true", help="print identical files too")
+    compare_parser.set_defaults(func=cmd_compare)
+
+    return parser
+
+
+def main(argv=None):
+    """Parse arguments, run the command and return its exit code"""
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
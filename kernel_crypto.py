@@ -0,0 +1,154 @@
+# kernel_crypto.py
+# Linux kernel crypto API (AF_ALG) hashing backend for File Integrity Checker
+# Hashes file data in the kernel, optionally without copying it into Python
+#
+# An AF_ALG "hash" socket computes digests with whatever implementation
+# the kernel prefers, including crypto accelerators exposed to it. File
+# data is moved with splice(): file -> pipe -> socket, all inside the
+# kernel, so it never enters a Python buffer and the interpreter only
+# issues system calls. Every block is sent with SPLICE_F_MORE; reading
+# the digest from the socket finalizes the hash.
+#
+# Where AF_ALG is missing (non-Linux, containers without the socket
+# family, kernels without the algorithm) available() is False and
+# callers fall back to hashlib.
+
+import errno
+import os
+import socket
+
+
+# hashlib names to kernel crypto API names
+KERNEL_NAMES = {'md5': 'md5', 'sha1': 'sha1', 'sha256': 'sha256', 'sha512': 'sha512'}
+DIGEST_SIZES = {'md5': 16, 'sha1': 20, 'sha256': 32, 'sha512': 64}
+SPLICE_SIZE = 1024 * 1024           # Requested pipe size for splice transfers
+
+_available = {}
+
+
+def _bind(algorithm):
+    """Create a bound AF_ALG hash socket for an algorithm"""
+    tfm = socket.socket(socket.AF_ALG, socket.SOCK_SEQPACKET, 0)
+    try:
+        tfm.bind(("hash", KERNEL_NAMES[algorithm]))
+    except BaseException:
+        tfm.close()
+        raise
+    return tfm
+
+
+def available(algorithm='sha256'):
+    """
+    Check whether the kernel can hash an algorithm over AF_ALG.
+
+    Args:
+        algorithm (str): Hash algorithm
+
+    Returns:
+        bool: True if an AF_ALG hash socket can be bound for it
+    """
+    algorithm = algorithm.lower()
+    if algorithm not in _available:
+        try:
+            _bind(algorithm).close()
+            _available[algorithm] = True
+        except (AttributeError, KeyError, OSError):
+            _available[algorithm] = False
+    return _available[algorithm]
+
+
+class KernelHash:
+    """
+    hashlib-style hash object computed by the kernel.
+
+    Unlike hashlib objects it is finalized by the first digest() call;
+    later calls return the same digest and update() is no longer allowed.
+
+    Args:
+        algorithm (str): Hash algorithm
+    """
+
+    def __init__(self, algorithm='sha256'):
+        self.name = algorithm.lower()
+        self.digest_size = DIGEST_SIZES[self.name]
+        tfm = _bind(self.name)
+        try:
+            self._op, _ = tfm.accept()
+        finally:
+            tfm.close()
+        self._digest = None
+
+    def update(self, data):
+        """Send more data to the kernel"""
+        if self._digest is not None:
+            raise ValueError("KernelHash already finalized")
+        if len(data):
+            self._op.sendall(data, socket.MSG_MORE)
+
+    def digest(self):
+        """Finalize (once) and return the binary digest"""
+        if self._digest is None:
+            self._digest = self._op.recv(self.digest_size)
+            self._op.close()
+        return self._digest
+
+    def hexdigest(self):
+        """Finalize (once) and return the hexadecimal digest"""
+        return self.digest().hex()
+
+    def splice_from(self, fd, progress=None):
+        """
+        Hash everything from a file descriptor's offset to EOF, zero-copy.
+
+        Falls back to read()/send() when splice() is not supported for
+        the file.
+
+        Args:
+            fd (int): Open file descriptor
+            progress (function): Optional callback(nbytes) per transfer
+
+        Returns:
+            int: Number of bytes hashed
+        """
+        if self._digest is not None:
+            raise ValueError("KernelHash already finalized")
+        total = 0
+        if hasattr(os, "splice"):
+            read_end, write_end = os.pipe()
+            try:
+                try:
+                    import fcntl
+                    fcntl.fcntl(write_end, fcntl.F_SETPIPE_SZ, SPLICE_SIZE)
+                except (ImportError, AttributeError, OSError):
+                    pass
+                op = self._op.fileno()
+                while True:
+                    try:
+                        moved = os.splice(fd, write_end, SPLICE_SIZE, flags=os.SPLICE_F_MORE)
+                    except OSError as e:
+                        if total or e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                            raise
+                        break           # File system cannot splice: copy instead
+                    if not moved:
+                        return total
+                    pending = moved
+                    while pending:
+                        pending -= os.splice(read_end, op, pending, flags=os.SPLICE_F_MORE)
+                    total += moved
+                    if progress is not None:
+                        progress(moved)
+            finally:
+                os.close(read_end)
+                os.close(write_end)
+        while True:
+            block = os.read(fd, SPLICE_SIZE)
+            if not block:
+                return total
+            self.update(block)
+            total += len(block)
+            if progress is not None:
+                progress(len(block))
+
+    def close(self):
+        """Release the socket without finalizing"""
+        self._op.close()
@@ -0,0 +1,347 @@
+# known_hashes.py
+# Known-hash index for File Integrity Checker
+# Compact, memory-mapped membership test against very large digest lists
+#
+# Allow/deny lists such as NSRL hold tens of millions of digests; as a
+# Python set of hex strings they would take gigabytes. An index file
+# stores them instead as one sorted array of raw digest bytes, read
+# through mmap so only the pages that lookups touch are loaded:
+#
+#   header     magic, version, algorithm, digest size, count, Bloom size
+#   fanout     256 cumulative counts by first digest byte (as in git .idx)
+#   bloom      Bloom filter over all digests (about 1% false positives)
+#   digests    sorted, de-duplicated raw digests
+#
+# A lookup tests the Bloom filter first, which rejects almost every
+# unknown digest after a handful of bit tests; only probable hits are
+# confirmed by a binary search inside their fanout bucket.
+#
+# Building sorts the lists in bounded runs that are spilled to disk and
+# merged, so lists larger than memory can be indexed. numpy, when it is
+# installed, sorts the runs and fills the Bloom filter vectorized.
+
+import heapq
+import mmap
+import os
+import re
+import struct
+import tempfile
+
+from checksum_files import DIGEST_LENGTHS
+
+try:
+    import numpy
+except ImportError:  # Optional: pure-Python run sorting and Bloom filling
+    numpy = None
+
+
+MAGIC = b"FICKNOWN"
+VERSION = 1
+RUN_SIZE = 4 * 1024 * 1024      # Digests sorted in memory per run
+BITS_PER_ENTRY = 10             # Bloom filter size; ~1% false positives
+BLOOM_HASHES = 7
+MERGE_BLOCK = 64 * 1024         # Digests per Bloom-filter update while merging
+
+_HEADER = struct.Struct("<8sH16sHHQQ")   # magic, version, algorithm, size, k, count, bloom bits
+_FANOUT = struct.Struct("<256Q")
+_MASK64 = (1 << 64) - 1
+
+
+def _bloom_positions(digest, bits, hashes):
+    """Bloom filter bit positions of a digest (double hashing on its tail)"""
+    first = int.from_bytes(digest[-8:], "little")
+    step = int.from_bytes(digest[-16:-8], "little") | 1
+    return [((first + i * step) & _MASK64) % bits for i in range(hashes)]
+
+
+def _fill_bloom(bloom, digests, digest_size, bits, hashes):
+    """Set the Bloom filter bits of a block of packed digests"""
+    if numpy is not None:
+        records = numpy.frombuffer(bytes(digests), dtype=numpy.uint8).reshape(-1, digest_size)
+        first = records[:, -8:].copy().view("<u8").ravel()
+        step = records[:, -16:-8].copy().view("<u8").ravel() | numpy.uint64(1)
+        bloom_array = numpy.frombuffer(bloom, dtype=numpy.uint8)
+        with numpy.errstate(over="ignore"):
+            for i in range(hashes):
+                positions = (first + numpy.uint64(i) * step) % numpy.uint64(bits)
+                numpy.bitwise_or.at(bloom_array, positions >> numpy.uint64(3),
+                                    (numpy.uint8(1) << (positions & numpy.uint64(7)).astype(numpy.uint8)))
+        return
+    for offset in range(0, len(digests), digest_size):
+        for position in _bloom_positions(digests[offset:offset + digest_size], bits, hashes):
+            bloom[position >> 3] |= 1 << (position & 7)
+
+
+def _sorted_run(digests, digest_size):
+    """Sort and de-duplicate a run of packed digests"""
+    if numpy is not None:
+        records = numpy.frombuffer(bytes(digests), dtype=f"S{digest_size}")
+        # Fixed-width byte strings sort like memcmp; tobytes keeps the padding
+        return numpy.unique(records).tobytes()
+    records = sorted({bytes(digests[offset:offset + digest_size])
+                      for offset in range(0, len(digests), digest_size)})
+    return b"".join(records)
+
+
+def iter_list_digests(list_file, algorithm='sha256'):
+    """
+    Extract the digests of one algorithm from a digest list.
+
+    Each line contributes its first hexadecimal token of the algorithm's
+    digest length, so plain lists, md5sum/sha*sum files and NSRL-style
+    CSV files (which hold several digest columns) are all understood.
+
+    Args:
+        list_file (str): Path to the list
+        algorithm (str): Hash algorithm of the digests to extract
+
+    Yields:
+        bytes: Raw digest of every line that holds one
+    """
+    length = DIGEST_LENGTHS[algorithm]
+    token = re.compile(rb"(?<![0-9A-Fa-f])[0-9A-Fa-f]{%d}(?![0-9A-Fa-f])" % length)
+    with open(list_file, "rb") as f:
+        for line in f:
+            match = token.search(line)
+            if match:
+                yield bytes.fromhex(match.group().decode("ascii"))
+
+
+def build_index(list_files, output_file, algorithm='sha256', run_size=RUN_SIZE,
+                bits_per_entry=BITS_PER_ENTRY, progress_callback=None):
+    """
+    Build a known-hash index from digest lists.
+
+    Args:
+        list_files (list): Digest lists (see iter_list_digests)
+        output_file (str): Path of the index to write
+        algorithm (str): Hash algorithm of the lists
+        run_size (int): Digests sorted in memory before spilling a run
+        bits_per_entry (int): Bloom filter bits per digest
+        progress_callback (function): Optional callback(digests read)
+
+    Returns:
+        int: Number of distinct digests in the index
+    """
+    algorithm = algorithm.lower()
+    if algorithm not in DIGEST_LENGTHS:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    digest_size = DIGEST_LENGTHS[algorithm] // 2
+
+    with tempfile.TemporaryDirectory(prefix="known-runs-") as run_dir:
+        # Pass 1: sorted runs of at most run_size digests
+        run_files = []
+        pending = bytearray()
+        total = 0
+
+        def spill():
+            run_file = os.path.join(run_dir, f"run{len(run_files)}")
+            with open(run_file, "wb") as f:
+                f.write(_sorted_run(pending, digest_size))
+            run_files.append(run_file)
+            pending.clear()
+
+        for list_file in list_files:
+            for digest in iter_list_digests(list_file, algorithm):
+                pending += digest
+                total += 1
+                if len(pending) >= run_size * digest_size:
+                    spill()
+                    if progress_callback:
+                        progress_callback(total)
+        if pending or not run_files:
+            spill()
+
+        # Pass 2: merge the runs into the index, sized for the upper bound
+        bits = max(64, -(-total * bits_per_entry // 64) * 64)
+        bloom = bytearray(bits // 8)
+        fanout = [0] * 256
+        data_offset = _HEADER.size + _FANOUT.size + len(bloom)
+        directory = os.path.dirname(os.path.abspath(output_file))
+        fd, temp_file = tempfile.mkstemp(prefix=".known-", dir=directory)
+        count = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.seek(data_offset)
+                streams = [_iter_run(run_file, digest_size) for run_file in run_files]
+                block = bytearray()
+                previous = None
+                for digest in heapq.merge(*streams):
+                    if digest == previous:
+                        continue
+                    previous = digest
+                    block += digest
+                    fanout[digest[0]] += 1
+                    count += 1
+                    if len(block) >= MERGE_BLOCK * digest_size:
+                        _fill_bloom(bloom, block, digest_size, bits, BLOOM_HASHES)
+                        out.write(block)
+                        block.clear()
+                _fill_bloom(bloom, block, digest_size, bits, BLOOM_HASHES)
+                out.write(block)
+
+                cumulative = 0
+                for index, bucket in enumerate(fanout):
+                    cumulative += bucket
+                    fanout[index] = cumulative
+                out.seek(0)
+                out.write(_HEADER.pack(MAGIC, VERSION, algorithm.encode("ascii"), digest_size,
+                                       BLOOM_HASHES, count, bits))
+                out.write(_FANOUT.pack(*fanout))
+                out.write(bloom)
+            os.replace(temp_file, output_file)
+        except BaseException:
+            os.unlink(temp_file)
+            raise
+    return count
+
+
+def _iter_run(run_file, digest_size):
+    """Stream the digests of one sorted run"""
+    with open(run_file, "rb") as f:
+        while True:
+            block = f.read(MERGE_BLOCK * digest_size)
+            if not block:
+                return
+            for offset in range(0, len(block), digest_size):
+                yield block[offset:offset + digest_size]
+
+
+class KnownHashIndex:
+    """
+    Read-only, memory-mapped known-hash index.
+
+    Supports `digest in index` for hex strings or raw digest bytes.
+
+    Args:
+        index_file (str): Path to an index written by build_index
+    """
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        with open(index_file, "rb") as f:
+            header = f.read(_HEADER.size + _FANOUT.size)
+            if len(header) < _HEADER.size + _FANOUT.size:
+                raise ValueError(f"{index_file}: not a known-hash index")
+            magic, version, algorithm, digest_size, hashes, count, bits = _HEADER.unpack_from(header)
+            if magic != MAGIC:
+                raise ValueError(f"{index_file}: not a known-hash index")
+            if version != VERSION:
+                raise ValueError(f"{index_file}: unsupported index version {version}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.algorithm = algorithm.rstrip(b"\0").decode("ascii")
+        self.digest_size = digest_size
+        self.count = count
+        self._hashes = hashes
+        self._bits = bits
+        self._fanout = (0,) + _FANOUT.unpack_from(header, _HEADER.size)
+        self._bloom_offset = _HEADER.size + _FANOUT.size
+        self._data_offset = self._bloom_offset + bits // 8
+        if len(self._mmap) != self._data_offset + count * digest_size:
+            self._mmap.close()
+            raise ValueError(f"{index_file}: truncated known-hash index")
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, digest):
+        if isinstance(digest, str):
+            try:
+                digest = bytes.fromhex(digest)
+            except ValueError:
+                return False
+        if len(digest) != self.digest_size:
+            return False
+        data = self._mmap
+        offset = self._bloom_offset
+        for position in _bloom_positions(digest, self._bits, self._hashes):
+            if not data[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        # Probable hit: binary search within the digest's fanout bucket
+        size = self.digest_size
+        base = self._data_offset
+        low, high = self._fanout[digest[0]], self._fanout[digest[0] + 1]
+        while low < high:
+            middle = (low + high) // 2
+            start = base + middle * size
+            candidate = data[start:start + size]
+            if candidate < digest:
+                low = middle + 1
+            elif candidate > digest:
+                high = middle
+            else:
+                return True
+        return False
+
+    def close(self):
+        """Release the memory mapping"""
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_indexes(specs):
+    """
+    Open labelled known-hash indexes.
+
+    Args:
+        specs (list): "LABEL=INDEX" strings, or plain index paths (the
+                      label is then the file name without extension)
+
+    Returns:
+        dict: Label to KnownHashIndex
+    """
+    indexes = {}
+    try:
+        for spec in specs:
+            label, separator, index_file = spec.partition("=")
+            if not separator:
+                index_file = spec
+                label = os.path.splitext(os.path.basename(spec))[0]
+            indexes[label] = KnownHashIndex(index_file)
+    except BaseException:
+        for index in indexes.values():
+            index.close()
+        raise
+    return indexes
+
+
+def match_labels(digest, indexes):
+    """
+    Look a digest up in labelled indexes.
+
+    Args:
+        digest (str): Hexadecimal digest
+        indexes (dict): Label to KnownHashIndex
+
+    Returns:
+        list: Labels of the indexes that contain the digest
+    """
+    return [label for label, index in indexes.items() if digest in index]
+
+
+def tag_hashes(hash_results, indexes):
+    """
+    Tag batch_hash_files output with known-hash list membership.
+
+    Args:
+        hash_results (dict): File paths and hashes, as returned by
+                             batch_hash_files ("Error: ..." values are skipped)
+        indexes (dict): Label to KnownHashIndex
+
+    Returns:
+        dict: File path to the list of matching labels, for matched files only
+    """
+    tags = {}
+    for file_path, digest in hash_results.items():
+        if digest is None or digest.startswith("Error:"):
+            continue
+        labels = match_labels(digest, indexes)
+        if labels:
+            tags[file_path] = labels
+    return tags
+
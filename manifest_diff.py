@@ -0,0 +1,208 @@
+# manifest_diff.py
+# External-sort baseline diff for File Integrity Checker
+# Compares baselines far larger than memory with a bounded footprint
+#
+# diff_baselines keeps the whole old baseline in a dict, which stops
+# working somewhere in the tens of millions of entries. Here each input
+# is sorted by path externally instead:
+#
+#   1. the baseline is cut into chunks sized from the memory ceiling;
+#      each chunk is parsed, sorted and spilled to disk as a run, by
+#      several worker processes at once
+#   2. runs are k-way merged (in several passes if there are very many)
+#   3. the two sorted streams are joined in one sequential pass, and
+#      added/removed/changed entries are emitted as they are found
+#
+# Only a few chunks and one read buffer per merged run are ever held in
+# memory. Changes come out in path order.
+
+import heapq
+import itertools
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from baseline_store import read_baseline_header
+from hash_generator_advanced import compare_hashes
+
+
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+MIN_CHUNK_SIZE = 1024 * 1024
+MAX_FAN_IN = 64                 # Runs merged at once; more are merged in passes
+EXPANSION = 4                   # Parsed records take about this many times their text size
+RUN_BUFFER = 64 * 1024
+
+_decode = json.JSONDecoder().decode
+_UNESCAPE = re.compile(r"\\[\\tn]")
+_UNESCAPES = {"\\\\": "\\", "\\t": "\t", "\\n": "\n"}
+
+
+def _format_record(record):
+    """Run file line: path, sequence and hash, tab-separated (path escaped)"""
+    path, sequence, digest = record
+    if "\\" in path or "\t" in path or "\n" in path:
+        path = path.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+    return f"{path}\t{sequence}\t{digest or ''}\n"
+
+
+def _parse_record(line):
+    """Inverse of _format_record"""
+    path, sequence, digest = line[:-1].split("\t")
+    if "\\" in path:
+        path = _UNESCAPE.sub(lambda match: _UNESCAPES[match.group()], path)
+    return [path, int(sequence), digest or None]
+
+
+def _sort_run(chunk, first_sequence, run_file):
+    """
+    Parse, sort and spill one chunk of baseline lines (runs in a worker process).
+
+    Records are [path, sequence, hash]; the sequence keeps the file order
+    of duplicate paths so that the last entry wins, as in load_baseline.
+    """
+    records = []
+    for sequence, line in enumerate(chunk.decode("utf-8").split("\n"), first_sequence):
+        if line.strip():
+            entry = _decode(line)
+            records.append([entry["path"], sequence, entry.get("hash")])
+    records.sort()
+    with open(run_file, "w", encoding="utf-8", errors="surrogatepass", newline="\n") as f:
+        f.writelines(map(_format_record, records))
+    return run_file
+
+
+def _iter_run(run_file):
+    """Stream the records of a sorted run"""
+    with open(run_file, "r", encoding="utf-8", errors="surrogatepass", newline="\n",
+              buffering=RUN_BUFFER) as f:
+        for line in f:
+            yield _parse_record(line)
+
+
+def _iter_chunks(input_file, chunk_size):
+    """
+    Cut a baseline into chunks of whole lines, skipping the header.
+
+    Yields:
+        tuple: (chunk bytes, sequence number of its first line)
+    """
+    with open(input_file, "rb") as f:
+        f.readline()
+        sequence = 0
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            chunk += f.readline()
+            yield chunk, sequence
+            sequence += chunk.count(b"\n")
+
+
+def _make_runs(input_file, run_dir, prefix, memory_limit, workers):
+    """Split a baseline into sorted runs; returns the run file paths"""
+    chunk_size = max(MIN_CHUNK_SIZE, memory_limit // (max(workers, 1) * EXPANSION))
+    chunks = _iter_chunks(input_file, chunk_size)
+    names = (os.path.join(run_dir, f"{prefix}{index}") for index in itertools.count())
+    if workers <= 1:
+        return [_sort_run(chunk, sequence, next(names)) for chunk, sequence in chunks]
+
+    run_files = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep at most one chunk per worker in flight to stay under the ceiling
+        pending = []
+        for chunk, sequence in chunks:
+            if len(pending) >= workers:
+                run_files.append(pending.pop(0).result())
+            pending.append(pool.submit(_sort_run, chunk, sequence, next(names)))
+        run_files += [future.result() for future in pending]
+    return run_files
+
+
+def _merge_runs(run_files, run_dir, prefix):
+    """Merge runs in passes until at most MAX_FAN_IN are left"""
+    generation = 0
+    while len(run_files) > MAX_FAN_IN:
+        merged = []
+        for start in range(0, len(run_files), MAX_FAN_IN):
+            group = run_files[start:start + MAX_FAN_IN]
+            merged_file = os.path.join(run_dir, f"{prefix}m{generation}-{start}")
+            with open(merged_file, "w", encoding="utf-8", errors="surrogatepass", newline="\n") as f:
+                f.writelines(map(_format_record, heapq.merge(*[_iter_run(run_file) for run_file in group])))
+            for run_file in group:
+                os.unlink(run_file)
+            merged.append(merged_file)
+        run_files = merged
+        generation += 1
+    return run_files
+
+
+def _latest(records):
+    """Collapse consecutive records of the same path to the last one"""
+    current = None
+    for record in records:
+        if current is not None and record[0] != current[0]:
+            yield current
+        current = record
+    if current is not None:
+        yield current
+
+
+def sorted_entries(input_file, run_dir, prefix="run", memory_limit=DEFAULT_MEMORY_LIMIT, workers=1):
+    """
+    Stream a baseline's entries sorted by path, using external sorting.
+
+    Args:
+        input_file (str): Path to the baseline file
+        run_dir (str): Directory for the sorted runs
+        prefix (str): Run file name prefix (unique per input in run_dir)
+        memory_limit (int): Approximate memory ceiling in bytes
+        workers (int): Processes generating runs in parallel
+
+    Yields:
+        tuple: (path, hash), one per distinct path, in path order
+    """
+    read_baseline_header(input_file)
+    run_files = _make_runs(input_file, run_dir, prefix, memory_limit, workers)
+    run_files = _merge_runs(run_files, run_dir, prefix)
+    for path, _, digest in _latest(heapq.merge(*[_iter_run(run_file) for run_file in run_files])):
+        yield path, digest
+
+
+def diff_manifests(old_file, new_file, memory_limit=DEFAULT_MEMORY_LIMIT, workers=1, temp_dir=None):
+    """
+    Compare two baseline files of any size (sort-merge join).
+
+    Produces the same changes as diff_baselines, in path order. A path
+    listed twice in one baseline counts once, with its last entry.
+
+    Args:
+        old_file (str): Path to the older baseline
+        new_file (str): Path to the newer baseline
+        memory_limit (int): Approximate memory ceiling in bytes
+        workers (int): Processes generating sorted runs in parallel
+        temp_dir (str): Directory for spilled runs (default: system temp)
+
+    Yields:
+        dict: One change per differing path, with "change" set to
+              added, removed or changed
+    """
+    # Both inputs are sorted one after the other, so each may use the whole budget
+    with tempfile.TemporaryDirectory(prefix="manifest-diff-", dir=temp_dir) as run_dir:
+        old_entries = sorted_entries(old_file, run_dir, "old", memory_limit, workers)
+        new_entries = sorted_entries(new_file, run_dir, "new", memory_limit, workers)
+        old = next(old_entries, None)
+        new = next(new_entries, None)
+        while old is not None or new is not None:
+            if new is None or (old is not None and old[0] < new[0]):
+                yield {"path": old[0], "change": "removed", "old": old[1]}
+                old = next(old_entries, None)
+            elif old is None or new[0] < old[0]:
+                yield {"path": new[0], "change": "added", "new": new[1]}
+                new = next(new_entries, None)
+            else:
+                if not compare_hashes(old[1] or "", new[1] or ""):
+                    yield {"path": new[0], "change": "changed", "old": old[1], "new": new[1]}
+                old = next(old_entries, None)
+                new = next(new_entries, None)
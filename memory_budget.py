@@ -0,0 +1,160 @@
+# memory_budget.py
+# Memory budget for batch runs of File Integrity Checker
+# Sizes workers, read buffers and result queues to stay under a memory limit
+#
+# A batch's memory use grows with the number of workers times their read
+# buffers, with results waiting to be consumed and with results kept for
+# the caller. A MemoryBudget splits a limit between those consumers:
+#
+#   - what the process already uses is reserved up front
+#   - IO_SHARE of the rest goes to read buffers: buffers shrink down to
+#     MIN_BUFFER_SIZE first, then the worker count is reduced
+#   - the remainder bounds the queue of finished results and the number
+#     of results kept in memory before they are spilled to a manifest
+#
+# The limit is a target for the memory this module can control, not a
+# hard cap on the interpreter.
+
+import os
+import sys
+
+
+IO_SHARE = 0.5                  # Part of the free budget for read buffers
+MIN_BUFFER_SIZE = 64 * 1024
+RESULT_SIZE = 1024              # Estimated bytes per result held in memory
+MIN_QUEUE = 16
+
+# Bytes each worker holds for reading, per I/O mode (at buffer_size 1 MiB)
+_BUFFERS_PER_WORKER = {'buffered': 0, 'nocache': 1, 'direct': 1, 'sparse': 2}
+
+
+def current_rss():
+    """
+    Resident set size of this process.
+
+    Returns:
+        int: Bytes, or 0 where it cannot be measured
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+def peak_rss():
+    """
+    Peak resident set size of this process (since the last reset_peak_rss).
+
+    Returns:
+        int: Bytes, or 0 where it cannot be measured
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def reset_peak_rss():
+    """
+    Restart peak RSS tracking (Linux only; elsewhere the peak is lifetime).
+
+    Returns:
+        bool: True if the peak was reset
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class MemoryBudget:
+    """
+    Memory limit for one batch run.
+
+    Args:
+        limit (int): Memory limit in bytes for the whole process
+        reserve (int): Bytes already in use that the batch cannot free
+                       (default: the current RSS)
+    """
+
+    def __init__(self, limit, reserve=None):
+        if limit <= 0:
+            raise ValueError(f"Invalid memory limit: {limit}")
+        self.limit = limit
+        self.reserve = current_rss() if reserve is None else reserve
+
+    @property
+    def available(self):
+        """Bytes of the limit left for the batch"""
+        return max(0, self.limit - self.reserve)
+
+    def plan(self, workers=1, io_mode='buffered', pipeline=False, buffer_size=1024 * 1024, buffer_count=4):
+        """
+        Fit a batch configuration into the budget.
+
+        Args:
+            workers (int): Requested worker threads
+            io_mode (str): I/O mode of the batch
+            pipeline (bool): Whether pipelined reads are used
+            buffer_size (int): Requested read buffer size
+            buffer_count (int): Buffers per pipelined read
+
+        Returns:
+            dict: "workers", "buffer_size", "queue_size" (finished results
+                  waiting for the consumer) and "spill_threshold" (results
+                  kept in memory before spilling)
+        """
+        buffers = _BUFFERS_PER_WORKER.get(io_mode, 1) + (buffer_count if pipeline else 0)
+        io_budget = int(self.available * IO_SHARE)
+        workers = max(1, workers)
+        if buffers:
+            fitted = min(buffer_size, io_budget // (workers * buffers))
+            # Powers of two keep nocache windows and O_DIRECT alignment intact
+            buffer_size = max(MIN_BUFFER_SIZE, 1 << max(0, fitted.bit_length() - 1))
+            workers = max(1, min(workers, io_budget // (buffers * buffer_size)))
+        result_budget = self.available - workers * buffers * buffer_size
+        results = max(MIN_QUEUE, result_budget // RESULT_SIZE)
+        return {
+            "workers": workers,
+            "buffer_size": buffer_size,
+            "queue_size": max(MIN_QUEUE, min(results // 4, 64 * workers)),
+            "spill_threshold": results,
+        }
+
+
+def fit_batch(memory_budget, workers, hash_options):
+    """
+    Apply a budget's plan to a batch's settings.
+
+    Sets "buffer_size" in hash_options when reads use buffers.
+
+    Args:
+        memory_budget (MemoryBudget): The budget, or None for no limit
+        workers (int): Requested worker threads
+        hash_options (dict): generate_file_hash keyword arguments (updated)
+
+    Returns:
+        tuple: (workers, max_pending) to run the batch with; max_pending
+               is None without a budget
+    """
+    if memory_budget is None:
+        return workers, None
+    io_mode = hash_options.get("io_mode", "buffered")
+    pipeline = hash_options.get("pipeline", False)
+    plan = memory_budget.plan(workers, io_mode, pipeline)
+    if pipeline or io_mode != 'buffered':
+        hash_options["buffer_size"] = plan["buffer_size"]
+    return plan["workers"], plan["queue_size"]
@@ -0,0 +1,393 @@
+# merkle_rollup.py
+# Directory rollup digests for File Integrity Checker
+# Merkle-style per-directory digests stored next to a baseline
+#
+# Each directory's digest is the hash of its children's names and digests
+# (files and subdirectories alike), so two directories with the same
+# digest hold identical trees. Comparing two rollups starts at the roots
+# and only descends into subdirectories whose digests differ: the work is
+# proportional to the differences, not to the size of the tree.
+#
+# The rollup file (<baseline>.rollup) is JSON Lines:
+#
+#   header     format, version, algorithm and the baseline it belongs to
+#   records    one per directory, children before parents; each lists its
+#              files (name: digest) and subdirectories (name: [digest,
+#              byte offset of their record])
+#   trailer    {"root": offset of the top directory record, "baseline":
+#              generation of the baseline it matches}
+#
+# Any directory can be read with one seek from its parent. Updates are
+# copy-on-write: the changed directories and their ancestors are appended
+# with a new trailer, so changing a file costs one record per level.
+# Rebuilding the rollup compacts the superseded records away.
+#
+# The baseline's generation (a random id in its header, see BaselineWriter)
+# ties the rollup to one version of its digests. It travels with copies of
+# the baseline, so a copied baseline and rollup still match. Tools that
+# change digests in place (accepting changes, advancing append-only
+# checkpoints) give the baseline a new generation, so a rollup left over
+# from before is no longer trusted; rewrites that only keep state (sample)
+# keep the generation.
+
+import json
+import os
+import tempfile
+
+from baseline_store import read_baseline_header
+from hash_generator_advanced import new_hash
+
+
+FORMAT_NAME = "file-integrity-rollup"
+FORMAT_VERSION = 1
+ROLLUP_SUFFIX = ".rollup"
+TRAILER_SIZE = 4096             # Bytes read from the end to find the trailer
+
+
+def split_path(path):
+    """Split a baseline path into directory components and the file name"""
+    path = path.replace(os.sep, "/")
+    parts = [part for part in path.split("/") if part]
+    if path.startswith("/"):
+        parts.insert(0, "/")
+    return parts
+
+
+def join_path(parts):
+    """Inverse of split_path"""
+    if parts and parts[0] == "/":
+        return "/" + "/".join(parts[1:])
+    return "/".join(parts)
+
+
+def directory_digest(algorithm, files, dirs):
+    """
+    Digest of a directory from its children.
+
+    Args:
+        algorithm (str): Hash algorithm
+        files (dict): File name to hex digest
+        dirs (dict): Subdirectory name to [hex digest, offset]
+
+    Returns:
+        str: Hexadecimal digest
+    """
+    children = [(name, b"f", digest) for name, digest in files.items()]
+    children += [(name, b"d", child[0]) for name, child in dirs.items()]
+    children.sort()
+    hash_obj = new_hash(algorithm)
+    for name, kind, digest in children:
+        hash_obj.update(kind + name.encode("utf-8", "surrogateescape") + b"\0" + bytes.fromhex(digest))
+    return hash_obj.hexdigest()
+
+
+def rollup_path(baseline_file):
+    """Sidecar rollup file of a baseline"""
+    return baseline_file + ROLLUP_SUFFIX
+
+
+def baseline_fingerprint(baseline_file):
+    """Generation of a baseline's digests (its creation time for baselines without one)"""
+    header = read_baseline_header(baseline_file)
+    return header.get("generation") or header.get("created")
+
+
+class _Writer:
+    """Append directory records to a rollup file, tracking their offsets"""
+
+    def __init__(self, f, algorithm):
+        self.f = f
+        self.algorithm = algorithm
+
+    def write(self, record):
+        offset = self.f.tell()
+        self.f.write(json.dumps(record).encode("utf-8") + b"\n")
+        return offset
+
+    def write_directory(self, parts, files, dirs):
+        digest = directory_digest(self.algorithm, files, dirs)
+        offset = self.write({"path": join_path(parts), "digest": digest, "files": files, "dirs": dirs})
+        return digest, offset
+
+
+def build_rollup(baseline_file, output_file=None, memory_limit=None, workers=1):
+    """
+    Build the directory rollup of a baseline.
+
+    The baseline is streamed in path order (sorted on disk, see
+    manifest_diff), so only the directories on the current path are
+    held in memory.
+
+    Args:
+        baseline_file (str): Path to the baseline file
+        output_file (str): Rollup file (default: <baseline>.rollup)
+        memory_limit (int): Memory ceiling for sorting the baseline
+        workers (int): Processes sorting the baseline in parallel
+
+    Returns:
+        str: Root directory digest
+    """
+    from manifest_diff import sorted_entries, DEFAULT_MEMORY_LIMIT
+
+    fingerprint = baseline_fingerprint(baseline_file)
+    header = read_baseline_header(baseline_file)
+    algorithm = header["algorithm"]
+    output_file = output_file or rollup_path(baseline_file)
+    directory = os.path.dirname(os.path.abspath(output_file))
+    fd, temp_file = tempfile.mkstemp(prefix=".rollup-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f, tempfile.TemporaryDirectory(prefix="rollup-") as run_dir:
+            writer = _Writer(f, algorithm)
+            writer.write({"format": FORMAT_NAME, "version": FORMAT_VERSION, "algorithm": algorithm,
+                          "baseline": os.path.basename(baseline_file), "created": header.get("created")})
+            # Open directories from the top down: [name, files, dirs]
+            stack = [[None, {}, {}]]
+
+            def close_top():
+                name, files, dirs = stack.pop()
+                child = writer.write_directory([level[0] for level in stack[1:]] + [name], files, dirs)
+                stack[-1][2][name] = list(child)
+
+            entries = sorted_entries(baseline_file, run_dir, "rollup",
+                                     memory_limit or DEFAULT_MEMORY_LIMIT, workers)
+            for path, digest in entries:
+                if digest is None:
+                    continue
+                parts = split_path(path)
+                if not parts:
+                    continue
+                # Sorted paths keep every directory's entries contiguous
+                depth = 1
+                while depth < len(stack) and depth <= len(parts) - 1 and stack[depth][0] == parts[depth - 1]:
+                    depth += 1
+                while len(stack) > depth:
+                    close_top()
+                for name in parts[len(stack) - 1:-1]:
+                    stack.append([name, {}, {}])
+                stack[-1][1][parts[-1]] = digest
+            while len(stack) > 1:
+                close_top()
+            root_digest, root_offset = writer.write_directory([], stack[0][1], stack[0][2])
+            writer.write({"root": root_offset, "baseline": fingerprint})
+        os.replace(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+        raise
+    return root_digest
+
+
+class RollupFile:
+    """
+    Random access to the directory records of a rollup file.
+
+    Args:
+        rollup_file (str): Path to the rollup file
+    """
+
+    def __init__(self, rollup_file):
+        self.rollup_file = rollup_file
+        self._file = open(rollup_file, "rb")
+        try:
+            self.header = json.loads(self._file.readline())
+            if self.header.get("format") != FORMAT_NAME:
+                raise ValueError(f"Not a rollup file: {rollup_file}")
+            self.algorithm = self.header["algorithm"]
+            trailer = self._read_trailer()
+            self.root_offset = trailer["root"]
+            self.fingerprint = trailer.get("baseline")
+        except BaseException:
+            self._file.close()
+            raise
+        self.records_read = 0
+
+    def _read_trailer(self):
+        size = self._file.seek(0, os.SEEK_END)
+        self._file.seek(max(0, size - TRAILER_SIZE))
+        lines = self._file.read().rstrip(b"\n").split(b"\n")
+        trailer = json.loads(lines[-1])
+        if "root" not in trailer:
+            raise ValueError(f"Incomplete rollup file: {self.rollup_file}")
+        return trailer
+
+    def record(self, offset):
+        """Read the directory record at a byte offset"""
+        self._file.seek(offset)
+        self.records_read += 1
+        return json.loads(self._file.readline())
+
+    def find(self, path):
+        """
+        Read the record of a directory.
+
+        Args:
+            path (str): Directory path, as in the baseline
+
+        Returns:
+            dict: Directory record, or None if the rollup has no such directory
+        """
+        record = self.record(self.root_offset)
+        for name in split_path(path):
+            child = record["dirs"].get(name)
+            if child is None:
+                return None
+            record = self.record(child[1])
+        return record
+
+    def iter_files(self, record):
+        """Yield (path, digest) for every file below a directory record"""
+        pending = [record]
+        while pending:
+            record = pending.pop()
+            for name, digest in sorted(record["files"].items()):
+                yield join_path(split_path(record["path"]) + [name]), digest
+            pending.extend(self.record(child[1]) for _, child in sorted(record["dirs"].items(), reverse=True))
+
+    def update(self, changes, baseline_file=None):
+        """
+        Apply file digest changes (copy-on-write).
+
+        Only the directories holding changed files and their ancestors
+        are rehashed and appended; everything else is left as it is.
+
+        Args:
+            changes (dict): File path to new hex digest, or None if removed
+            baseline_file (str): The baseline, already holding the same
+                                 changes; the rollup is marked as matching
+                                 its current version. Without it the
+                                 rollup no longer matches any baseline
+
+        Returns:
+            str: New root directory digest
+        """
+        touched = {(): self.record(self.root_offset)}
+
+        def node(parts):
+            key = tuple(parts)
+            if key not in touched:
+                parent = node(parts[:-1])
+                child = parent["dirs"].get(parts[-1])
+                touched[key] = self.record(child[1]) if child else {"files": {}, "dirs": {}}
+            return touched[key]
+
+        for path, digest in changes.items():
+            parts = split_path(path)
+            files = node(parts[:-1])["files"]
+            if digest is None:
+                files.pop(parts[-1], None)
+            else:
+                files[parts[-1]] = digest
+
+        with open(self.rollup_file, "ab") as f:
+            writer = _Writer(f, self.algorithm)
+            # Deepest first, so every parent sees its children's new digests
+            for key in sorted(touched, key=len, reverse=True):
+                record = touched[key]
+                if key and not record["files"] and not record["dirs"]:
+                    touched[key[:-1]]["dirs"].pop(key[-1], None)
+                    continue
+                digest, offset = writer.write_directory(list(key), record["files"], record["dirs"])
+                if key:
+                    touched[key[:-1]]["dirs"][key[-1]] = [digest, offset]
+            self.fingerprint = baseline_fingerprint(baseline_file) if baseline_file else None
+            writer.write({"root": offset, "baseline": self.fingerprint})
+        self.root_offset = offset
+        return digest
+
+    def close(self):
+        """Close the rollup file"""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def matching_rollup(baseline_file):
+    """
+    Open a baseline's rollup if it exists and belongs to this version of
+    the baseline (see baseline_fingerprint).
+
+    Args:
+        baseline_file (str): Path to the baseline file
+
+    Returns:
+        RollupFile: The open rollup, or None
+    """
+    try:
+        rollup = RollupFile(rollup_path(baseline_file))
+    except (OSError, ValueError):
+        return None
+    header = read_baseline_header(baseline_file)
+    if (rollup.header.get("created") != header.get("created")
+            or rollup.algorithm != header["algorithm"]
+            or rollup.fingerprint != (header.get("generation") or header.get("created"))):
+        rollup.close()
+        return None
+    return rollup
+
+
+def _top(rollup, root):
+    """Record of the directory to compare from; an empty one if it is absent"""
+    if root is None:
+        return rollup.record(rollup.root_offset)
+    record = rollup.find(root)
+    if record is None:
+        record = {"path": join_path(split_path(root)), "digest": None, "files": {}, "dirs": {}}
+    return record
+
+
+def diff_rollups(old_rollup, new_rollup, old_root=None, new_root=None):
+    """
+    Compare two trees by their rollups, descending only where they differ.
+
+    By default files are matched by their full paths, like
+    diff_baselines. To compare replicas stored under different paths,
+    name the directory to compare on each side; paths are then reported
+    under new_root.
+
+    Args:
+        old_rollup (RollupFile): Rollup of the older (or reference) tree
+        new_rollup (RollupFile): Rollup of the newer tree
+        old_root (str): Directory of the old tree to compare from
+        new_root (str): Directory of the new tree to compare it with
+                        (default: old_root)
+
+    Yields:
+        dict: One change per differing file, with "change" set to
+              added, removed or changed
+    """
+    if old_rollup.algorithm != new_rollup.algorithm:
+        raise ValueError(f"Rollups use different algorithms: {old_rollup.algorithm}, {new_rollup.algorithm}")
+    if new_root is None:
+        new_root = old_root
+    old_top, new_top = _top(old_rollup, old_root), _top(new_rollup, new_root)
+    old_parts, new_parts = split_path(old_top["path"]), split_path(new_top["path"])
+    pending = [(old_top, new_top)]
+    while pending:
+        old, new = pending.pop()
+        if old["digest"] == new["digest"]:
+            continue
+        directory = split_path(new["path"])
+        for name in sorted(set(old["files"]) | set(new["files"])):
+            old_digest, new_digest = old["files"].get(name), new["files"].get(name)
+            path = join_path(directory + [name])
+            if old_digest is None:
+                yield {"path": path, "change": "added", "new": new_digest}
+            elif new_digest is None:
+                yield {"path": path, "change": "removed", "old": old_digest}
+            elif old_digest != new_digest:
+                yield {"path": path, "change": "changed", "old": old_digest, "new": new_digest}
+        for name in sorted(set(old["dirs"]) | set(new["dirs"]), reverse=True):
+            old_child, new_child = old["dirs"].get(name), new["dirs"].get(name)
+            if old_child is None:
+                for path, digest in new_rollup.iter_files(new_rollup.record(new_child[1])):
+                    yield {"path": path, "change": "added", "new": digest}
+            elif new_child is None:
+                for path, digest in old_rollup.iter_files(old_rollup.record(old_child[1])):
+                    relative = split_path(path)[len(old_parts):]
+                    yield {"path": join_path(new_parts + relative), "change": "removed", "old": digest}
+            elif old_child[0] != new_child[0]:
+                pending.append((old_rollup.record(old_child[1]), new_rollup.record(new_child[1])))
@@ -0,0 +1,208 @@
+# page_cache.py
+# Page-cache-friendly file reading for File Integrity Checker
+# Lets verification sweeps run without evicting other programs' hot data
+#
+# "nocache" mode reads with posix_fadvise(SEQUENTIAL) readahead and drops
+# the pages behind the read cursor with POSIX_FADV_DONTNEED. Pages that
+# were already cached before the read (somebody else's working set) are
+# left alone, using mincore() to tell them apart. "direct" mode bypasses
+# the page cache entirely with O_DIRECT and page-aligned buffers.
+
+import ctypes
+import ctypes.util
+import errno
+import mmap
+import os
+import re
+from collections import deque
+
+
+PAGE_SIZE = mmap.PAGESIZE
+CHUNK_SIZE = 1024 * 1024            # Read size for nocache/direct modes
+DROP_WINDOW = 8 * 1024 * 1024       # Pages are dropped in windows this big
+LOOKAHEAD_WINDOWS = 8               # Must exceed the kernel readahead distance
+
+_NOT_RESIDENT_RUN = re.compile(b"\x00+")
+
+_libc = None
+
+
+def _get_libc():
+    """Load libc with mmap/mincore/munmap prototypes, or None if unavailable"""
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            libc.mmap.restype = ctypes.c_void_p
+            libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int,
+                                  ctypes.c_int, ctypes.c_int, ctypes.c_long]
+            libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+            libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_char_p]
+            _libc = libc
+        except (OSError, AttributeError, TypeError):
+            _libc = False
+    return _libc or None
+
+
+def resident_pages(fd, offset, length):
+    """
+    Report which pages of a file range are in the page cache.
+
+    Args:
+        fd (int): Open file descriptor
+        offset (int): Start of the range (multiple of PAGE_SIZE)
+        length (int): Length of the range in bytes
+
+    Returns:
+        bytes: One byte per page, bit 0 set when resident, or None when
+               mincore() is not available
+    """
+    libc = _get_libc()
+    if libc is None or length <= 0:
+        return None
+    address = libc.mmap(None, length, mmap.PROT_READ, mmap.MAP_SHARED, fd, offset)
+    if address in (None, ctypes.c_void_p(-1).value):
+        return None
+    try:
+        vector = ctypes.create_string_buffer((length + PAGE_SIZE - 1) // PAGE_SIZE)
+        if libc.mincore(address, length, vector) != 0:
+            return None
+        return vector.raw
+    finally:
+        libc.munmap(address, length)
+
+
+def cache_footprint(file_path):
+    """
+    Measure how many bytes of a file are currently in the page cache.
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        int: Resident bytes, or None when it cannot be measured
+    """
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        size = os.fstat(fd).st_size
+        resident = 0
+        for offset in range(0, size, DROP_WINDOW * 16):
+            pages = resident_pages(fd, offset, min(DROP_WINDOW * 16, size - offset))
+            if pages is None:
+                return None
+            resident += len(pages) - pages.count(0)
+        return min(resident * PAGE_SIZE, size)
+    finally:
+        os.close(fd)
+
+
+def _drop_range(fd, offset, length, keep):
+    """Drop a byte range from the cache, except pages flagged in keep"""
+    if keep is None:
+        os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+        return
+    # Runs of non-resident pages are found with a regex, not a page loop
+    for run in _NOT_RESIDENT_RUN.finditer(keep):
+        start = offset + run.start() * PAGE_SIZE
+        end = min(offset + run.end() * PAGE_SIZE, offset + length)
+        os.posix_fadvise(fd, start, end - start, os.POSIX_FADV_DONTNEED)
+
+def iter_chunks_nocache(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Read a file sequentially without leaving it in the page cache.
+
+    The yielded memoryview points into a reusable buffer and is only
+    valid until the next chunk is requested.
+
+    Args:
+        file_path (str): Path to the file
+        chunk_size (int): Bytes per read (should divide DROP_WINDOW)
+
+    Yields:
+        memoryview: File data, chunk by chunk
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as f:
+        fd = f.fileno()
+        if not hasattr(os, "posix_fadvise"):
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    return
+                yield view[:count]
+        # Residency is sampled LOOKAHEAD_WINDOWS ahead of the read cursor,
+        # before our own (doubled, sequential) readahead can reach it
+        snapshots = deque(resident_pages(fd, index * DROP_WINDOW, DROP_WINDOW)
+                          for index in range(LOOKAHEAD_WINDOWS))
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        window_start = 0
+        while True:
+            keep = snapshots.popleft()
+            snapshots.append(resident_pages(
+                fd, window_start + LOOKAHEAD_WINDOWS * DROP_WINDOW, DROP_WINDOW))
+            window_read = 0
+            while window_read < DROP_WINDOW:
+                count = f.readinto(view[:min(chunk_size, DROP_WINDOW - window_read)])
+                if not count:
+                    break
+                window_read += count
+                yield view[:count]
+            if window_read:
+                _drop_range(fd, window_start, DROP_WINDOW, keep)
+            if window_read < DROP_WINDOW:
+                return
+            window_start += DROP_WINDOW
+
+
+def iter_chunks_direct(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Read a file with O_DIRECT into a page-aligned buffer.
+
+    Falls back to iter_chunks_nocache on platforms or file systems that
+    do not support O_DIRECT. The yielded memoryview is only valid until
+    the next chunk is requested.
+
+    Args:
+        file_path (str): Path to the file
+        chunk_size (int): Bytes per read (multiple of PAGE_SIZE)
+
+    Yields:
+        memoryview: File data, chunk by chunk
+    """
+    if not hasattr(os, "O_DIRECT"):
+        yield from iter_chunks_nocache(file_path, chunk_size)
+        return
+    try:
+        fd = os.open(file_path, os.O_RDONLY | os.O_DIRECT)
+    except OSError as e:
+        if e.errno != errno.EINVAL:
+            raise
+        yield from iter_chunks_nocache(file_path, chunk_size)
+        return
+    # Anonymous mmap memory is always page aligned. It is not closed
+    # explicitly because the caller may still hold the last chunk view.
+    buffer = mmap.mmap(-1, chunk_size)
+    view = memoryview(buffer)
+    try:
+        offset = 0
+        while True:
+            try:
+                count = os.readv(fd, [buffer])
+            except OSError as e:
+                if e.errno != errno.EINVAL or offset:
+                    raise
+                # File system accepted O_DIRECT at open time but not for reads
+                break
+            if not count:
+                return
+            offset += count
+            yield view[:count]
+            if count < chunk_size:
+                return
+    finally:
+        os.close(fd)
+    yield from iter_chunks_nocache(file_path, chunk_size)
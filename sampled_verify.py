@@ -0,0 +1,263 @@
+# sampled_verify.py
+# Rotating sample verification for File Integrity Checker
+# Verifies a fraction of a baseline per run, covering every file within N runs
+#
+# Each entry falls into one of N buckets, fixed by a seeded hash of its
+# path; run k verifies bucket k mod N, so every file is re-hashed at least
+# once every N runs. On top of the rotation:
+#   - entries whose size or mtime no longer match the baseline are always
+#     verified (a stat is cheap, a read is not)
+#   - entries matching a priority pattern, or written shortly before the
+#     baseline was recorded, get extra seeded draws
+#   - entries that were somehow not verified for N runs are caught up
+# The bucket members form a pseudo-random sample of the whole baseline,
+# from which the run reports the confidence it reached. The rotation
+# state (seed, period, run counter, per-entry last verified run) is
+# stored in the baseline file itself.
+
+import fnmatch
+import hashlib
+import math
+import os
+import secrets
+import shutil
+import tempfile
+import time
+
+from baseline_store import (
+    BaselineWriter,
+    read_baseline_header,
+    iter_baseline_entries,
+    verify_entry,
+    STATUS_OK,
+    STATUS_ERROR
+)
+
+
+DEFAULT_RUNS = 30
+PRIORITY_WEIGHT = 4         # Priority paths are sampled this many times as often
+RECENT_WEIGHT = 2           # ... and recently written ones this many times
+RECENT_DAYS = 7
+
+# Why an entry was picked
+REASON_ROTATION = "rotation"
+REASON_CHANGED = "changed"
+REASON_OVERDUE = "overdue"
+REASON_WEIGHTED = "weighted"
+
+
+def _draw(seed, *parts):
+    """Deterministic pseudo-random number in [0, 1) from a seed and key"""
+    key = "\0".join([seed] + [str(part) for part in parts]).encode("utf-8", "surrogateescape")
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "big") / 2 ** 64
+
+
+def upper_bound(failures, sample_size, confidence):
+    """
+    One-sided upper confidence bound for a failure rate.
+
+    Exact (Clopper-Pearson) when no failures were seen, Wilson score
+    otherwise.
+
+    Args:
+        failures (int): Failures seen in the sample
+        sample_size (int): Sample size
+        confidence (float): Confidence level, e.g. 0.95
+
+    Returns:
+        float: Failure rate that is exceeded with probability < 1 - confidence
+    """
+    if sample_size <= 0:
+        return 1.0
+    if failures == 0:
+        return 1 - (1 - confidence) ** (1 / sample_size)
+    from statistics import NormalDist
+    z = NormalDist().inv_cdf(confidence)
+    rate = failures / sample_size
+    centre = rate + z * z / (2 * sample_size)
+    margin = z * math.sqrt(rate * (1 - rate) / sample_size + z * z / (4 * sample_size ** 2))
+    return min(1.0, (centre + margin) / (1 + z * z / sample_size))
+
+
+class SampledVerification:
+    """
+    One sampling run over a baseline.
+
+    Args:
+        baseline_file (str): Baseline to sample
+        runs (int): Rotation period: every entry is verified within this
+                    many runs (default: stored state, else DEFAULT_RUNS)
+        priority (list): fnmatch patterns of paths to weight up
+        recent_days (float): Entries written this recently before the
+                             baseline was taken are weighted up
+        seed (str): Rotation seed for a new rotation (default: random)
+    """
+
+    def __init__(self, baseline_file, runs=None, priority=(), recent_days=RECENT_DAYS, seed=None):
+        self.baseline_file = baseline_file
+        self.header = read_baseline_header(baseline_file)
+        state = dict(self.header.get("sampling") or {})
+        state.setdefault("seed", seed or secrets.token_hex(8))
+        state.setdefault("next_run", 0)
+        if runs is not None:
+            state["runs"] = runs
+        state.setdefault("runs", DEFAULT_RUNS)
+        if state["runs"] < 1:
+            raise ValueError(f"Invalid rotation period: {state['runs']}")
+        self.state = state
+        self.run = state["next_run"]
+        self.priority = list(priority)
+        self.recent_ns = recent_days * 86400 * 10 ** 9
+        self.population = 0
+        self.selected = []
+        self.counts = {}
+        self.sample_size = 0
+        self.sample_failures = 0
+        self._verified = set()
+
+    def _bucket(self, path):
+        return int(_draw(self.state["seed"], path) * self.state["runs"])
+
+    def _weight(self, path, entry, created_ns):
+        weight = 1
+        if any(fnmatch.fnmatch(path, pattern) for pattern in self.priority):
+            weight *= PRIORITY_WEIGHT
+        mtime_ns = entry.get("mtime_ns")
+        if mtime_ns is not None and created_ns is not None and created_ns - mtime_ns < self.recent_ns:
+            weight *= RECENT_WEIGHT
+        return weight
+
+    def _stat_changed(self, path, entry):
+        try:
+            stat_info = os.stat(path)
+        except OSError:
+            return True
+        return (stat_info.st_size != entry.get("size", stat_info.st_size)
+                or stat_info.st_mtime_ns != entry.get("mtime_ns", stat_info.st_mtime_ns))
+
+    def plan(self):
+        """
+        Choose the entries to verify in this run.
+
+        Returns:
+            list: (path, entry, reason) tuples
+        """
+        runs = self.state["runs"]
+        fraction = 1 / runs
+        bucket = self.run % runs
+        created = self.header.get("created")
+        try:
+            created_ns = int(time.mktime(time.strptime(created, '%Y-%m-%d %H:%M:%S')) * 10 ** 9)
+        except (TypeError, ValueError):
+            created_ns = None
+
+        self.selected = []
+        self.population = 0
+        for entry in iter_baseline_entries(self.baseline_file):
+            path = entry["path"]
+            self.population += 1
+            last = entry.get("verified_run")
+            if self._bucket(path) == bucket:
+                reason = REASON_ROTATION
+            elif self._stat_changed(path, entry):
+                reason = REASON_CHANGED
+            elif last is not None and self.run - last >= runs:
+                reason = REASON_OVERDUE
+            elif _draw(self.state["seed"], self.run, path) < fraction * (self._weight(path, entry, created_ns) - 1):
+                reason = REASON_WEIGHTED
+            else:
+                continue
+            self.selected.append((path, entry, reason))
+        return self.selected
+
+    def results(self, workers=1, layout=None, **hash_options):
+        """
+        Verify the planned entries (planning first if needed).
+
+        Args:
+            workers (int): Number of worker threads
+            layout (str): Optional physical-layout scheduling (none, inode, fiemap)
+            **hash_options: Extra keyword arguments for generate_file_hash
+
+        Yields:
+            dict: verify_entry result plus the "reason" it was sampled
+        """
+        if not self.selected:
+            self.plan()
+        algorithm = self.header["algorithm"]
+        chunking = self.header.get("chunking")
+        planned = {path: (entry, reason) for path, entry, reason in self.selected}
+
+        def check(path):
+            entry, reason = planned[path]
+            result = verify_entry(path, entry, algorithm, chunking, **hash_options)
+            result["reason"] = reason
+            return result
+
+        if workers > 1 or layout is not None:
+            from batch_scheduler import run_scheduled, LAYOUT_INODE
+            results = run_scheduled(planned, check, workers, layout or LAYOUT_INODE)
+        else:
+            results = map(check, planned)
+        for result in results:
+            status = result["status"]
+            self.counts[status] = self.counts.get(status, 0) + 1
+            if status != STATUS_ERROR:
+                self._verified.add(result["path"])
+            if result["reason"] == REASON_ROTATION:
+                self.sample_size += 1
+                if status != STATUS_OK:
+                    self.sample_failures += 1
+            yield result
+
+    def report(self, confidence=0.95):
+        """
+        Summarize the run and the confidence it reached.
+
+        The rotation bucket is a pseudo-random sample of the baseline, so
+        its failure count bounds the failure rate of all entries.
+
+        Args:
+            confidence (float): Confidence level for the bound
+
+        Returns:
+            dict: Run number, counts, sample size and failure-rate bound
+        """
+        bound = upper_bound(self.sample_failures, self.sample_size, confidence)
+        return {
+            "run": self.run,
+            "runs": self.state["runs"],
+            "population": self.population,
+            "verified": sum(self.counts.values()),
+            "counts": dict(self.counts),
+            "sample_size": self.sample_size,
+            "sample_failures": self.sample_failures,
+            "confidence": confidence,
+            "max_failure_rate": bound,
+            "max_failed_files": math.ceil(bound * self.population),
+        }
+
+    def save(self):
+        """Write the advanced rotation state back into the baseline file"""
+        self.state["next_run"] = self.run + 1
+        self.state["last_run"] = time.strftime('%Y-%m-%d %H:%M:%S')
+        header_fields = {
+            key: value for key, value in self.header.items()
+            if key not in ("format", "version", "algorithm", "created", "sampling")
+        }
+        directory = os.path.dirname(os.path.abspath(self.baseline_file))
+        fd, temp_file = tempfile.mkstemp(prefix=".baseline-", dir=directory)
+        os.close(fd)
+        try:
+            with BaselineWriter(temp_file, self.header["algorithm"], created=self.header["created"],
+                                sampling=self.state, **header_fields) as writer:
+                for entry in iter_baseline_entries(self.baseline_file):
+                    path = entry.pop("path")
+                    if path in self._verified:
+                        entry["verified_run"] = self.run
+                    writer.write_entry(path, entry)
+            shutil.copymode(self.baseline_file, temp_file)
+            os.replace(temp_file, self.baseline_file)
+        except BaseException:
+            os.unlink(temp_file)
+            raise
@@ -0,0 +1,98 @@
+# sparse_io.py
+# Sparse-file aware reading for File Integrity Checker
+# Reads only the data extents of a file and synthesizes its holes
+#
+# VM images and database files are often mostly holes. Reading a hole
+# still makes the kernel copy zeros into our buffer, one read() at a
+# time. With SEEK_DATA/SEEK_HOLE the data extents are enumerated up
+# front; only they are read, and holes are handed to the hash as slices
+# of one preallocated zero buffer, without any system call. The bytes
+# seen by the hash are exactly those of a dense read, so the digest is
+# the same.
+#
+# Platforms or file systems without SEEK_DATA fall back to dense reads.
+
+import errno
+import os
+
+
+CHUNK_SIZE = 1024 * 1024
+
+_zeros = None
+
+
+class ExtentCounter:
+    """Counts the bytes read from disk and the hole bytes synthesized"""
+
+    def __init__(self):
+        self.data_bytes = 0
+        self.hole_bytes = 0
+
+
+def _zero_view(chunk_size):
+    """Shared read-only zero buffer of at least chunk_size bytes"""
+    global _zeros
+    if _zeros is None or len(_zeros) < chunk_size:
+        _zeros = memoryview(bytes(chunk_size))
+    return _zeros
+
+
+def iter_chunks_sparse(file_path, chunk_size=CHUNK_SIZE, counter=None):
+    """
+    Read a file, skipping the holes of sparse files.
+
+    The yielded memoryview is only valid until the next chunk is
+    requested.
+
+    Args:
+        file_path (str): Path to the file
+        chunk_size (int): Bytes per read
+        counter (ExtentCounter): Optional counter of read and hole bytes
+
+    Yields:
+        memoryview: File data (holes as zeros), chunk by chunk
+    """
+    counter = counter or ExtentCounter()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    zeros = _zero_view(chunk_size)[:chunk_size]
+    with open(file_path, "rb", buffering=0) as f:
+        fd = f.fileno()
+        size = os.fstat(fd).st_size
+        offset = 0
+        if hasattr(os, "SEEK_DATA"):
+            while offset < size:
+                try:
+                    data = os.lseek(fd, offset, os.SEEK_DATA)
+                except OSError as e:
+                    if e.errno == errno.ENXIO:
+                        data = size             # Only a hole is left
+                    elif offset == 0 and e.errno in (errno.EINVAL, errno.EOPNOTSUPP):
+                        break                   # No SEEK_DATA here: read densely
+                    else:
+                        raise
+                data = min(data, size)
+                while offset < data:
+                    count = min(chunk_size, data - offset)
+                    counter.hole_bytes += count
+                    offset += count
+                    yield zeros[:count]
+                if offset >= size:
+                    break
+                hole = min(os.lseek(fd, offset, os.SEEK_HOLE), size)
+                os.lseek(fd, offset, os.SEEK_SET)
+                while offset < hole:
+                    count = f.readinto(view[:min(chunk_size, hole - offset)])
+                    if not count:
+                        return                  # Truncated while we read
+                    counter.data_bytes += count
+                    offset += count
+                    yield view[:count]
+        # Dense reads: no SEEK_DATA, or data appended since fstat()
+        os.lseek(fd, offset, os.SEEK_SET)
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                return
+            counter.data_bytes += count
+            yield view[:count]
@@ -0,0 +1,204 @@
+# stream_hash.py
+# Stream hashing for File Integrity Checker
+# Hashes pipes, sockets, HTTP bodies and generated data without temp files
+#
+# generate_file_hash needs a path it can stat and reopen. A HashSession
+# needs neither: data is pushed into it with update(), pulled from any
+# readable binary file object with update_from(), or fed from an iterable
+# of bytes-like blocks with update_iter(). One session can compute several
+# digests over the same bytes, so a stream is only read once. File objects
+# are read into one reusable buffer with readinto() where they support it,
+# so a session allocates nothing per block however long the stream is.
+# Progress is reported in bytes, since a stream's length is not known.
+
+from hash_generator_advanced import new_hash
+
+
+BUFFER_SIZE = 1024 * 1024
+
+
+class HashSession:
+    """
+    Incremental hashing of a stream with one or more algorithms.
+
+    Args:
+        algorithms (list): Hash algorithms, or a single algorithm name
+        backend (str): Hash implementation (hashlib, kernel)
+        progress_callback (function): Optional callback(bytes_hashed)
+        throttle (BudgetController): Optional I/O and CPU budget to respect
+        buffer_size (int): Size of the reusable read buffer of update_from
+    """
+
+    def __init__(self, algorithms=('sha256',), backend='hashlib', progress_callback=None,
+                 throttle=None, buffer_size=BUFFER_SIZE):
+        if isinstance(algorithms, str):
+            algorithms = [algorithms]
+        if not algorithms:
+            raise ValueError("No hash algorithm given")
+        self.hashers = {algorithm.lower(): new_hash(algorithm, backend) for algorithm in algorithms}
+        self.progress_callback = progress_callback
+        self.throttle = throttle
+        self.buffer_size = buffer_size
+        self.bytes_hashed = 0
+        self._buffer = None
+        self._digests = None
+
+    def update(self, data):
+        """
+        Hash more data.
+
+        Args:
+            data (bytes-like): Any object supporting the buffer protocol
+        """
+        if self._digests is not None:
+            raise ValueError("Hash session already finished")
+        count = memoryview(data).nbytes
+        if not count:
+            return
+        for hash_obj in self.hashers.values():
+            hash_obj.update(data)
+        if self.throttle is not None:
+            self.throttle.consume(count)
+        self.bytes_hashed += count
+        if self.progress_callback:
+            self.progress_callback(self.bytes_hashed)
+
+    def update_iter(self, blocks):
+        """
+        Hash every block of an iterable (e.g. a generator or an HTTP
+        response's iter_content()).
+
+        Args:
+            blocks (iterable): bytes-like blocks
+
+        Returns:
+            int: Number of bytes hashed
+        """
+        started = self.bytes_hashed
+        for block in blocks:
+            self.update(block)
+        return self.bytes_hashed - started
+
+    def update_from(self, file_obj, limit=None):
+        """
+        Hash a readable binary file object up to EOF (or limit bytes).
+
+        Objects with readinto() (files, sys.stdin.buffer, socket.makefile,
+        http.client responses) are read into the session's reusable
+        buffer; others are read with read().
+
+        Args:
+            file_obj: Readable binary file object
+            limit (int): Optional maximum number of bytes to hash
+
+        Returns:
+            int: Number of bytes hashed
+        """
+        started = self.bytes_hashed
+        readinto = getattr(file_obj, "readinto", None)
+        if readinto is not None and self._buffer is None:
+            self._buffer = memoryview(bytearray(self.buffer_size))
+        while limit is None or self.bytes_hashed - started < limit:
+            size = self.buffer_size
+            if limit is not None:
+                size = min(size, limit - (self.bytes_hashed - started))
+            if readinto is not None:
+                count = readinto(self._buffer[:size])
+                if count is None:
+                    raise BlockingIOError("Non-blocking stream has no data ready")
+                block = self._buffer[:count]
+            else:
+                block = file_obj.read(size)
+                if block is None:
+                    raise BlockingIOError("Non-blocking stream has no data ready")
+                count = len(block)
+            if not count:
+                break
+            self.update(block)
+        return self.bytes_hashed - started
+
+    def _finish(self):
+        if self._digests is None:
+            self._digests = {name: hash_obj.hexdigest() for name, hash_obj in self.hashers.items()}
+            self._buffer = None
+        return self._digests
+
+    def hexdigest(self, algorithm=None):
+        """
+        Finish the session and return one digest.
+
+        Args:
+            algorithm (str): Algorithm to return (default: the first one)
+
+        Returns:
+            str: Hexadecimal digest
+        """
+        digests = self._finish()
+        if algorithm is None:
+            return next(iter(digests.values()))
+        return digests[algorithm.lower()]
+
+    def hexdigests(self):
+        """
+        Finish the session and return every digest.
+
+        Returns:
+            dict: Upper-case algorithm name to hexadecimal digest, like
+                  generate_multiple_hashes
+        """
+        return {name.upper(): value for name, value in self._finish().items()}
+
+
+def _feed(session, source):
+    """Feed a file object, bytes-like object or iterable of blocks"""
+    if hasattr(source, "read"):
+        session.update_from(source)
+        return
+    try:
+        memoryview(source)
+    except TypeError:
+        session.update_iter(source)
+        return
+    session.update(source)
+
+
+def hash_stream(source, algorithm='sha256', progress_callback=None, backend='hashlib', throttle=None,
+                buffer_size=BUFFER_SIZE):
+    """
+    Hash a stream.
+
+    Args:
+        source: Readable binary file object, bytes-like object, or an
+                iterable of bytes-like blocks
+        algorithm (str): Hash algorithm (md5, sha1, sha256, sha512)
+        progress_callback (function): Optional callback(bytes_hashed)
+        backend (str): Hash implementation (hashlib, kernel)
+        throttle (BudgetController): Optional I/O and CPU budget to respect
+        buffer_size (int): Read buffer size for file objects
+
+    Returns:
+        str: Hexadecimal hash of the stream
+    """
+    session = HashSession([algorithm], backend, progress_callback, throttle, buffer_size)
+    _feed(session, source)
+    return session.hexdigest()
+
+
+def hash_stream_multiple(source, algorithms=('md5', 'sha1', 'sha256', 'sha512'), progress_callback=None,
+                         buffer_size=BUFFER_SIZE):
+    """
+    Hash a stream with several algorithms, reading it once.
+
+    Args:
+        source: Readable binary file object, bytes-like object, or an
+                iterable of bytes-like blocks
+        algorithms (list): Hash algorithms
+        progress_callback (function): Optional callback(bytes_hashed)
+        buffer_size (int): Read buffer size for file objects
+
+    Returns:
+        dict: Upper-case algorithm name to hexadecimal digest
+    """
+    session = HashSession(algorithms, progress_callback=progress_callback, buffer_size=buffer_size)
+    _feed(session, source)
+    return session.hexdigests()
@@ -0,0 +1,211 @@
+# throttle.py
+# I/O and CPU budget control for File Integrity Checker
+# Lets integrity sweeps run in the background on busy production hosts
+#
+# A BudgetController is shared by every worker of a batch. The hashing
+# loop calls consume() after each chunk it reads; consume() sleeps as
+# needed to keep the sweep under:
+#   - a byte rate (token bucket, MB/s)
+#   - a share of one CPU (process CPU time / wall time)
+# Both limits can be changed while the batch is running. With backoff
+# thresholds set, the controller also watches /proc/pressure/io and the
+# load average and slows the sweep down further while the host is busy.
+
+import os
+import threading
+import time
+
+
+MB = 1024 * 1024
+BURST_SECONDS = 0.25        # Token bucket capacity, in seconds of rate
+CPU_WINDOW = 1.0            # CPU share is measured over windows this long
+CHECK_INTERVAL = 1.0        # Seconds between load / pressure checks
+MIN_BACKOFF = 1 / 16        # Slowest the backoff will go, as a rate factor
+
+
+def read_io_pressure():
+    """
+    Read the io "some avg10" value from Linux pressure stall information.
+
+    Returns:
+        float: Percentage of time tasks stalled on I/O, or None if unavailable
+    """
+    try:
+        with open("/proc/pressure/io") as f:
+            for line in f:
+                if line.startswith("some"):
+                    for field in line.split()[1:]:
+                        key, _, value = field.partition("=")
+                        if key == "avg10":
+                            return float(value)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def read_load_per_cpu():
+    """
+    Read the 1-minute load average divided by the CPU count.
+
+    Returns:
+        float: Load per CPU, or None where os.getloadavg is unavailable
+    """
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (OSError, AttributeError):
+        return None
+
+
+class BudgetController:
+    """
+    Token-bucket byte rate limit plus CPU share target, adjustable at runtime.
+
+    Args:
+        max_mb_per_sec (float): Byte rate cap in MB/s (None = unlimited)
+        cpu_share (float): Target fraction of one CPU, 0-1 (None = unlimited)
+        pressure_threshold (float): Back off while io pressure avg10 exceeds this
+        load_threshold (float): Back off while load per CPU exceeds this
+    """
+
+    def __init__(self, max_mb_per_sec=None, cpu_share=None,
+                 pressure_threshold=None, load_threshold=None):
+        self._lock = threading.Lock()
+        self.pressure_threshold = pressure_threshold
+        self.load_threshold = load_threshold
+        self.backoff = 1.0
+        self._rate = None
+        self._tokens = 0.0
+        self._cpu_share = None
+        self._last_refill = time.monotonic()
+        self._cpu_window_start = (time.monotonic(), time.process_time())
+        self._last_check = 0.0
+        self._observed_rate = None
+        self._observed_start = (time.monotonic(), 0)
+        self._bytes_total = 0
+        self._pending_scale = 1.0
+        self.set_rate(max_mb_per_sec)
+        self.set_cpu_share(cpu_share)
+
+    def set_rate(self, max_mb_per_sec):
+        """Change the byte rate cap in MB/s; None or 0 removes it"""
+        with self._lock:
+            self._rate = max_mb_per_sec * MB if max_mb_per_sec else None
+            self._tokens = min(self._tokens, self._capacity())
+
+    def set_cpu_share(self, cpu_share):
+        """Change the CPU share target (fraction of one CPU); None or 0 removes it"""
+        with self._lock:
+            self._cpu_share = cpu_share if cpu_share else None
+            self._cpu_window_start = (time.monotonic(), time.process_time())
+
+    def get_rate(self):
+        """Return the configured rate cap in MB/s (None = unlimited)"""
+        return self._rate / MB if self._rate else None
+
+    def get_cpu_share(self):
+        """Return the configured CPU share target (None = unlimited)"""
+        return self._cpu_share
+
+    def scale_rate(self, factor):
+        """
+        Multiply the rate cap by factor (used by signal handlers).
+
+        Without a cap, a cap is derived from the observed throughput first.
+        """
+        # Only record the request: a signal handler runs on the main thread
+        # and must not block on the lock that thread may already hold
+        self._pending_scale *= factor
+
+    def _capacity(self):
+        """Token bucket capacity in bytes"""
+        return (self._rate or 0) * BURST_SECONDS
+
+    def _check_host(self):
+        """Adjust the backoff factor from I/O pressure and load"""
+        busy = False
+        if self.pressure_threshold is not None:
+            pressure = read_io_pressure()
+            busy = pressure is not None and pressure > self.pressure_threshold
+        if self.load_threshold is not None and not busy:
+            load = read_load_per_cpu()
+            busy = load is not None and load > self.load_threshold
+        if busy:
+            self.backoff = max(MIN_BACKOFF, self.backoff / 2)
+        else:
+            self.backoff = min(1.0, self.backoff * 2)
+
+    def consume(self, nbytes):
+        """
+        Account for nbytes just read and sleep if the budget is exceeded.
+
+        Args:
+            nbytes (int): Bytes read since the last call
+        """
+        delay = 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._bytes_total += nbytes
+            started, start_bytes = self._observed_start
+            if now - started >= CHECK_INTERVAL:
+                self._observed_rate = (self._bytes_total - start_bytes) / (now - started)
+                self._observed_start = (now, self._bytes_total)
+
+            if now - self._last_check >= CHECK_INTERVAL and (
+                    self.pressure_threshold is not None or self.load_threshold is not None):
+                self._last_check = now
+                self._check_host()
+
+            if self._pending_scale != 1.0:
+                base = self._rate or self._observed_rate
+                if base:
+                    self._rate = base * self._pending_scale
+                self._pending_scale = 1.0
+
+            # Byte rate: token bucket, backoff lowers the refill rate. With
+            # no cap configured, backoff applies to the observed rate.
+            rate = self._rate or (self._observed_rate if self.backoff < 1.0 else None)
+            if rate:
+                rate *= self.backoff
+                self._tokens = min(self._capacity() or rate * BURST_SECONDS,
+                                   self._tokens + (now - self._last_refill) * rate)
+                self._tokens -= nbytes
+                if self._tokens < 0:
+                    delay = -self._tokens / rate
+            self._last_refill = now
+
+            # CPU share: sleep until CPU used / wall time falls to the target
+            if self._cpu_share:
+                wall_start, cpu_start = self._cpu_window_start
+                cpu_used = time.process_time() - cpu_start
+                needed_wall = cpu_used / (self._cpu_share * self.backoff)
+                delay = max(delay, needed_wall - (now - wall_start))
+                if now - wall_start >= CPU_WINDOW:
+                    self._cpu_window_start = (now, time.process_time())
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def status(self):
+        """Return the current settings and measurements as a dictionary"""
+        return {
+            "max_mb_per_sec": self.get_rate(),
+            "cpu_share": self._cpu_share,
+            "backoff": self.backoff,
+            "observed_mb_per_sec": self._observed_rate / MB if self._observed_rate else None,
+        }
+
+
+def install_signal_handlers(controller):
+    """
+    Let operators adjust a running sweep: SIGUSR1 halves the byte rate,
+    SIGUSR2 doubles it. No-op on platforms without these signals.
+
+    Args:
+        controller (BudgetController): Controller to adjust
+    """
+    import signal
+
+    if not hasattr(signal, "SIGUSR1"):
+        return
+    signal.signal(signal.SIGUSR1, lambda signum, frame: controller.scale_rate(0.5))
+    signal.signal(signal.SIGUSR2, lambda signum, frame: controller.scale_rate(2.0))
@@ -0,0 +1,201 @@
+# verified_copy.py
+# Hash-while-copy for File Integrity Checker
+# Copies files and computes their digest from the same single read
+#
+# The usual "copy, then hash source and destination" reads the data three
+# times. copy_and_hash reads the source once into a large reusable buffer,
+# writes it to the destination and feeds the hash from the same buffer.
+# With verify=True the destination is flushed, dropped from the page cache
+# and read back from disk to confirm what actually landed there. When no
+# digest is wanted at all, the copy is left to the kernel
+# (copy_file_range, then sendfile) so the data never enters Python.
+
+import errno
+import os
+import shutil
+import stat
+
+from hash_generator_advanced import new_hash, compare_hashes
+
+
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+KERNEL_COPY_STEP = 1024 * 1024 * 1024
+
+# Errors after which the next kernel copy method is tried
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+
+class VerificationError(Exception):
+    """Raised when the re-read destination does not match the source digest"""
+
+
+def _write_all(fd, view):
+    """Write a whole memoryview, handling short writes"""
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _kernel_copy(src_fd, dst_fd):
+    """Copy the rest of src_fd to dst_fd in the kernel where possible"""
+    copied = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while True:
+                count = os.copy_file_range(src_fd, dst_fd, KERNEL_COPY_STEP)
+                if not count:
+                    return copied
+                copied += count
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+    if hasattr(os, "sendfile"):
+        try:
+            while True:
+                count = os.sendfile(dst_fd, src_fd, None, KERNEL_COPY_STEP)
+                if not count:
+                    return copied
+                copied += count
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+    while True:
+        data = os.read(src_fd, COPY_BUFFER_SIZE)
+        if not data:
+            return copied
+        _write_all(dst_fd, memoryview(data))
+        copied += len(data)
+
+
+def hash_from_disk(file_path, algorithm='sha256'):
+    """
+    Hash a file as stored on disk, not as cached in memory.
+
+    Dirty pages are flushed and the file's cached pages are dropped first,
+    then the file is read in nocache mode so the check leaves no cache
+    footprint behind.
+
+    Args:
+        file_path (str): Path to the file
+        algorithm (str): Hash algorithm to use
+
+    Returns:
+        str: Hexadecimal hash
+    """
+    from page_cache import iter_chunks_nocache
+
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    hash_obj = new_hash(algorithm)
+    for chunk in iter_chunks_nocache(file_path):
+        hash_obj.update(chunk)
+    return hash_obj.hexdigest()
+
+
+def copy_and_hash(src, dst, algorithm='sha256', verify=False, buffer=None,
+                  progress_callback=None, throttle=None):
+    """
+    Copy a file and compute its digest in the same pass.
+
+    Args:
+        src (str): Source file
+        dst (str): Destination file (overwritten)
+        algorithm (str): Hash algorithm, or None for a plain kernel copy
+        verify (bool): Re-read the destination from disk and compare digests
+        buffer (bytearray): Optional reusable copy buffer
+        progress_callback (function): Optional callback(bytes_copied)
+        throttle (BudgetController): Optional I/O and CPU budget to respect
+
+    Returns:
+        dict: "hash" (None without algorithm), "bytes" copied and "verified"
+
+    Raises:
+        shutil.SameFileError: If src and dst are the same file
+        VerificationError: If verify=True and the destination differs
+    """
+    if algorithm is not None:
+        hash_obj = new_hash(algorithm)
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        src_stat = os.fstat(src_fd)
+        if not stat.S_ISREG(src_stat.st_mode):
+            raise ValueError(f"Not a regular file: {src}")
+        try:
+            dst_stat = os.stat(dst)
+        except FileNotFoundError:
+            dst_stat = None
+        # Truncating dst must never truncate the file being copied
+        if dst_stat is not None and (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+            raise shutil.SameFileError(f"{src} and {dst} are the same file")
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, src_stat.st_mode & 0o7777)
+        try:
+            if algorithm is None:
+                copied = _kernel_copy(src_fd, dst_fd)
+            else:
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(src_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                if buffer is None:
+                    buffer = bytearray(COPY_BUFFER_SIZE)
+                view = memoryview(buffer)
+                copied = 0
+                while True:
+                    count = os.readv(src_fd, [buffer])
+                    if not count:
+                        break
+                    chunk = view[:count]
+                    _write_all(dst_fd, chunk)
+                    hash_obj.update(chunk)
+                    copied += count
+                    if throttle is not None:
+                        throttle.consume(count)
+                    if progress_callback:
+                        progress_callback(copied)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    shutil.copymode(src, dst)
+
+    result = {"hash": hash_obj.hexdigest() if algorithm is not None else None,
+              "bytes": copied, "verified": False}
+    if verify:
+        if algorithm is None:
+            raise ValueError("verify=True needs an algorithm")
+        on_disk = hash_from_disk(dst, algorithm)
+        if not compare_hashes(result["hash"], on_disk):
+            raise VerificationError(f"Verification failed: {dst} does not match {src}")
+        result["verified"] = True
+    return result
+
+
+def copy_files(pairs, algorithm='sha256', verify=False, throttle=None):
+    """
+    Copy many files with one shared copy buffer.
+
+    Args:
+        pairs (iterable): (source, destination) tuples
+        algorithm (str): Hash algorithm, or None for plain kernel copies
+        verify (bool): Re-read every destination from disk
+        throttle (BudgetController): Optional I/O and CPU budget to respect
+
+    Yields:
+        dict: copy_and_hash result plus "src", "dst" and "error"
+              ("mismatch" is set when verification failed)
+    """
+    buffer = bytearray(COPY_BUFFER_SIZE) if algorithm is not None else None
+    for src, dst in pairs:
+        try:
+            result = copy_and_hash(src, dst, algorithm, verify, buffer, throttle=throttle)
+            result["error"] = None
+        except VerificationError as e:
+            result = {"hash": None, "bytes": 0, "verified": False, "error": str(e), "mismatch": True}
+        except Exception as e:
+            result = {"hash": None, "bytes": 0, "verified": False, "error": str(e)}
+        result["src"] = src
+        result["dst"] = dst
+        yield result
@@ -0,0 +1,192 @@
+# xattr_cache.py
+# Extended attribute digest cache for File Integrity Checker
+# Stores each file's digest on the file itself, keyed by its size and mtime
+#
+# After a file is hashed its digest is written to a user.integrity.<algo>
+# extended attribute together with the stat key it was computed for:
+#
+#   user.integrity.sha256 = "1:<size>:<mtime_ns>:<hex digest>"
+#
+# A later hash or verification of the file first reads the attribute;
+# if the file's size and mtime still match, the digest is used without
+# reading the file. The attribute travels with the file when it is moved
+# or renamed within a file system, and needs no central baseline.
+# Writing an xattr changes the ctime but not the mtime, so the key stays
+# valid.
+#
+# Writes are queued and applied in batches; before each write the file is
+# stat'ed again and skipped if it changed since it was hashed. Platforms
+# without xattr calls, and file systems that refuse user attributes
+# (tmpfs without user_xattr, FAT, many network mounts), are detected on
+# first use and silently skipped from then on.
+#
+# The cache trusts size and mtime. Anyone who can write the file can also
+# rewrite both and the attribute, so it speeds up routine checks but is
+# no defence against a deliberate attacker; leave it off for those.
+
+import errno
+import os
+import threading
+
+
+ATTRIBUTE_PREFIX = "user.integrity."
+FORMAT_VERSION = "1"
+BATCH_SIZE = 256
+
+# Errors meaning the file system does not take user attributes at all
+_UNSUPPORTED = {errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOSYS}
+
+
+def available():
+    """
+    Check whether this platform has extended attribute calls.
+
+    Returns:
+        bool: True if os.getxattr/os.setxattr exist (Linux)
+    """
+    return hasattr(os, "getxattr") and hasattr(os, "setxattr")
+
+
+def attribute_name(algorithm):
+    """Name of the extended attribute holding an algorithm's digest"""
+    return ATTRIBUTE_PREFIX + algorithm.lower()
+
+
+def encode_value(stat_info, digest):
+    """Attribute value for a digest computed at a given stat"""
+    return f"{FORMAT_VERSION}:{stat_info.st_size}:{stat_info.st_mtime_ns}:{digest}".encode("ascii")
+
+
+def decode_value(value, stat_info):
+    """
+    Digest from an attribute value, if it matches the file's stat.
+
+    Args:
+        value (bytes): Attribute value
+        stat_info (os.stat_result): Current stat of the file
+
+    Returns:
+        str: Hex digest, or None if the value is stale or malformed
+    """
+    try:
+        version, size, mtime_ns, digest = value.decode("ascii").split(":")
+        if (version != FORMAT_VERSION or int(size) != stat_info.st_size
+                or int(mtime_ns) != stat_info.st_mtime_ns):
+            return None
+        bytes.fromhex(digest)
+    except ValueError:
+        return None
+    return digest
+
+
+class XattrCache:
+    """
+    Digest cache in extended attributes.
+
+    Pass an instance as digest_cache to generate_file_hash. It is safe to
+    share between worker threads.
+
+    Args:
+        write (bool): Store new digests (False: only use existing ones)
+        batch_size (int): Queued writes that trigger a flush
+    """
+
+    def __init__(self, write=True, batch_size=BATCH_SIZE):
+        self.write = write
+        self.batch_size = batch_size
+        self.enabled = available()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.skipped = 0
+        self._pending = []
+        self._unsupported = set()       # st_dev of file systems without user xattrs
+        self._lock = threading.Lock()
+
+    def _failed(self, e, stat_info):
+        """Note an xattr error; True if the file system cannot take xattrs"""
+        if e.errno in _UNSUPPORTED:
+            with self._lock:
+                self._unsupported.add(stat_info.st_dev)
+            return True
+        return False
+
+    def lookup(self, file_path, algorithm, stat_info):
+        """
+        Cached digest of a file, if its attribute matches its stat.
+
+        Args:
+            file_path (str): Path to the file
+            algorithm (str): Hash algorithm
+            stat_info (os.stat_result): Current stat of the file
+
+        Returns:
+            str: Hex digest, or None
+        """
+        digest = None
+        if self.enabled and stat_info.st_dev not in self._unsupported:
+            try:
+                digest = decode_value(os.getxattr(file_path, attribute_name(algorithm)), stat_info)
+            except OSError as e:
+                self._failed(e, stat_info)
+        with self._lock:
+            if digest is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return digest
+
+    def store(self, file_path, algorithm, stat_info, digest):
+        """
+        Queue a digest to be written to a file's attribute.
+
+        Args:
+            file_path (str): Path to the file
+            algorithm (str): Hash algorithm
+            stat_info (os.stat_result): Stat of the file before it was hashed
+            digest (str): Hex digest
+        """
+        if not (self.write and self.enabled) or stat_info.st_dev in self._unsupported:
+            return
+        with self._lock:
+            self._pending.append((file_path, algorithm, stat_info, digest))
+            if len(self._pending) < self.batch_size:
+                return
+            batch, self._pending = self._pending, []
+        self._apply(batch)
+
+    def _apply(self, batch):
+        stored = skipped = 0
+        for file_path, algorithm, stat_info, digest in batch:
+            if stat_info.st_dev in self._unsupported:
+                skipped += 1
+                continue
+            try:
+                current = os.stat(file_path)
+                if (current.st_ino != stat_info.st_ino or current.st_size != stat_info.st_size
+                        or current.st_mtime_ns != stat_info.st_mtime_ns):
+                    skipped += 1        # Changed since it was hashed
+                    continue
+                os.setxattr(file_path, attribute_name(algorithm), encode_value(stat_info, digest))
+                stored += 1
+            except OSError as e:
+                # Read-only, not ours, or no xattrs here: the cache is optional
+                self._failed(e, stat_info)
+                skipped += 1
+        with self._lock:
+            self.stored += stored
+            self.skipped += skipped
+
+    def flush(self):
+        """Write every queued digest"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        self._apply(batch)
+
+    def close(self):
+        """Flush the queued digests"""
+        self.flush()
+
+    def summary(self):
+        """Return the cache statistics as a dictionary"""
+        return {"hits": self.hits, "misses": self.misses, "stored": self.stored, "skipped": self.skipped}